@@ -7,14 +7,15 @@ Google Search Console API 查詢程式
 輸出：Excel 檔案
 """
 
-import pandas as pd
-import openpyxl
-from googleapiclient.discovery import build
-from google.oauth2.service_account import Credentials
+# pandas / openpyxl / google client 在用到時才載入（各自需要數百 ms），縮短啟動時間
 import os
 from datetime import datetime, timedelta
-import time
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from gsc_retry import AdaptiveConcurrency, RetryPolicy
+from rate_limiter import RateLimiter
 
 # ========== 配置 ==========
 SERVICE_ACCOUNT_FILE = None  # 預設不硬編碼檔名。可設定環境變數 `GSC_SERVICE_ACCOUNT` 或在此指定路徑
@@ -22,10 +23,19 @@ GSC_SITE_URL = 'https://pm.shiny.com.tw/'  # 你的網站
 KEYWORDS_FILE = 'keywords.csv'  # 你的關鍵字清單（CSV 或 Excel）
 OUTPUT_FILE = f'gsc_results_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'  # 輸出檔案名稱
 QUERY_DAYS = 90  # 查詢過去 90 天的數據
+QUERY_WORKERS = 4  # 並行查詢的 thread 數
+MAX_QPS = 10  # 每秒最多請求數（所有 thread 共用）
+MAX_QPM = 1200  # 每分鐘最多請求數（所有 thread 共用）
+MAX_RETRIES = 5  # 遇到 429 / 5xx 時的最大重試次數
 
 
 def authenticate_gsc():
     """使用 Service Account 認證連接 GSC API"""
+    return build_service(load_credentials())
+
+
+def load_credentials():
+    """讀取 Service Account 憑證"""
     scopes = ['https://www.googleapis.com/auth/webmasters.readonly']
     # 為了安全，不再自動使用環境變數作為 fallback。
     # 使用者必須在呼叫時明確傳入 Service Account 檔案路徑，或在程式內將 SERVICE_ACCOUNT_FILE 設定為路徑。
@@ -34,15 +44,24 @@ def authenticate_gsc():
         raise RuntimeError(
             "Service account 未設定或找不到：請在程式中指定 `SERVICE_ACCOUNT_FILE` 或透過 CLI/GUI 明確指定 service-account JSON 的路徑。"
         )
-    credentials = Credentials.from_service_account_file(
+    from google.oauth2.service_account import Credentials
+
+    return Credentials.from_service_account_file(
         sa_file, scopes=scopes
     )
-    service = build('webmasters', 'v3', credentials=credentials)
-    return service
+
+
+def build_service(credentials):
+    """建立 GSC service（service 物件非 thread-safe，每個 thread 需各自建立）"""
+    from googleapiclient.discovery import build
+
+    return build('webmasters', 'v3', credentials=credentials)
 
 
 def load_keywords(filename):
     """從 CSV 或 Excel 檔案讀取關鍵字清單"""
+    import pandas as pd
+
     try:
         if filename.endswith('.xlsx') or filename.endswith('.xls'):
             df = pd.read_excel(filename)
@@ -69,10 +88,86 @@ def load_keywords(filename):
         sys.exit(1)
 
 
-def query_gsc_performance(service, keywords, days=90):
+def query_keyword(service, keyword, start_date, end_date, retry=None, concurrency=None, limiter=None):
+    """查詢單一關鍵字的效能數據（暫時性錯誤依 retry 重試，重試用盡才記為 ERROR）
+
+    limiter 在每次送出請求（包含重試）前取得配額，重試同樣受速率限制。
+    """
+    try:
+        # 建立查詢請求
+        request_body = {
+            'startDate': str(start_date),
+            'endDate': str(end_date),
+            'dimensions': ['query'],
+            'dimensionFilterGroups': [
+                {
+                    'filters': [
+                        {
+                            'dimension': 'query',
+                            'operator': 'equals',
+                            'value': keyword
+                        }
+                    ]
+                }
+            ],
+            'rowLimit': 1
+        }
+
+        # 發送查詢
+        request = service.searchanalytics().query(
+            siteUrl=GSC_SITE_URL,
+            body=request_body
+        )
+
+        def send():
+            if limiter is not None:
+                limiter.acquire()
+            return request.execute()
+
+        def attempt():
+            return concurrency.guarded(send) if concurrency is not None else send()
+
+        response = retry.call(attempt) if retry is not None else attempt()
+
+        # 提取數據
+        if 'rows' in response and len(response['rows']) > 0:
+            row = response['rows'][0]
+            clicks = row.get('clicks', 0)
+            impressions = row.get('impressions', 0)
+            position = row.get('position', 0)
+            ctr = row.get('ctr', 0)
+        else:
+            clicks = 0
+            impressions = 0
+            position = 0
+            ctr = 0
+
+        return {
+            'keyword': keyword,
+            'clicks': int(clicks) if clicks else 0,
+            'impressions': int(impressions) if impressions else 0,
+            'position': round(position, 2) if position else 0,
+            'ctr': round(ctr * 100, 2) if ctr else 0  # 轉換為百分比
+        }
+
+    except Exception as e:
+        print(f"查詢失敗 (關鍵字: {keyword}): {str(e)}")
+        return {
+            'keyword': keyword,
+            'clicks': 'ERROR',
+            'impressions': 'ERROR',
+            'position': 'ERROR',
+            'ctr': 'ERROR'
+        }
+
+
+def query_gsc_performance(service, keywords, days=90, workers=1, limiter=None, service_factory=None, retry=None):
     """
     批次查詢 GSC 效能數據
-    
+
+    workers > 1 且提供 service_factory 時以 thread pool 並行查詢（每個 thread 各自建立 service），
+    所有 thread 共用 limiter 控制請求速率；輸出順序與 keywords 相同。
+
     返回：
     [{
         'keyword': '...',
@@ -82,84 +177,49 @@ def query_gsc_performance(service, keywords, days=90):
         'ctr': 0.0
     }, ...]
     """
-    results = []
     end_date = datetime.now().date()
     start_date = end_date - timedelta(days=days)
-    
+    if limiter is None:
+        # 尊重 API 限額 - 每秒最多 10 個請求
+        limiter = RateLimiter(per_second=MAX_QPS, per_minute=MAX_QPM)
+    if service_factory is None:
+        workers = 1
+    if retry is None:
+        retry = RetryPolicy(max_retries=MAX_RETRIES)
+    concurrency = AdaptiveConcurrency(workers)
+
     print(f"\n開始查詢 {len(keywords)} 個關鍵字...")
     print(f"查詢期間：{start_date} 至 {end_date}\n")
-    
-    for idx, keyword in enumerate(keywords, 1):
-        try:
-            # 建立查詢請求
-            request_body = {
-                'startDate': str(start_date),
-                'endDate': str(end_date),
-                'dimensions': ['query'],
-                'dimensionFilterGroups': [
-                    {
-                        'filters': [
-                            {
-                                'dimension': 'query',
-                                'operator': 'equals',
-                                'value': keyword
-                            }
-                        ]
-                    }
-                ],
-                'rowLimit': 1
-            }
-            
-            # 發送查詢
-            response = service.searchanalytics().query(
-                siteUrl=GSC_SITE_URL,
-                body=request_body
-            ).execute()
-            
-            # 提取數據
-            if 'rows' in response and len(response['rows']) > 0:
-                row = response['rows'][0]
-                clicks = row.get('clicks', 0)
-                impressions = row.get('impressions', 0)
-                position = row.get('position', 0)
-                ctr = row.get('ctr', 0)
-            else:
-                clicks = 0
-                impressions = 0
-                position = 0
-                ctr = 0
-            
-            result = {
-                'keyword': keyword,
-                'clicks': int(clicks) if clicks else 0,
-                'impressions': int(impressions) if impressions else 0,
-                'position': round(position, 2) if position else 0,
-                'ctr': round(ctr * 100, 2) if ctr else 0  # 轉換為百分比
-            }
-            results.append(result)
-            
-            # 進度顯示
-            if idx % 50 == 0 or idx == len(keywords):
-                print(f"已查詢 {idx}/{len(keywords)} 個關鍵字")
-            
-            # 尊重 API 限額 - 每秒最多 10 個請求
-            time.sleep(0.1)
-            
-        except Exception as e:
-            print(f"查詢失敗 (關鍵字: {keyword}): {str(e)}")
-            results.append({
-                'keyword': keyword,
-                'clicks': 'ERROR',
-                'impressions': 'ERROR',
-                'position': 'ERROR',
-                'ctr': 'ERROR'
-            })
-    
+
+    local = threading.local()
+    lock = threading.Lock()
+    done = [0]
+
+    def task(keyword):
+        svc = service
+        if workers > 1:
+            svc = getattr(local, 'service', None)
+            if svc is None:
+                svc = local.service = service_factory()
+        result = query_keyword(svc, keyword, start_date, end_date, retry, concurrency, limiter)
+        # 進度顯示
+        with lock:
+            done[0] += 1
+            if done[0] % 50 == 0 or done[0] == len(keywords):
+                print(f"已查詢 {done[0]}/{len(keywords)} 個關鍵字")
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(task, keywords))
+    print(f"API 重試統計：{retry.summary()}")
     return results
 
 
 def save_to_excel(results, filename):
     """將結果保存為 Excel 檔案"""
+    import openpyxl
+    import pandas as pd
+
     df = pd.DataFrame(results)
     
     # 排序：先按點擊數（降序），再按曝光數（降序）
@@ -210,7 +270,8 @@ def main():
     try:
         # 1. 認證
         print("\n[步驟 1] 連接 Google Search Console API...")
-        service = authenticate_gsc()
+        credentials = load_credentials()
+        service = build_service(credentials)
         print("✅ 認證成功")
         
         # 2. 讀取關鍵字
@@ -219,7 +280,10 @@ def main():
         
         # 3. 查詢 GSC 數據
         print(f"\n[步驟 3] 查詢 GSC 數據...")
-        results = query_gsc_performance(service, keywords, days=QUERY_DAYS)
+        results = query_gsc_performance(
+            service, keywords, days=QUERY_DAYS, workers=QUERY_WORKERS,
+            service_factory=lambda: build_service(credentials)
+        )
         
         # 4. 保存為 Excel
         print(f"\n[步驟 4] 保存結果為 Excel...")
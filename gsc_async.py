@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+gsc_async.py
+
+以 asyncio 呼叫 Search Analytics API 的 client，與 gsc_keyword_report 中以 googleapiclient
+實作的 fetch_bulk_queries / fetch_exact_query 對應。
+
+所有請求共用一組 keep-alive 連線池（上限 max_connections 條），數百個進行中的請求可以在
+單一 thread 上交錯進行；只使用標準函式庫，不需要額外安裝 HTTP 套件。
+
+用法：
+  async with AsyncSearchConsoleClient(credentials) as client:
+      bulk = await client.fetch_bulk_queries(site_url, "2025-10-01", "2025-10-31")
+      rows = await client.fetch_exact_queries(site_url, "2025-10-01", "2025-10-31", keywords)
+
+api_endpoint 可指向本機的替身 HTTP server（例如 http://127.0.0.1:8080/），測試時不需連網。
+"""
+import asyncio
+import json
+import ssl
+from collections import deque
+from urllib.parse import quote, urlsplit
+
+from gsc_bulkstore import BulkStore
+from gsc_keyword_report import (
+    MAX_ROW_LIMIT,
+    _empty_record,
+    _row_to_record,
+    bulk_query_body,
+    exact_query_body,
+    keywords_filter_groups,
+    needs_single_queries,
+    normalize_keyword,
+    split_batch_rows,
+)
+
+DEFAULT_ENDPOINT = "https://searchconsole.googleapis.com/"
+QUERY_PATH = "webmasters/v3/sites/{site}/searchAnalytics/query"
+
+
+class HttpError(Exception):
+    """API 回傳 4xx / 5xx 時拋出，保留狀態碼、標頭與內容供呼叫端判斷是否重試。"""
+
+    def __init__(self, status, headers, content):
+        super().__init__(f"HTTP {status}: {content[:200]!r}")
+        self.status = status
+        self.headers = headers
+        self.content = content
+
+
+class _ConnectionPool:
+    """同一個 host 的 HTTP/1.1 keep-alive 連線池。"""
+
+    def __init__(self, host, port, use_ssl, max_connections):
+        self.host = host
+        self.port = port
+        self.ssl = ssl.create_default_context() if use_ssl else None
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_connections)
+        self.opened = 0
+
+    async def _open(self):
+        self.opened += 1
+        return await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+
+    async def request(self, method, path, headers, body):
+        async with self._slots:
+            reused = bool(self._idle)
+            conn = self._idle.pop() if reused else await self._open()
+            try:
+                status, resp_headers, content, keep_alive = await _roundtrip(conn, method, path, headers, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                conn[1].close()
+                if not reused:
+                    raise
+                # 閒置太久的 keep-alive 連線可能已被 server 關閉，換新連線重送一次
+                conn = await self._open()
+                try:
+                    status, resp_headers, content, keep_alive = await _roundtrip(conn, method, path, headers, body)
+                except BaseException:
+                    conn[1].close()
+                    raise
+            except BaseException:
+                conn[1].close()
+                raise
+            if keep_alive:
+                self._idle.append(conn)
+            else:
+                conn[1].close()
+            return status, resp_headers, content
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+
+async def _roundtrip(conn, method, path, headers, body):
+    reader, writer = conn
+    lines = [f"{method} {path} HTTP/1.1"] + [f"{k}: {v}" for k, v in headers.items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("連線已被關閉")
+    status = int(status_line.split(None, 2)[1])
+    resp_headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        resp_headers[key.strip().lower()] = value.strip()
+
+    keep_alive = resp_headers.get("connection", "").lower() != "close"
+    if resp_headers.get("transfer-encoding", "").lower() == "chunked":
+        content = bytearray()
+        while True:
+            size = int((await reader.readline()).split(b";")[0].strip(), 16)
+            if size == 0:
+                # 略過 trailer
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                break
+            content += await reader.readexactly(size)
+            await reader.readexactly(2)
+        content = bytes(content)
+    elif "content-length" in resp_headers:
+        content = await reader.readexactly(int(resp_headers["content-length"]))
+    else:
+        content = await reader.read()
+        keep_alive = False
+    return status, resp_headers, content, keep_alive
+
+
+class AsyncSearchConsoleClient:
+    def __init__(self, credentials=None, api_endpoint=DEFAULT_ENDPOINT, max_connections=10, limiter=None, cache=None, refresh_cache=False,
+                 retry=None, concurrency=None):
+        parts = urlsplit(api_endpoint)
+        use_ssl = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if use_ssl else 80)
+        self.base_path = parts.path if parts.path.endswith("/") else parts.path + "/"
+        self.credentials = credentials
+        self.limiter = limiter
+        self.cache = cache
+        self.refresh_cache = refresh_cache
+        # retry: gsc_retry.RetryPolicy；concurrency: gsc_retry.AdaptiveConcurrency（依節流情況調整同時請求數）
+        self.retry = retry
+        self.concurrency = concurrency
+        self.requests_made = 0
+        self._pool = _ConnectionPool(self.host, self.port, use_ssl, max_connections)
+        self._auth_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        await self._pool.close()
+
+    async def _auth_headers(self):
+        if self.credentials is None:
+            return {}
+        async with self._auth_lock:
+            if not self.credentials.valid:
+                # google-auth 的 refresh 是同步 I/O，丟到 thread 執行避免卡住 event loop
+                from google.auth.transport.requests import Request
+                await asyncio.to_thread(self.credentials.refresh, Request())
+        return {"Authorization": f"Bearer {self.credentials.token}"}
+
+    async def query(self, site_url, body):
+        # cache 為 gsc_cache.ResponseCache；命中時不送出請求也不佔用限速配額
+        if self.cache is not None and not self.refresh_cache:
+            hit = self.cache.get(site_url, body)
+            if hit is not None:
+                return hit
+
+        async def attempt():
+            if self.concurrency is not None:
+                return await self.concurrency.guarded_async(lambda: self._send(site_url, body))
+            return await self._send(site_url, body)
+
+        if self.retry is not None:
+            resp = await self.retry.call_async(attempt)
+        else:
+            resp = await attempt()
+        if self.cache is not None:
+            self.cache.put(site_url, body, resp)
+        return resp
+
+    async def _send(self, site_url, body):
+        if self.limiter is not None:
+            await self.limiter.acquire_async()
+        payload = json.dumps(body).encode("utf-8")
+        headers = {
+            "Host": self.host if self.port in (80, 443) else f"{self.host}:{self.port}",
+            "Content-Type": "application/json",
+            "Content-Length": str(len(payload)),
+            "Accept": "application/json",
+            "Connection": "keep-alive",
+        }
+        headers.update(await self._auth_headers())
+        path = self.base_path + QUERY_PATH.format(site=quote(site_url, safe=""))
+        self.requests_made += 1
+        status, resp_headers, content = await self._pool.request("POST", path, headers, payload)
+        if status >= 400:
+            raise HttpError(status, resp_headers, content)
+        return json.loads(content or b"{}")
+
+    async def iter_bulk_rows(self, site_url, start_date, end_date, row_limit=MAX_ROW_LIMIT, max_rows=None, dimension_filter_groups=None, dimensions=None):
+        # 與 gsc_keyword_report.iter_bulk_rows 相同的 startRow 分頁規則（async generator）
+        page_size = max(1, min(int(row_limit), MAX_ROW_LIMIT))
+        start_row = 0
+        while True:
+            limit = page_size
+            if max_rows is not None:
+                remaining = max_rows - start_row
+                if remaining <= 0:
+                    return
+                limit = min(limit, remaining)
+            body = bulk_query_body(start_date, end_date, limit, start_row, dimension_filter_groups, dimensions)
+            rows = (await self.query(site_url, body)).get("rows", [])
+            for r in rows:
+                yield r
+            start_row += len(rows)
+            if len(rows) < limit:
+                return
+
+    async def fetch_bulk_queries(self, site_url, start_date, end_date, row_limit=MAX_ROW_LIMIT, paginate=False, max_rows=None):
+        if not paginate:
+            max_rows = row_limit
+        result = BulkStore()
+        async for r in self.iter_bulk_rows(site_url, start_date, end_date, row_limit, max_rows):
+            rec = _row_to_record(r)
+            if rec is not None:
+                result.add(normalize_keyword(rec["query"]), rec)
+        return result
+
+    async def fetch_exact_query(self, site_url, start_date, end_date, keyword):
+        resp = await self.query(site_url, exact_query_body(start_date, end_date, keyword))
+        rows = resp.get("rows", [])
+        if not rows:
+            return _empty_record(keyword)
+        return _row_to_record(rows[0]) or _empty_record(keyword)
+
+    async def fetch_exact_batch(self, site_url, start_date, end_date, keywords):
+        # 與 gsc_keyword_report.fetch_exact_batch 相同：單一關鍵字或 regex 過長時逐一以 equals 查詢
+        if needs_single_queries(keywords):
+            return [await self.fetch_exact_query(site_url, start_date, end_date, kw) for kw in keywords]
+        groups = keywords_filter_groups(keywords)
+        rows = [r async for r in self.iter_bulk_rows(site_url, start_date, end_date, dimension_filter_groups=groups)]
+        return split_batch_rows(rows, keywords)
+
+    async def fetch_exact_queries(self, site_url, start_date, end_date, keywords, max_in_flight=100, on_result=None):
+        """同時送出最多 max_in_flight 個精確查詢，回傳順序與 keywords 相同。
+
+        與 gsc_keyword_report.run_exact_queries 相同：on_result(keyword, result) 依 keywords 順序、於結果可用時立即呼叫，
+        指定 on_result 時不保留結果（回傳 None）；task 依序建立（見 _run_in_order），記憶體用量不隨 keywords 數量成長。
+        """
+        results = []
+        deliver = on_result or (lambda kw, result: results.append(result))
+        await _run_in_order(keywords, lambda kw: self.fetch_exact_query(site_url, start_date, end_date, kw), deliver, max_in_flight)
+        return None if on_result is not None else results
+
+
+async def _run_in_order(items, fetch, deliver, max_in_flight):
+    """對每個項目 await fetch(item)，並依 items 順序呼叫 deliver(item, result)。
+
+    與 gsc_keyword_report.run_exact_queries 相同，task 依序建立，同時存在的最多 max_in_flight * 4 個（其中最多
+    max_in_flight 個正在請求），等待輸出的結果不會隨 items 數量成長。
+    """
+    sem = asyncio.Semaphore(max(1, max_in_flight))
+
+    async def guarded(item):
+        async with sem:
+            return await fetch(item)
+
+    window = max(1, max_in_flight) * 4
+    pending = deque()
+    try:
+        for item in items:
+            pending.append((item, asyncio.ensure_future(guarded(item))))
+            if len(pending) >= window:
+                done_item, task = pending.popleft()
+                deliver(done_item, await task)
+        while pending:
+            done_item, task = pending.popleft()
+            deliver(done_item, await task)
+    finally:
+        for _, task in pending:
+            task.cancel()
+
+
+async def collect_report_rows(client, site_url, start_date, end_date, keywords, row_limit=MAX_ROW_LIMIT, max_rows=None,
+                              exact_mode="single", batch_size=100, max_in_flight=100, on_row=None):
+    """gsc_keyword_report.collect_report_rows 的 asyncio 版本：bulk 比對後補查未命中的關鍵字。
+
+    請求同時進行、完成順序不固定，但 on_row(row) 仍依輸出順序（bulk 命中在前，其餘依關鍵字順序）呼叫；
+    指定 on_row 時回傳輸出列數，否則回傳所有輸出列的 list。
+    """
+    from gsc_keyword_report import FanOut, _result_row, build_keyword_batches, dedupe_keywords, emit_bulk_hits
+
+    out_rows = []
+    sink = on_row or out_rows.append
+    count = 0
+
+    def emit(row):
+        nonlocal count
+        count += 1
+        sink(row)
+
+    pending = {normalize_keyword(kw) for kw in keywords}
+    bulk = {}
+    scanned = 0
+    rows = client.iter_bulk_rows(site_url, start_date, end_date, row_limit, max_rows)
+    try:
+        async for r in rows:
+            scanned += 1
+            rec = _row_to_record(r)
+            if rec is None:
+                continue
+            key = normalize_keyword(rec["query"])
+            if key in pending:
+                bulk[key] = rec
+                pending.discard(key)
+                if not pending:
+                    break
+    finally:
+        await rows.aclose()
+    print(f"bulk 查詢讀取 {scanned} 筆 query 資料，命中 {len(bulk)} 個關鍵字")
+
+    missing = emit_bulk_hits(keywords, bulk, emit)
+    fan_out = FanOut(missing, emit)
+    occurrences = len(missing)
+    missing = dedupe_keywords(missing)
+    if len(missing) < occurrences:
+        print(f"未命中的關鍵字去除重複後剩 {len(missing)} 個，省下 {occurrences - len(missing)} 次重複查詢")
+
+    if exact_mode == "batch":
+        batches = list(build_keyword_batches(missing, batch_size))
+
+        def on_batch(batch, results):
+            for kw, d in zip(batch, results):
+                fan_out.put(_result_row(kw, d, "batch"))
+
+        print(f"{len(missing)} 個關鍵字未在 bulk 結果中發現，以 {len(batches)} 個批次 regex 請求補上（asyncio）")
+        await _run_in_order(batches, lambda batch: client.fetch_exact_batch(site_url, start_date, end_date, batch),
+                            on_batch, max_in_flight)
+    else:
+        print(f"{len(missing)} 個關鍵字未在 bulk 結果中發現，以 asyncio 精確查詢補上（最多 {max_in_flight} 個同時進行）")
+        await _run_in_order(missing, lambda kw: client.fetch_exact_query(site_url, start_date, end_date, kw),
+                            lambda kw, d: fan_out.put(_result_row(kw, d, "exact")), max_in_flight)
+    print(f"共送出 {client.requests_made} 個請求，使用 {client._pool.opened} 條連線")
+    return count if on_row is not None else out_rows
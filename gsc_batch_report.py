@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+gsc_batch_report.py
+
+一次為多個 Search Console property 產生關鍵字報表。
+
+所有 property 只驗證一次、只 build 一次 service，並共用同一組速率限制 / 重試 / 並行上限 / 快取，
+因此同時執行多個 property 時合計仍遵守 API 配額。執行結束後列出每個 property 的耗時。
+
+manifest 為 CSV（第一列為標題）或 JSON（物件陣列），欄位：
+  property    Search Console property URL
+  keywords    關鍵字 CSV 檔路徑
+  start_date  YYYY-MM-DD（可省略，改用 --start-date）
+  end_date    YYYY-MM-DD（可省略，改用 --end-date）
+  output      輸出檔（可省略，預設依 property 網域命名的 CSV）
+
+用法：
+  python gsc_batch_report.py --manifest properties.csv --service-account sa.json --parallel 4
+"""
+import argparse
+import csv
+import json
+import re
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from gsc_keyword_report import (
+    authenticate,
+    build_service_stack,
+    collect_report_rows,
+    load_keywords,
+)
+from gsc_retry import AdaptiveConcurrency, RetryPolicy
+from gsc_writer import open_writer
+from rate_limiter import RateLimiter
+
+MANIFEST_FIELDS = ("property", "keywords", "start_date", "end_date", "output")
+
+
+def default_output(site_url):
+    # sc-domain:example.com / https://example.com/ -> example.com.csv
+    name = re.sub(r"^(sc-domain:|https?://)", "", site_url.strip()).strip("/")
+    return re.sub(r"[^\w.-]+", "_", name) + ".csv"
+
+
+def load_manifest(path, start_date=None, end_date=None):
+    """讀取 manifest，補上預設日期與輸出檔名；缺少必要欄位時丟出 ValueError。"""
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as fh:
+            entries = json.load(fh)
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            entries = list(csv.DictReader(fh))
+    out = []
+    for i, entry in enumerate(entries, 1):
+        item = {k: (entry.get(k) or "").strip() for k in MANIFEST_FIELDS}
+        item["start_date"] = item["start_date"] or start_date
+        item["end_date"] = item["end_date"] or end_date
+        missing = [k for k in ("property", "keywords", "start_date", "end_date") if not item[k]]
+        if missing:
+            raise ValueError(f"manifest 第 {i} 筆缺少欄位：{', '.join(missing)}")
+        item["output"] = item["output"] or default_output(item["property"])
+        out.append(item)
+    outputs = [item["output"] for item in out]
+    if len(set(outputs)) != len(outputs):
+        raise ValueError("manifest 中有多個 property 寫入同一個輸出檔")
+    return out
+
+
+def run_entry(service, entry, **options):
+    """產生單一 property 的報表，回傳耗時與結果摘要（例外不往外丟，避免影響其他 property）。"""
+    started = time.perf_counter()
+    summary = {"property": entry["property"], "output": entry["output"], "keywords": 0, "rows": 0, "error": None}
+    try:
+        keywords = load_keywords(entry["keywords"])
+        summary["keywords"] = len(keywords)
+        with open_writer(entry["output"]) as writer:
+            collect_report_rows(service, entry["property"], entry["start_date"], entry["end_date"], keywords,
+                                on_row=writer.write, **options)
+        summary["rows"] = writer.rows
+    except Exception as exc:
+        traceback.print_exc()
+        summary["error"] = f"{type(exc).__name__}: {exc}"
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+
+def run_batch(service, entries, parallel=1, **options):
+    """以 parallel 個 thread 同時處理多個 property，回傳與 entries 同順序的摘要。"""
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+        return list(pool.map(lambda e: run_entry(service, e, **options), entries))
+
+
+def print_summary(summaries, elapsed):
+    print("\n各 property 執行時間：")
+    width = max([len(s["property"]) for s in summaries] or [0])
+    for s in summaries:
+        status = f"失敗：{s['error']}" if s["error"] else f"{s['rows']} 列 -> {s['output']}"
+        print(f"  {s['property']:<{width}}  {s['seconds']:7.1f} 秒  {s['keywords']} 個關鍵字  {status}")
+    total = sum(s["seconds"] for s in summaries)
+    print(f"共 {len(summaries)} 個 property，總耗時 {elapsed:.1f} 秒（各 property 耗時合計 {total:.1f} 秒）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以同一組憑證與 service 為多個 property 產生關鍵字報表")
+    parser.add_argument("--manifest", required=True, help="CSV 或 JSON，欄位 property, keywords, start_date, end_date, output")
+    parser.add_argument("--start-date", default=None, help="manifest 未指定時使用的開始日期 YYYY-MM-DD")
+    parser.add_argument("--end-date", default=None, help="manifest 未指定時使用的結束日期 YYYY-MM-DD")
+    parser.add_argument("--service-account", default=None, help="service account JSON 路徑 (可選)")
+    parser.add_argument("--delegated-user", default=None, help="若使用 service account 並需委派，填入被委派的帳號 email")
+    parser.add_argument("--oauth-client", default=None, help="OAuth client_secret.json，若不使用 service account 可提供此檔進行 OAuth Flow")
+    parser.add_argument("--parallel", type=int, default=2, help="同時處理的 property 數 (預設 2)")
+    parser.add_argument("--workers", type=int, default=4, help="每個 property 精確查詢的並行 thread 數 (預設 4)")
+    parser.add_argument("--qps", type=float, default=10, help="所有 property 共用的每秒請求上限 (預設 10)")
+    parser.add_argument("--qpm", type=float, default=1200, help="所有 property 共用的每分鐘請求上限 (預設 1200)")
+    parser.add_argument("--max-retries", type=int, default=5, help="遇到 429 / 5xx 時的最大重試次數 (預設 5)")
+    parser.add_argument("--row-limit", type=int, default=25000, help="bulk 查詢的 rowLimit (預設 25000)")
+    parser.add_argument("--paginate", action="store_true", help="bulk 查詢以 startRow 分頁抓取")
+    parser.add_argument("--max-bulk-rows", type=int, default=None, help="分頁模式下每個 property 最多抓取的 query 筆數")
+    parser.add_argument("--exact-mode", choices=["single", "batch"], default="single", help="bulk 未命中關鍵字的補查方式")
+    parser.add_argument("--batch-size", type=int, default=100, help="batch 模式下每個請求最多包含的關鍵字數 (預設 100)")
+    parser.add_argument("--cache-path", default=".gsc_cache.sqlite", help="查詢結果快取檔 (預設 .gsc_cache.sqlite)")
+    parser.add_argument("--no-cache", action="store_true", help="不讀也不寫快取")
+    parser.add_argument("--refresh-cache", action="store_true", help="忽略既有快取重新下載")
+    parser.add_argument("--day-store", default=None, help="每日資料庫路徑 (SQLite)，所有 property 共用")
+    parser.add_argument("--api-endpoint", default=None, help="改送到其他 API 端點（例如 gsc_fake_server.py）；未指定憑證時不做認證")
+    args = parser.parse_args()
+
+    entries = load_manifest(args.manifest, args.start_date, args.end_date)
+    print(f"manifest 共 {len(entries)} 個 property")
+
+    limiter = RateLimiter(per_second=args.qps, per_minute=args.qpm)
+    retry = RetryPolicy(max_retries=args.max_retries)
+    concurrency = AdaptiveConcurrency(args.workers * max(1, args.parallel))
+    creds = None
+    if not args.api_endpoint or args.service_account or args.oauth_client:
+        creds = authenticate(args.service_account, args.delegated_user, args.oauth_client)
+    cache = None
+    if not args.no_cache:
+        from gsc_cache import ResponseCache
+        cache = ResponseCache(args.cache_path)
+    service = build_service_stack(creds, limiter, retry, concurrency, cache, args.refresh_cache, args.api_endpoint)
+
+    started = time.perf_counter()
+    summaries = run_batch(
+        service, entries, parallel=args.parallel,
+        row_limit=args.row_limit, max_rows=args.max_bulk_rows if args.paginate else args.row_limit,
+        exact_mode=args.exact_mode, batch_size=args.batch_size, workers=args.workers, day_store=args.day_store,
+    )
+    print_summary(summaries, time.perf_counter() - started)
+    if limiter.waited:
+        print(f"速率限制累計等待 {limiter.waited:.1f} 秒")
+    print(f"API 重試統計：{retry.summary()}；並行上限最低降至 {concurrency.lowest}")
+    if cache is not None:
+        s = cache.stats()
+        print(f"快取命中 {s['hits']} 次、未命中 {s['misses']} 次")
+        cache.close()
+    if any(s["error"] for s in summaries):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+gsc_bulkstore.py
+
+bulk query 結果的精簡記憶體表示。
+
+以 dict 保存「每個 query 一個 record dict」時，每列都要付出一個 dict 與三個數值物件的開銷，
+分頁抓取到數百萬列時這些開銷遠大於資料本身。BulkStore 只保留 key -> 列索引的 dict，
+clicks / impressions / position 存在 array 的連續記憶體中；原始 query 與 key 相同時（絕大多數情況）不另外保存。
+
+BulkStore 是唯讀 Mapping：store[key] / store.get(key) 回傳與原本相同格式的 record dict
+（{"query", "clicks", "impressions", "position"}），僅在查找時才建立。
+
+用法：
+  store = BulkStore()
+  store.add(normalize_keyword(rec["query"]), rec)
+  rec = store.get("iphone 15")
+"""
+from array import array
+from collections.abc import Mapping
+
+
+class BulkStore(Mapping):
+    def __init__(self):
+        self._index = {}
+        # key 與原始 query 不同時（例如大小寫、全形）才記錄原始 query：列索引 -> query
+        self._queries = {}
+        self._clicks = array("q")
+        self._impressions = array("q")
+        self._positions = array("d")
+
+    def add(self, key, record):
+        """加入一筆 record；key 已存在時保留先加入的一筆（與 dict.setdefault 相同），回傳是否有加入。"""
+        if key in self._index:
+            return False
+        i = len(self._clicks)
+        self._index[key] = i
+        if record["query"] != key:
+            self._queries[i] = record["query"]
+        self._clicks.append(int(record["clicks"] or 0))
+        self._impressions.append(int(record["impressions"] or 0))
+        self._positions.append(float(record["position"] or 0.0))
+        return True
+
+    def __getitem__(self, key):
+        i = self._index[key]
+        return {
+            "query": self._queries.get(i, key),
+            "clicks": self._clicks[i],
+            "impressions": self._impressions[i],
+            "position": self._positions[i],
+        }
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+gsc_cache.py
+
+Search Analytics 查詢結果的本機 SQLite 快取。
+
+以 property + 完整請求 body（日期區間、dimensions、filters、startRow、rowLimit）作為 key，
+回應以 zlib 壓縮後存放。已結束的歷史區間（結束日早於 GSC 資料定稿延遲）預設永久有效，
+仍可能變動的近期區間則以 TTL 控制；總大小超過上限時依最後使用時間（LRU）淘汰。
+
+用法：
+  python gsc_cache.py stats
+  python gsc_cache.py prune --max-mb 100
+  python gsc_cache.py clear
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+
+from gsc_keyword_report import ServiceWrapper
+
+DEFAULT_CACHE_PATH = ".gsc_cache.sqlite"
+# GSC 資料通常 2~3 天後才定稿，結束日早於此天數的區間視為不會再變動
+FINAL_DATA_DELAY_DAYS = 3
+# 命中時的最後使用時間先記在記憶體中，累積到此筆數（或寫入、淘汰、關閉時）才一次寫回
+ACCESS_FLUSH_ENTRIES = 256
+
+
+def is_closed_range(end_date, today=None):
+    today = today or date.today()
+    try:
+        return date.fromisoformat(end_date) <= today - timedelta(days=FINAL_DATA_DELAY_DAYS)
+    except (TypeError, ValueError):
+        return False
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=200 * 1024 * 1024, open_ttl=6 * 3600, closed_ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.open_ttl = open_ttl
+        self.closed_ttl = closed_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, site TEXT, start_date TEXT, end_date TEXT,"
+            " response BLOB, size INTEGER, created REAL, accessed REAL, expires REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+        self._conn.commit()
+        # 總大小只在開啟與 prune 時完整加總一次，之後隨寫入與刪除增減
+        self._total = self._sum_sizes()
+        self._accessed = {}
+
+    def _sum_sizes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(site_url, body):
+        raw = json.dumps({"site": site_url, "body": body}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, site_url, body):
+        key = self.make_key(site_url, body)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            # 讀取不開寫入交易：使用時間累積後再批次寫回
+            self._accessed[key] = now
+            if len(self._accessed) >= ACCESS_FLUSH_ENTRIES:
+                self._flush_accessed_locked()
+                self._conn.commit()
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, site_url, body, response):
+        key = self.make_key(site_url, body)
+        now = time.time()
+        ttl = self.closed_ttl if is_closed_range(body.get("endDate")) else self.open_ttl
+        expires = now + ttl if ttl is not None else None
+        blob = zlib.compress(json.dumps(response, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, site_url, body.get("startDate"), body.get("endDate"), blob, len(blob), now, now, expires),
+            )
+            self._accessed.pop(key, None)
+            self._total += len(blob) - (old[0] if old else 0)
+            self._evict_locked()
+            self._conn.commit()
+
+    def _flush_accessed_locked(self):
+        if self._accessed:
+            self._conn.executemany("UPDATE responses SET accessed = ? WHERE key = ?",
+                                   [(t, k) for k, t in self._accessed.items()])
+            self._accessed.clear()
+
+    def _evict_locked(self):
+        if self._total <= self.max_bytes:
+            return 0
+        # 淘汰順序依最後使用時間，先寫回記憶體中的使用時間
+        self._flush_accessed_locked()
+        removed = 0
+        while self._total > self.max_bytes:
+            oldest = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed LIMIT 64").fetchall()
+            if not oldest:
+                break
+            for key, size in oldest:
+                if self._total <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total -= size
+                removed += 1
+        return removed
+
+    def prune(self):
+        """刪除過期項目並依 LRU 淘汰到大小上限以內，回傳刪除筆數。"""
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM responses WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+            # 其他程序可能也寫入同一個快取檔，prune 時重新加總
+            self._total = self._sum_sizes()
+            removed = cur.rowcount + self._evict_locked()
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._total = 0
+            self._accessed.clear()
+            self._conn.execute("VACUUM")
+
+    def stats(self):
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": total, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed_locked()
+            self._conn.commit()
+            self._conn.close()
+
+
+class CachedService(ServiceWrapper):
+    """先查快取，未命中才呼叫內層 service 並寫回快取；refresh=True 時一律重新下載並覆寫。"""
+
+    def __init__(self, service, cache, refresh=False):
+        super().__init__(service)
+        self.cache = cache
+        self.refresh = refresh
+
+    def _execute(self, site_url, body):
+        if not self.refresh:
+            hit = self.cache.get(site_url, body)
+            if hit is not None:
+                return hit
+        resp = super()._execute(site_url, body)
+        self.cache.put(site_url, body, resp)
+        return resp
+
+
+def main():
+    parser = argparse.ArgumentParser(description="管理 gsc_keyword_report 的查詢快取")
+    parser.add_argument("action", choices=["stats", "prune", "clear"])
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH, help=f"快取檔路徑 (預設 {DEFAULT_CACHE_PATH})")
+    parser.add_argument("--max-mb", type=float, default=200, help="快取大小上限 MB (預設 200)")
+    args = parser.parse_args()
+    if not os.path.exists(args.cache_path):
+        print(f"找不到快取檔：{args.cache_path}")
+        return
+    cache = ResponseCache(args.cache_path, max_bytes=int(args.max_mb * 1024 * 1024))
+    if args.action == "prune":
+        print(f"已刪除 {cache.prune()} 筆快取")
+    elif args.action == "clear":
+        cache.clear()
+        print("已清除所有快取")
+    s = cache.stats()
+    print(f"快取 {s['entries']} 筆，共 {s['bytes'] / 1024 / 1024:.1f} MB")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
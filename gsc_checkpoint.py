@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+gsc_checkpoint.py
+
+長時間執行的關鍵字報表 checkpoint：已完成的關鍵字結果以 append-only JSONL journal 定期寫入磁碟，
+程式中斷後可用 --resume 從 journal 接續，只查詢尚未完成的關鍵字。
+
+journal 第一行記錄 property 與日期區間，只有相同的 property + 區間才會被接續使用；
+中斷時最後一行可能只寫了一半，載入時會略過無法解析的行。
+"""
+import json
+import os
+import time
+
+
+class Checkpoint:
+    def __init__(self, path, site_url, start_date, end_date, flush_every=100, flush_interval=5.0):
+        self.path = path
+        self.header = {"property": site_url, "start_date": start_date, "end_date": end_date}
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._fh = None
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def load(self):
+        """讀取相同 property + 區間的既有 journal，回傳 {keyword: row}；不相符或不存在時回傳空 dict。"""
+        if not os.path.exists(self.path):
+            return {}
+        done = {}
+        with open(self.path, encoding="utf-8") as fh:
+            for i, line in enumerate(fh):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if i == 0:
+                    if record != self.header:
+                        print(f"checkpoint {self.path} 的 property 或日期區間不同，將重新開始")
+                        return {}
+                    continue
+                done[record["keyword"]] = record
+        return done
+
+    def open(self, resume=False):
+        # 接續時沿用既有 journal 往後追加；否則重新建立並寫入 header
+        if resume and self._header_matches():
+            with open(self.path, "rb") as fh:
+                fh.seek(-1, os.SEEK_END)
+                truncated = fh.read(1) != b"\n"
+            self._fh = open(self.path, "a", encoding="utf-8")
+            if truncated:
+                # 上次中斷在半行，補上換行讓後續紀錄從新的一行開始
+                self._fh.write("\n")
+        else:
+            self._fh = open(self.path, "w", encoding="utf-8")
+            self._fh.write(json.dumps(self.header, ensure_ascii=False) + "\n")
+            self._fh.flush()
+        return self
+
+    def _header_matches(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as fh:
+            try:
+                return json.loads(fh.readline()) == self.header
+            except ValueError:
+                return False
+
+    def record(self, row):
+        self._fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._pending += 1
+        now = time.monotonic()
+        if self._pending >= self.flush_every or now - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._fh is None:
+            return
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if self._fh is not None:
+            self.flush()
+            self._fh.close()
+            self._fh = None
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
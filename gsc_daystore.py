@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+gsc_daystore.py
+
+以「天」為單位保存 query 資料的本機 SQLite 資料庫，讓重疊的日期區間只需下載缺少的日子。
+
+以 dimensions ["date", "query"] 下載資料，已定稿的日子（早於 GSC 資料延遲天數）永久保存，
+近期尚未定稿的日子每次都會重新下載。任意區間的報表由本機彙總：clicks / impressions 加總，
+position 以 impressions 加權平均。
+
+用法：
+  store = DayStore(".gsc_days.sqlite")
+  store.sync(service, site_url, "2025-01-01", "2025-12-31")
+  bulk, scanned = match_bulk_rows(store.iter_range_rows(site_url, "2025-01-01", "2025-12-31"), keywords)
+"""
+import sqlite3
+from datetime import date, timedelta
+
+from gsc_cache import is_closed_range
+from gsc_keyword_report import MAX_ROW_LIMIT, iter_bulk_rows
+
+DEFAULT_DAYSTORE_PATH = ".gsc_days.sqlite"
+
+
+def _days(start_date, end_date):
+    d = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+    while d <= end:
+        yield d.isoformat()
+        d += timedelta(days=1)
+
+
+def _contiguous_ranges(days):
+    # 把已排序的日期清單合併成連續區間，減少請求次數
+    ranges = []
+    for day in days:
+        if ranges and date.fromisoformat(ranges[-1][1]) + timedelta(days=1) == date.fromisoformat(day):
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [tuple(r) for r in ranges]
+
+
+class DayStore:
+    def __init__(self, path=DEFAULT_DAYSTORE_PATH):
+        self.path = path
+        # 批次模式下多個 property 可能同時寫入同一個資料庫，等待鎖釋放而非立即失敗
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS days ("
+            " site TEXT, day TEXT, complete INTEGER, PRIMARY KEY (site, day));"
+            "CREATE TABLE IF NOT EXISTS rows ("
+            " site TEXT, day TEXT, query TEXT, clicks INTEGER, impressions INTEGER, position REAL);"
+            "CREATE INDEX IF NOT EXISTS rows_site_day ON rows(site, day);"
+        )
+        self._conn.commit()
+
+    def missing_days(self, site_url, start_date, end_date):
+        """回傳區間內尚未保存完整資料的日子（含未定稿、需重新下載的日子）。"""
+        stored = {
+            day for (day,) in self._conn.execute(
+                "SELECT day FROM days WHERE site = ? AND complete = 1 AND day BETWEEN ? AND ?",
+                (site_url, start_date, end_date),
+            )
+        }
+        return [d for d in _days(start_date, end_date) if d not in stored]
+
+    def sync(self, service, site_url, start_date, end_date, row_limit=MAX_ROW_LIMIT, max_rows=None):
+        """只下載區間內缺少的日子，回傳實際下載的天數。
+
+        每頁最多 row_limit 筆，所有缺少的區間合計最多 max_rows 筆（None 表示不限，與 iter_bulk_rows 相同）。
+        每頁下載後立即寫入資料庫，記憶體用量與區間長度無關。因達到 max_rows 而截斷的區間不標記為完整並印出警告，
+        之後會重新下載；額度用完後其餘缺少的日子不下載。剛好等於 max_rows 筆的區間會多請求 1 筆確認是否還有資料。
+        """
+        page_size = max(1, min(int(row_limit), MAX_ROW_LIMIT))
+        remaining = max_rows
+        synced = 0
+        for range_start, range_end in _contiguous_ranges(self.missing_days(site_url, start_date, end_date)):
+            if remaining is not None and remaining <= 0:
+                print(f"每日資料庫：已達下載上限 {max_rows} 筆，{range_start} 起其餘缺少的日子這次不下載")
+                break
+            # 未定稿或先前被截斷的日子先刪除舊資料再寫入
+            with self._conn:
+                self._conn.execute("DELETE FROM rows WHERE site = ? AND day BETWEEN ? AND ?", (site_url, range_start, range_end))
+            fetched = 0
+            page = []
+            # 多要 1 筆：拿得到才表示區間被 max_rows 截斷
+            probe = None if remaining is None else remaining + 1
+            truncated = False
+            for r in iter_bulk_rows(service, site_url, range_start, range_end, row_limit, probe, dimensions=["date", "query"]):
+                if remaining is not None and fetched >= remaining:
+                    truncated = True
+                    break
+                fetched += 1
+                keys = r.get("keys", [])
+                if len(keys) < 2:
+                    continue
+                page.append((site_url, keys[0], keys[1], r.get("clicks", 0), r.get("impressions", 0), r.get("position", 0.0)))
+                if len(page) >= page_size:
+                    self._insert_rows(page)
+                    page = []
+            self._insert_rows(page)
+            if truncated:
+                print(f"每日資料庫：{range_start} ~ {range_end} 超過下載上限 {max_rows} 筆，這些日子不完整，下次執行會重新下載"
+                      "（可提高 --max-bulk-rows）")
+            if remaining is not None:
+                remaining -= fetched
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO days VALUES (?, ?, ?)",
+                    [(site_url, d, 1 if is_closed_range(d) and not truncated else 0) for d in _days(range_start, range_end)],
+                )
+            synced += (date.fromisoformat(range_end) - date.fromisoformat(range_start)).days + 1
+        return synced
+
+    def _insert_rows(self, rows):
+        if rows:
+            with self._conn:
+                self._conn.executemany("INSERT INTO rows VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def iter_range_rows(self, site_url, start_date, end_date):
+        """彙總區間內每個 query，yield 與 API 回應相同格式的 row（可直接交給 match_bulk_rows）。"""
+        cur = self._conn.execute(
+            "SELECT query, SUM(clicks), SUM(impressions),"
+            " CASE WHEN SUM(impressions) > 0 THEN SUM(position * impressions) / SUM(impressions) ELSE AVG(position) END"
+            " FROM rows WHERE site = ? AND day BETWEEN ? AND ? GROUP BY query ORDER BY SUM(clicks) DESC",
+            (site_url, start_date, end_date),
+        )
+        for query, clicks, impressions, position in cur:
+            yield {"keys": [query], "clicks": clicks, "impressions": impressions, "position": position}
+
+    def close(self):
+        self._conn.close()
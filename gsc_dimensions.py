@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+gsc_dimensions.py
+
+一次下載 query + page / device / country 的多維度資料，於本機彙總出多份報表。
+
+原本每多一種細分（每個關鍵字在各頁面、各裝置的表現）就要再跑一輪 API；這裡以 dimensions
+["query", "page", "device", ...] 分頁下載一次，存成精簡的 DimensionStore，之後任意彙總都在本機計算：
+clicks / impressions 加總，position 以 impressions 加權平均（impressions 皆為 0 時取平均）。
+
+注意：dimensions 含 page 時 API 以頁面為單位彙總（byPage），同一個 query 在多個頁面出現時各自計算曝光，
+因此每個關鍵字的 impressions 可能高於只用 query 維度的報表。
+
+用法：
+  store = fetch_dimension_store(service, site_url, "2025-01-01", "2025-01-31", ["page", "device"], max_rows=None)
+  bulk_index = store.query_index()                      # 交給 collect_report_rows(bulk_index=...)
+  for row in store.breakdown_rows(keywords, "page"):    # 每個關鍵字 × 頁面
+      ...
+"""
+import os
+from array import array
+
+from gsc_bulkstore import BulkStore
+from gsc_keyword_report import iter_bulk_rows, normalize_keyword
+
+EXTRA_DIMENSIONS = ("page", "device", "country")
+METRIC_FIELDS = ["clicks", "impressions", "position"]
+
+
+class DimensionStore:
+    """多維度 rows 的精簡表示：每個維度的值只保存一次（值 -> 代碼），每列只存代碼與數值的 array。
+
+    query 維度的值以 normalize_keyword 正規化後保存，正規化後相同的 query 彙總時會合併。
+    """
+
+    def __init__(self, dimensions):
+        self.dimensions = list(dimensions)
+        self._codes = {d: {} for d in self.dimensions}
+        self._values = {d: [] for d in self.dimensions}
+        self._columns = {d: array("I") for d in self.dimensions}
+        self._clicks = array("q")
+        self._impressions = array("q")
+        self._positions = array("d")
+
+    def _code(self, dimension, value):
+        codes = self._codes[dimension]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self._values[dimension])
+            self._values[dimension].append(value)
+        return code
+
+    def add(self, keys, clicks, impressions, position):
+        """加入一列；keys 的順序與 dimensions 相同。"""
+        for d, value in zip(self.dimensions, keys):
+            self._columns[d].append(self._code(d, normalize_keyword(value) if d == "query" else value))
+        self._clicks.append(int(clicks or 0))
+        self._impressions.append(int(impressions or 0))
+        self._positions.append(float(position or 0.0))
+
+    def add_rows(self, rows):
+        for r in rows:
+            keys = r.get("keys", [])
+            if len(keys) == len(self.dimensions):
+                self.add(keys, r.get("clicks", 0), r.get("impressions", 0), r.get("position", 0.0))
+        return self
+
+    def __len__(self):
+        return len(self._clicks)
+
+    def rollup(self, by=("query",)):
+        """依 by 中的維度彙總，回傳 {(值, ...): {"clicks", "impressions", "position"}}，依 clicks 由高到低排列。"""
+        columns = [self._columns[d] for d in by]
+        values = [self._values[d] for d in by]
+        groups = {}
+        for i in range(len(self._clicks)):
+            key = tuple(col[i] for col in columns)
+            acc = groups.get(key)
+            if acc is None:
+                acc = groups[key] = [0, 0, 0.0, 0.0, 0]
+            impressions = self._impressions[i]
+            acc[0] += self._clicks[i]
+            acc[1] += impressions
+            acc[2] += self._positions[i] * impressions
+            acc[3] += self._positions[i]
+            acc[4] += 1
+        out = {}
+        for key, (clicks, impressions, weighted, total, n) in sorted(groups.items(), key=lambda kv: (-kv[1][0], -kv[1][1])):
+            position = weighted / impressions if impressions else total / n
+            out[tuple(v[c] for v, c in zip(values, key))] = {
+                "clicks": clicks, "impressions": impressions, "position": round(position, 2),
+            }
+        return out
+
+    def query_index(self):
+        """每個 query 的彙總結果，格式與 build_bulk_index 相同，可直接交給 collect_report_rows(bulk_index=...)。"""
+        index = BulkStore()
+        for (query,), rec in self.rollup(("query",)).items():
+            index.add(query, dict(rec, query=query))
+        return index
+
+    def breakdown_rows(self, keywords, dimension):
+        """依 keywords 順序，yield 每個關鍵字在 dimension 各個值的彙總列（同一關鍵字內依 clicks 由高到低）。
+
+        keywords 應已去除重複；沒有出現在資料中的關鍵字不會輸出。
+        """
+        by_query = {}
+        for (query, value), rec in self.rollup(("query", dimension)).items():
+            by_query.setdefault(query, []).append((value, rec))
+        for kw in keywords:
+            for value, rec in by_query.get(normalize_keyword(kw), ()):
+                yield {"keyword": kw, dimension: value, **rec}
+
+
+def fetch_dimension_store(service, site_url, start_date, end_date, dimensions, row_limit=25000, max_rows=None):
+    """以 ["query", *dimensions] 分頁下載（同 iter_bulk_rows 的 row_limit / max_rows），回傳 DimensionStore。"""
+    dims = ["query", *dimensions]
+    return DimensionStore(dims).add_rows(iter_bulk_rows(service, site_url, start_date, end_date, row_limit, max_rows,
+                                                        dimensions=dims))
+
+
+def parse_dimensions(text):
+    """解析 "page,device"，回傳維度 list；不支援的維度丟出 ValueError。"""
+    dims = [d.strip().lower() for d in text.split(",") if d.strip()]
+    unknown = [d for d in dims if d not in EXTRA_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"不支援的維度：{', '.join(unknown)}（可用 {', '.join(EXTRA_DIMENSIONS)}）")
+    return list(dict.fromkeys(dims))
+
+
+def breakdown_output_path(path, dimension):
+    # report.csv -> report.by-page.csv
+    root, ext = os.path.splitext(path)
+    return f"{root}.by-{dimension}{ext}"
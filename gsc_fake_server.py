@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+gsc_fake_server.py
+
+本機的 Search Console 替身 HTTP server，以合成資料實作 searchanalytics.query，讓 gsc_keyword_report 的
+實際 API 程式碼路徑（分頁、批次 regex、重試、並行、快取）可以在離線環境中端對端量測。
+
+支援：
+- rowLimit（上限 25000）/ startRow 分頁
+- dimensions：query、date（date 依日期展開，每個 query 每天的數值固定，任意區間的加總一致）、
+  page / device / country（每個 query 固定拆成 2 個 page、3 種 device、3 個 country，各區段加總等於該 query 的數值）
+- dimensionFilterGroups：equals / notEquals / contains / notContains / includingRegex / excludingRegex
+  （與 API 相同：contains / notContains 不分大小寫，其餘區分大小寫；regex 需加上 (?i) 才不分大小寫）
+- 每個請求的延遲（--latency / --jitter）
+- 注入 429：隨機比例（--error-rate）或超過每秒配額（--qps）時回傳 429 與 Retry-After
+- GET /stats 回傳請求數、429 數、回傳列數
+
+用法：
+  python gsc_fake_server.py --port 8080 --queries 100000 --latency 0.05 --error-rate 0.02
+  python gsc_keyword_report.py --api-endpoint http://127.0.0.1:8080/ --property https://example.com/ ...
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rate_limiter import TokenBucket
+
+MAX_ROW_LIMIT = 25000
+MAX_FILTER_EXPRESSION = 4096
+SUPPORTED_DIMENSIONS = ("query", "date", "page", "device", "country")
+# 每個 query 在 page / device / country 維度下的區段與權重；page 的值由 query 產生
+SEGMENT_WEIGHTS = {
+    "page": (("", 0.7), ("blog/", 0.3)),
+    "device": (("MOBILE", 0.6), ("DESKTOP", 0.35), ("TABLET", 0.05)),
+    "country": (("twn", 0.7), ("usa", 0.2), ("jpn", 0.1)),
+}
+QUERY_PATH_RE = re.compile(r"^/webmasters/v3/sites/(?P<site>[^/]+)/searchAnalytics/query")
+
+
+class RequestError(Exception):
+    """對應 API 的 4xx 回應。"""
+
+    def __init__(self, status, message, reason="invalidParameter", headers=None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.headers = headers or {}
+
+
+def _stable_random(text, seed):
+    # 與 PYTHONHASHSEED 無關的穩定亂數，同一組 (query, seed) 每次產生相同數值
+    digest = hashlib.sha256(f"{seed}:{text}".encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+class SyntheticDataset:
+    """合成的 query 資料：每個 query 每天有固定的 clicks / impressions / position，依每日 clicks 由高到低排序。"""
+
+    def __init__(self, queries, seed=0):
+        rows = []
+        for q in dict.fromkeys(queries):
+            rng = _stable_random(q, seed)
+            impressions = int(rng.paretovariate(1.16) * 3)
+            clicks = int(impressions * rng.random() * 0.3)
+            rows.append((q, clicks, impressions, round(rng.uniform(1, 60), 1)))
+        rows.sort(key=lambda r: (-r[1], -r[2], r[0]))
+        self.rows = rows
+        self._by_query = {r[0]: r for r in rows}
+        self._filter_cache = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def generate(cls, size, seed=0, prefix="synthetic keyword"):
+        return cls([f"{prefix} {i}" for i in range(size)], seed)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def filtered(self, groups):
+        """套用 dimensionFilterGroups（各 filter 之間為 AND），回傳符合的每日基準列。"""
+        filters = []
+        for group in groups or []:
+            if group.get("groupType", "and").lower() != "and":
+                raise RequestError(400, "Only groupType 'and' is supported")
+            for f in group.get("filters", []):
+                if f.get("dimension") != "query":
+                    raise RequestError(400, f"Unsupported filter dimension: {f.get('dimension')}")
+                expression = f.get("expression", "")
+                if len(expression) > MAX_FILTER_EXPRESSION:
+                    raise RequestError(400, "Filter expression is too long")
+                filters.append((f.get("operator", "equals"), expression))
+        if not filters:
+            return self.rows
+        key = tuple(filters)
+        with self._lock:
+            hit = self._filter_cache.get(key)
+        if hit is not None:
+            return hit
+        rows = None
+        # equals 以索引直接查詢，不必掃描全部資料
+        for op, expr in filters:
+            if op == "equals":
+                row = self._by_query.get(expr)
+                rows = [row] if row is not None and (rows is None or row in rows) else []
+        if rows is None:
+            rows = self.rows
+        for op, expr in filters:
+            rows = [r for r in rows if _match(op, expr, r[0])]
+        with self._lock:
+            if len(self._filter_cache) > 10000:
+                self._filter_cache.clear()
+            self._filter_cache[key] = rows
+        return rows
+
+    def query(self, body):
+        """依請求 body 回傳 API 格式的 {"rows": [...]}。"""
+        dims = body.get("dimensions") or []
+        for d in dims:
+            if d not in SUPPORTED_DIMENSIONS:
+                raise RequestError(400, f"Unsupported dimension: {d}")
+        row_limit = int(body.get("rowLimit", 1000))
+        if row_limit < 1 or row_limit > MAX_ROW_LIMIT:
+            raise RequestError(400, f"rowLimit must be between 1 and {MAX_ROW_LIMIT}")
+        start_row = int(body.get("startRow", 0))
+        try:
+            start = date.fromisoformat(body["startDate"])
+            end = date.fromisoformat(body["endDate"])
+        except (KeyError, ValueError):
+            raise RequestError(400, "startDate and endDate are required (YYYY-MM-DD)") from None
+        if end < start:
+            return {}
+        days = (end - start).days + 1
+        base = self.filtered(body.get("dimensionFilterGroups"))
+        segment_dims = [d for d in dims if d in SEGMENT_WEIGHTS]
+        # 每個 query 展開成 per_query 個區段；第 i 列為第 i // per_day 天、第 (i % per_day) // per_query 個 query 的
+        # 第 i % per_query 個區段（沒有 date 維度時只有一天，數值乘上天數）
+        per_query = 1
+        for d in segment_dims:
+            per_query *= len(SEGMENT_WEIGHTS[d])
+        per_day = len(base) * per_query
+        total = days * per_day if "date" in dims else per_day
+        multiplier = 1 if "date" in dims else days
+        out = []
+        for i in range(start_row, min(total, start_row + row_limit)):
+            day_index, rem = divmod(i, per_day)
+            q, clicks, impressions, position = base[rem // per_query]
+            values = {"query": q, "date": (start + timedelta(days=day_index)).isoformat()}
+            clicks, impressions = clicks * multiplier, impressions * multiplier
+            if segment_dims:
+                segment, clicks, impressions, position = _segment(q, clicks, impressions, position, segment_dims, rem % per_query)
+                values.update(segment)
+            out.append(_api_row([values[d] for d in dims], clicks, impressions, position))
+        return {"rows": out, "responseAggregationType": "byProperty"} if out else {"responseAggregationType": "byProperty"}
+
+
+def _split(total, weights):
+    # 依權重把整數拆開且總和不變（最大餘數法）
+    shares = [total * w for w in weights]
+    parts = [int(s) for s in shares]
+    order = sorted(range(len(weights)), key=lambda j: parts[j] - shares[j])
+    for j in order[:total - sum(parts)]:
+        parts[j] += 1
+    return parts
+
+
+def _segment(query, clicks, impressions, position, segment_dims, index):
+    """第 index 個 (page, device, country) 組合的值與數值；同一個 query 所有區段的 clicks / impressions 加總等於原值。"""
+    combos = [{}]
+    weights = [1.0]
+    for d in segment_dims:
+        combos = [dict(c, **{d: v}) for c in combos for v, _ in SEGMENT_WEIGHTS[d]]
+        weights = [w * dw for w in weights for _, dw in SEGMENT_WEIGHTS[d]]
+    values = combos[index]
+    if "page" in values:
+        values["page"] = "https://example.com/" + values["page"] + "-".join(query.split())
+    return values, _split(clicks, weights)[index], _split(impressions, weights)[index], round(position + index * 0.5, 1)
+
+
+def _match(op, expr, query):
+    if op == "equals":
+        return query == expr
+    if op == "notEquals":
+        return query != expr
+    if op == "contains":
+        return expr.lower() in query.lower()
+    if op == "notContains":
+        return expr.lower() not in query.lower()
+    if op in ("includingRegex", "excludingRegex"):
+        # RE2 與 re 相同：預設區分大小寫，運算式開頭的 (?i) 才不分大小寫
+        found = re.search(expr, query) is not None
+        return found if op == "includingRegex" else not found
+    raise RequestError(400, f"Unsupported operator: {op}")
+
+
+def _api_row(keys, clicks, impressions, position):
+    return {
+        "keys": keys,
+        "clicks": clicks,
+        "impressions": impressions,
+        "ctr": clicks / impressions if impressions else 0.0,
+        "position": position,
+    }
+
+
+class FakeSearchConsoleServer:
+    """在背景 thread 執行的替身 server；endpoint 可直接傳給 --api-endpoint 或 AsyncSearchConsoleClient。"""
+
+    def __init__(self, dataset, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0, qps=None,
+                 retry_after=1, seed=0, keep_bodies=1000):
+        self.dataset = dataset
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self._bucket = TokenBucket(qps) if qps else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.rows_returned = 0
+        # 只保留最近 keep_bodies 個請求 body 供測試檢查，長時間執行時記憶體用量不會成長
+        self.bodies = deque(maxlen=keep_bodies)
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def endpoint(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        # 在目前 thread 執行（命令列模式），Ctrl+C 結束
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "throttled": self.throttled, "rows_returned": self.rows_returned}
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = self.throttled = self.rows_returned = 0
+            self.bodies.clear()
+
+    def _admit(self):
+        # 依設定決定這個請求是否回 429：先檢查每秒配額，再依比例隨機注入
+        with self._lock:
+            self.requests += 1
+            throttled = False
+            if self._bucket is not None:
+                self._bucket.refill()
+                if self._bucket.wait_time() > 0:
+                    throttled = True
+                else:
+                    self._bucket.tokens -= 1
+            if not throttled and self.error_rate and self._rng.random() < self.error_rate:
+                throttled = True
+            if throttled:
+                self.throttled += 1
+                raise RequestError(429, "Quota exceeded for quota metric 'Queries'", reason="rateLimitExceeded",
+                                   headers={"Retry-After": str(self.retry_after)})
+
+    def handle_query(self, body):
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        self._admit()
+        resp = self.dataset.query(body)
+        with self._lock:
+            self.bodies.append(body)
+            self.rows_returned += len(resp.get("rows", []))
+        return resp
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 標頭與內容分兩次寫出，未關閉 Nagle 時 keep-alive 連線每個請求會多等 ~40ms 的 delayed ACK
+            disable_nagle_algorithm = True
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/stats":
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(404, _error_payload(404, "Not found", "notFound"))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                m = QUERY_PATH_RE.match(self.path)
+                if m is None:
+                    self._send_json(404, _error_payload(404, "Not found", "notFound"))
+                    return
+                try:
+                    body = json.loads(raw or b"{}")
+                    resp = server.handle_query(body)
+                except RequestError as exc:
+                    self._send_json(exc.status, _error_payload(exc.status, str(exc), exc.reason), exc.headers)
+                    return
+                except ValueError as exc:
+                    self._send_json(400, _error_payload(400, f"Invalid request: {exc}", "parseError"))
+                    return
+                self._send_json(200, resp)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def _error_payload(status, message, reason):
+    return {"error": {"code": status, "message": message, "errors": [{"message": message, "reason": reason}]}}
+
+
+def load_dataset(queries=10000, keywords=None, coverage=1.0, seed=0):
+    """建立合成資料：keywords 檔中 coverage 比例的關鍵字會出現在資料中，另加 queries 個合成 query。"""
+    names = []
+    if keywords:
+        from gsc_keyword_report import load_keywords
+
+        kws = load_keywords(keywords)
+        names.extend(kw for kw in kws if _stable_random(kw, seed).random() < coverage)
+    names.extend(f"synthetic keyword {i}" for i in range(queries))
+    return SyntheticDataset(names, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本機 Search Console 替身 server（合成資料）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--queries", type=int, default=10000, help="合成 query 數 (預設 10000)")
+    parser.add_argument("--keywords", default=None, help="關鍵字 CSV；其中 --coverage 比例的關鍵字會出現在資料中")
+    parser.add_argument("--coverage", type=float, default=0.8, help="關鍵字出現在資料中的比例 (預設 0.8)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="每個請求的延遲秒數")
+    parser.add_argument("--jitter", type=float, default=0.0, help="額外隨機延遲的上限秒數")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="隨機回傳 429 的比例 (0~1)")
+    parser.add_argument("--qps", type=float, default=None, help="每秒配額，超過時回傳 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="429 回應的 Retry-After 秒數 (預設 1)")
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.queries, args.keywords, args.coverage, args.seed)
+    server = FakeSearchConsoleServer(dataset, args.host, args.port, latency=args.latency, jitter=args.jitter,
+                                     error_rate=args.error_rate, qps=args.qps, retry_after=args.retry_after,
+                                     seed=args.seed)
+    print(f"替身 server 已啟動：{server.endpoint}（{len(dataset)} 個 query），Ctrl+C 結束")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"統計：{server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
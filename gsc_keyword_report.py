@@ -12,40 +12,49 @@ gsc_keyword_report.py
 
 請先參考 README.md 進行 API 設定。
 """
-# for PyInstaller: 強制 import 重要 Google API 子模組，避免 frozen exe 缺包
-try:
-    import googleapiclient.discovery
-    import googleapiclient.errors
-    import google.oauth2.service_account
-    import google.auth.transport.requests
-except ImportError:
-    pass
+# Google API 套件 import 需要數百 ms，只在實際認證 / 建立 service 時才載入（見 _import_google、build），
+# --help、--mock 與本機工具不必付出這段啟動時間；PyInstaller 的 hiddenimports 已列出這些模組。
 import argparse
 import csv
+import hashlib
 import os
+import re
 import sys
 import time
 import random
-from collections import defaultdict
-
-has_google = True
-try:
-    from google.oauth2 import service_account
-    from google_auth_oauthlib.flow import InstalledAppFlow
-    from googleapiclient.discovery import build
-except Exception:
-    # 不要在 import 錯誤時立即退出 — 允許使用 --mock 模式在沒有套件時測試
-    has_google = False
-    # 顯示簡短提示，後續若嘗試呼叫 API 會再提示錯誤
-    print("警告: 找不到 Google API 套件；若要呼叫 GSC API，請先安裝 requirements.txt 裡的套件。")
+import threading
+import unicodedata
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from gsc_bulkstore import BulkStore
+from gsc_retry import AdaptiveConcurrency, RetryPolicy
+from rate_limiter import RateLimiter
 
 SCOPES = ["https://www.googleapis.com/auth/webmasters.readonly"]
 
 
-def authenticate(service_account_file=None, delegated_user=None, oauth_client_file=None):
-    if not has_google:
-        print("缺少 Google API 套件，無法進行認證。若要測試請使用 --mock 模式。")
+def _import_google():
+    """載入認證用的 Google API 套件；缺少套件時提示並結束（--mock 模式不需要這些套件）。"""
+    try:
+        from google.oauth2 import service_account
+        from google_auth_oauthlib.flow import InstalledAppFlow
+    except ImportError:
+        print("缺少 Google API 套件，無法進行認證。請先安裝 requirements.txt 裡的套件，若要測試請使用 --mock 模式。")
         sys.exit(1)
+    return service_account, InstalledAppFlow
+
+
+def build(*args, **kwargs):
+    """googleapiclient.discovery.build，於第一次建立 service 時才載入 googleapiclient。"""
+    from googleapiclient.discovery import build as discovery_build
+
+    return discovery_build(*args, **kwargs)
+
+
+def authenticate(service_account_file=None, delegated_user=None, oauth_client_file=None):
+    service_account, InstalledAppFlow = _import_google()
     if service_account_file and os.path.exists(service_account_file):
         creds = service_account.Credentials.from_service_account_file(
             service_account_file, scopes=SCOPES
@@ -64,32 +73,153 @@ def authenticate(service_account_file=None, delegated_user=None, oauth_client_fi
     sys.exit(1)
 
 
-def fetch_bulk_queries(service, site_url, start_date, end_date, row_limit=25000):
+class ServiceWrapper:
+    """包裝 service.searchanalytics().query(siteUrl=..., body=...).execute() 呼叫鏈。
+
+    子類別覆寫 _execute 即可在實際請求前後加入限速、快取等行為，可層層疊加；
+    本模組的 fetch 函式都只透過這條呼叫鏈存取 service。
+    """
+
+    def __init__(self, service):
+        self._service = service
+
+    def searchanalytics(self):
+        return self
+
+    def query(self, siteUrl, body):
+        return _WrappedRequest(self, siteUrl, body)
+
+    def _execute(self, site_url, body):
+        return self._service.searchanalytics().query(siteUrl=site_url, body=body).execute()
+
+
+class _WrappedRequest:
+    def __init__(self, wrapper, site_url, body):
+        self._wrapper = wrapper
+        self._site_url = site_url
+        self._body = body
+
+    def execute(self):
+        return self._wrapper._execute(self._site_url, self._body)
+
+
+class ThrottledService(ServiceWrapper):
+    """每個實際送出的請求都先向共用的 RateLimiter 取得 token。"""
+
+    def __init__(self, service, limiter):
+        super().__init__(service)
+        self.limiter = limiter
+
+    def _execute(self, site_url, body):
+        self.limiter.acquire()
+        return super()._execute(site_url, body)
+
+
+class RetryingService(ServiceWrapper):
+    """遇到 429 / 5xx 等暫時性錯誤時依 RetryPolicy 重試；concurrency 依節流情況限制同時進行的請求數。"""
+
+    def __init__(self, service, policy, concurrency=None):
+        super().__init__(service)
+        self.policy = policy
+        self.concurrency = concurrency
+
+    def _execute(self, site_url, body):
+        def attempt():
+            if self.concurrency is not None:
+                return self.concurrency.guarded(lambda: ServiceWrapper._execute(self, site_url, body))
+            return ServiceWrapper._execute(self, site_url, body)
+        return self.policy.call(attempt)
+
+
+class SharedService(ServiceWrapper):
+    """讓多個 thread 共用同一個 service 物件與憑證。
+
+    googleapiclient 的 service 底層 httplib2 連線不是 thread-safe，因此每個 thread 以自己的
+    AuthorizedHttp 執行請求（execute(http=...)），不必為每個 thread 重新 build service。
+    """
+
+    def __init__(self, service, credentials):
+        super().__init__(service)
+        self._credentials = credentials
+        self._local = threading.local()
+
+    def _http(self):
+        http = getattr(self._local, "http", None)
+        if http is None:
+            import google_auth_httplib2
+            import httplib2
+            http = self._local.http = google_auth_httplib2.AuthorizedHttp(self._credentials, http=httplib2.Http())
+        return http
+
+    def _execute(self, site_url, body):
+        if self._credentials is None:
+            return super()._execute(site_url, body)
+        return self._service.searchanalytics().query(siteUrl=site_url, body=body).execute(http=self._http())
+
+
+def build_service_stack(creds, limiter, retry, concurrency=None, cache=None, refresh_cache=False, api_endpoint=None):
+    """建立一次 service，疊上共用 / 限速 / 重試 / 快取各層；回傳的物件可被多個 thread 同時使用。
+
+    限速在重試之內：每次重送都要重新取得 token；快取在最外層：命中時不佔用配額。
+    api_endpoint 可指向本機替身 server（gsc_fake_server.py），此時可不提供憑證。
+    """
+    if api_endpoint:
+        if creds is None:
+            from google.auth.credentials import AnonymousCredentials
+            creds = AnonymousCredentials()
+        svc = build("searchconsole", "v1", credentials=creds, client_options={"api_endpoint": api_endpoint})
+    else:
+        svc = build("searchconsole", "v1", credentials=creds)
+    svc = SharedService(svc, creds)
+    svc = ThrottledService(svc, limiter)
+    svc = RetryingService(svc, retry, concurrency)
+    if cache is not None:
+        from gsc_cache import CachedService
+        svc = CachedService(svc, cache, refresh=refresh_cache)
+    return svc
+
+
+# Search Analytics 單次請求 rowLimit 的上限
+MAX_ROW_LIMIT = 25000
+
+
+def _empty_record(keyword):
+    return {
+        "query": keyword,
+        "clicks": 0,
+        "impressions": 0,
+        "position": 0.0,
+    }
+
+
+def _row_to_record(r):
+    keys = r.get("keys", [])
+    if not keys:
+        return None
+    return {
+        "query": keys[0],
+        "clicks": r.get("clicks", 0),
+        "impressions": r.get("impressions", 0),
+        "position": r.get("position", 0.0),
+    }
+
+
+def bulk_query_body(start_date, end_date, row_limit, start_row=0, dimension_filter_groups=None, dimensions=None):
     body = {
         "startDate": start_date,
         "endDate": end_date,
-        "dimensions": ["query"],
+        "dimensions": list(dimensions or ["query"]),
         "rowLimit": row_limit,
+        "startRow": start_row,
     }
-    resp = service.searchanalytics().query(siteUrl=site_url, body=body).execute()
-    rows = resp.get("rows", [])
-    result = {}
-    for r in rows:
-        keys = r.get("keys", [])
-        if not keys:
-            continue
-        key = keys[0]
-        result[key.lower()] = {
-            "query": key,
-            "clicks": r.get("clicks", 0),
-            "impressions": r.get("impressions", 0),
-            "position": r.get("position", 0.0),
-        }
-    return result
+    if dimension_filter_groups:
+        body["dimensionFilterGroups"] = dimension_filter_groups
+    return body
 
 
-def fetch_exact_query(service, site_url, start_date, end_date, keyword):
-    body = {
+def exact_query_body(start_date, end_date, keyword):
+    # equals 以儲存的 query 逐字比對：送出使用者的原始寫法（只去除頭尾空白），正規化只用於去重與比對回傳的 rows
+    return {
         "startDate": start_date,
         "endDate": end_date,
         "dimensions": ["query"],
@@ -97,153 +227,757 @@ def fetch_exact_query(service, site_url, start_date, end_date, keyword):
             {
                 "groupType": "and",
                 "filters": [
-                    {"dimension": "query", "operator": "equals", "expression": keyword}
+                    {"dimension": "query", "operator": "equals", "expression": keyword.strip()}
                 ],
             }
         ],
         "rowLimit": 1,
     }
+
+
+def iter_bulk_rows(service, site_url, start_date, end_date, row_limit=25000, max_rows=None, dimension_filter_groups=None, dimensions=None):
+    """以 startRow 逐頁請求 query 資料並逐筆 yield（generator）。
+
+    每頁最多 row_limit 筆（上限 25000）；當某頁回傳筆數少於請求數（API 已無資料）
+    或累計達 max_rows 時停止。呼叫端提早結束迭代時不會再送出後續頁面的請求。
+    dimensions 預設為 ["query"]，row 的 keys 順序與 dimensions 相同。
+    """
+    page_size = max(1, min(int(row_limit), MAX_ROW_LIMIT))
+    start_row = 0
+    while True:
+        limit = page_size
+        if max_rows is not None:
+            remaining = max_rows - start_row
+            if remaining <= 0:
+                return
+            limit = min(limit, remaining)
+        body = bulk_query_body(start_date, end_date, limit, start_row, dimension_filter_groups, dimensions)
+        resp = service.searchanalytics().query(siteUrl=site_url, body=body).execute()
+        rows = resp.get("rows", [])
+        for r in rows:
+            yield r
+        start_row += len(rows)
+        if len(rows) < limit:
+            return
+
+
+def normalize_keyword(text):
+    """比對用的關鍵字正規化：NFKC（全形轉半形、相容字元合併）、casefold、連續空白合併為單一空白並去除頭尾空白。
+
+    bulk 結果的索引與關鍵字查找都經過此函式，「ＩＰＨＯＮＥ　１５」與「iphone  15」會視為同一個 query。
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def dedupe_keywords(keywords):
+    """依 normalize_keyword 去除重複，保留每個關鍵字第一次出現的原始寫法與順序。"""
+    seen = set()
+    unique = []
+    for kw in keywords:
+        key = normalize_keyword(kw)
+        if key not in seen:
+            seen.add(key)
+            unique.append(kw)
+    return unique
+
+
+class FanOut:
+    """把去重後查詢得到的列，依原始清單順序展開到每一次出現的關鍵字（keyword 欄保留各自的原始寫法）。
+
+    put(row) 需依去重後的順序呼叫；某個關鍵字最後一次出現輸出後即釋放其結果，不會保留所有結果。
+    """
+
+    def __init__(self, keywords, emit):
+        self._keywords = keywords
+        self._keys = [normalize_keyword(kw) for kw in keywords]
+        self._last = {key: i for i, key in enumerate(self._keys)}
+        self._resolved = {}
+        self._next = 0
+        self._emit = emit
+
+    def put(self, row):
+        self._resolved[normalize_keyword(row["keyword"])] = row
+        while self._next < len(self._keys) and self._keys[self._next] in self._resolved:
+            i = self._next
+            key = self._keys[i]
+            row = self._resolved[key]
+            self._emit(row if row["keyword"] == self._keywords[i] else dict(row, keyword=self._keywords[i]))
+            if self._last[key] == i:
+                del self._resolved[key]
+            self._next += 1
+
+
+def fetch_bulk_queries(service, site_url, start_date, end_date, row_limit=25000, paginate=False, max_rows=None):
+    # paginate=False 時維持原本行為：只取第一頁（最多 row_limit 筆）
+    if not paginate:
+        max_rows = row_limit
+    return build_bulk_index(iter_bulk_rows(service, site_url, start_date, end_date, row_limit, max_rows))
+
+
+def build_bulk_index(rows):
+    """把 bulk rows 建成以 normalize_keyword 後的 query 為 key 的 BulkStore（正規化後相同時保留先出現的一筆）。
+
+    BulkStore 的查找方式與 dict 相同，但數值存在 array 中，數百萬列時記憶體用量遠低於 dict of dicts。
+    """
+    store = BulkStore()
+    for r in rows:
+        rec = _row_to_record(r)
+        if rec is None:
+            continue
+        store.add(normalize_keyword(rec["query"]), rec)
+    return store
+
+
+def match_bulk_rows(rows, keywords):
+    """邊接收 bulk rows 邊比對關鍵字清單，只保留命中的 query。
+
+    回傳 (matched, scanned)：matched 以 normalize_keyword 後的 query 為 key（多個 query 正規化後相同時保留先出現、
+    即點擊較高的一筆）；所有關鍵字都命中後即停止讀取 rows，搭配 iter_bulk_rows 時可省下後續分頁請求。
+    """
+    pending = {normalize_keyword(kw) for kw in keywords}
+    matched = {}
+    scanned = 0
+    for r in rows:
+        scanned += 1
+        rec = _row_to_record(r)
+        if rec is None:
+            continue
+        key = normalize_keyword(rec["query"])
+        if key in pending:
+            matched[key] = rec
+            pending.discard(key)
+            if not pending:
+                break
+    return matched, scanned
+
+
+def fetch_exact_query(service, site_url, start_date, end_date, keyword):
+    body = exact_query_body(start_date, end_date, keyword)
     resp = service.searchanalytics().query(siteUrl=site_url, body=body).execute()
     rows = resp.get("rows", [])
     if not rows:
         # 修正：即使沒有數據，也回傳包含查詢關鍵字的 dict，確保關鍵字不遺失
-        return {
-            "query": keyword,
-            "clicks": 0,
-            "impressions": 0,
-            "position": 0.0,
-        }
-    r = rows[0]
+        return _empty_record(keyword)
     # 確認回傳的 query 與輸入的 keyword 相符
-    keys = r.get("keys", [])
-    if not keys:
-        return {
-            "query": keyword,
-            "clicks": 0,
-            "impressions": 0,
-            "position": 0.0,
+    return _row_to_record(rows[0]) or _empty_record(keyword)
+
+
+# includingRegex 過濾運算式的長度上限（Search Console 限制）
+MAX_FILTER_EXPRESSION = 4096
+_REGEX_SPECIAL = set("\\.^$|?*+()[]{}")
+
+
+def _regex_escape(text):
+    # 只跳脫 RE2 的特殊字元；re.escape 會連空白等字元一起跳脫，不適用於 API 的 RE2 語法
+    return "".join("\\" + ch if ch in _REGEX_SPECIAL else ch for ch in text)
+
+
+def _keywords_regex(keywords):
+    # API 的 RE2 預設區分大小寫，加上 (?i) 讓大小寫不同的寫法也能命中；關鍵字本身與 equals 相同只去除頭尾空白
+    return "(?i)^(" + "|".join(_regex_escape(k.strip()) for k in keywords) + ")$"
+
+
+def build_keyword_batches(keywords, batch_size=100, max_expression=MAX_FILTER_EXPRESSION):
+    """把關鍵字切成多批，每批組成的 regex 不超過 max_expression 字元、最多 batch_size 個關鍵字。"""
+    batch = []
+    length = len(_keywords_regex([]))
+    for kw in keywords:
+        piece = len(_regex_escape(kw.strip())) + 1
+        if batch and (len(batch) >= batch_size or length + piece > max_expression):
+            yield batch
+            batch = []
+            length = len(_keywords_regex([]))
+        batch.append(kw)
+        length += piece
+    if batch:
+        yield batch
+
+
+def keywords_filter_groups(keywords):
+    return [
+        {
+            "groupType": "and",
+            "filters": [
+                {"dimension": "query", "operator": "includingRegex", "expression": _keywords_regex(keywords)}
+            ],
         }
-    query_val = keys[0]
+    ]
+
+
+def needs_single_queries(keywords):
+    """只有一個關鍵字（equals 即可）或組成的 regex 超過長度上限時，批次改為逐一精確查詢。"""
+    return len(keywords) == 1 or len(_keywords_regex(keywords)) > MAX_FILTER_EXPRESSION
+
+
+def split_batch_rows(rows, keywords):
+    """把批次 regex 查詢回傳的 rows 依正規化後的 query 拆回 keywords 順序，未出現的關鍵字得到數值為 0 的紀錄。"""
+    found = {}
+    for r in rows:
+        rec = _row_to_record(r)
+        if rec is not None:
+            found.setdefault(normalize_keyword(rec["query"]), rec)
+    return [found.get(normalize_keyword(kw)) or _empty_record(kw) for kw in keywords]
+
+
+def fetch_exact_batch(service, site_url, start_date, end_date, keywords):
+    """以單一 includingRegex 請求一次查詢多個關鍵字，回傳與 keywords 順序一致的結果清單。
+
+    未出現在回傳 rows 的關鍵字會得到數值為 0 的紀錄，與 fetch_exact_query 相同。
+    """
+    if needs_single_queries(keywords):
+        return [fetch_exact_query(service, site_url, start_date, end_date, kw) for kw in keywords]
+    groups = keywords_filter_groups(keywords)
+    return split_batch_rows(
+        iter_bulk_rows(service, site_url, start_date, end_date, MAX_ROW_LIMIT, dimension_filter_groups=groups), keywords)
+
+
+def run_exact_queries(service_factory, site_url, start_date, end_date, items, fetch=fetch_exact_query, workers=1, on_result=None):
+    """以 thread pool 並行呼叫 fetch(service, site_url, start_date, end_date, item)，結果順序與 items 相同。
+
+    每個 worker thread 第一次執行時呼叫 service_factory() 取得要使用的 service：報表流程傳入 lambda: service，
+    所有 thread 共用 build_service_stack 建立的同一組 service（SharedService 讓共用的 googleapiclient 物件可跨 thread 使用，
+    ThrottledService 以同一個 RateLimiter 限速）；需要各自獨立的 service 時可讓 service_factory 每次建立新的。
+    on_result(item, result) 會在呼叫端 thread 依 items 順序、於每個結果可用時立即呼叫（例如寫入 checkpoint）；
+    指定 on_result 時不保留結果（回傳 None），同時等待中的工作最多 workers * 4 個，記憶體用量不隨 items 數量成長。
+    """
+    local = threading.local()
+
+    def task(item):
+        service = getattr(local, "service", None)
+        if service is None:
+            service = local.service = service_factory()
+        return fetch(service, site_url, start_date, end_date, item)
+
+    results = []
+    deliver = on_result or (lambda item, result: results.append(result))
+    window = max(1, workers) * 4
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for item in items:
+            pending.append((item, pool.submit(task, item)))
+            if len(pending) >= window:
+                done_item, future = pending.popleft()
+                deliver(done_item, future.result())
+        while pending:
+            done_item, future = pending.popleft()
+            deliver(done_item, future.result())
+    return None if on_result is not None else results
+
+
+def _result_row(keyword, d, found_by):
     return {
-        "query": query_val,
-        "clicks": r.get("clicks", 0),
-        "impressions": r.get("impressions", 0),
-        "position": r.get("position", 0.0),
+        "keyword": keyword,
+        "clicks": d["clicks"],
+        "impressions": d["impressions"],
+        "position": d["position"],
+        "found_by": found_by,
     }
 
 
-def load_keywords(path):
+def emit_bulk_hits(keywords, bulk, emit):
+    """依關鍵字順序輸出 bulk 命中的列，回傳未命中、需要補查的關鍵字。
+
+    單純 lower() 比對不到、靠正規化（全形、多餘空白、NFKC 變體）才命中的關鍵字會另外統計，這些原本都會變成精確查詢。
+    """
+    missing = []
+    rescued = 0
+    for kw in keywords:
+        rec = bulk.get(normalize_keyword(kw))
+        if rec is None:
+            missing.append(kw)
+            continue
+        if rec["query"].lower() != kw.lower():
+            rescued += 1
+        emit(_result_row(kw, rec, "bulk"))
+    if rescued:
+        print(f"正規化比對（全形 / 空白 / Unicode 變體）多命中 {rescued} 個關鍵字，省下 {rescued} 次精確查詢")
+    return missing
+
+
+def collect_report_rows(service, site_url, start_date, end_date, keywords, row_limit=25000, max_rows=None,
+                        exact_mode="single", batch_size=100, workers=1, day_store=None, on_row=None, bulk_index=None,
+                        resolved=None):
+    """非 mock 的報表流程：bulk 比對後補查未命中的關鍵字，輸出列順序為 bulk 命中在前，其餘依關鍵字順序。
+
+    service 需可被多個 thread 共用（見 build_service_stack）；day_store 為每日資料庫路徑。
+    on_row(row) 會依輸出順序在每一列產生時立即呼叫（例如串流寫入報表與 checkpoint），此時結果不保留在記憶體中，
+    回傳輸出列數；未指定 on_row 時回傳所有輸出列的 list。
+    bulk_index 為已建好的 bulk 索引（見 build_bulk_index），指定時直接查表、不再下載 bulk 資料。
+    resolved 為 {_keyword_digest: (clicks, impressions, position, found_by)}：其中已有的未命中關鍵字直接沿用、不再查詢，
+    新查詢的結果也會寫入（分段模式跨段共用）。
+    """
+    out_rows = []
+    sink = on_row or out_rows.append
+    count = 0
+
+    def emit(row):
+        nonlocal count
+        count += 1
+        sink(row)
+
+    if bulk_index is not None:
+        bulk = {}
+        for kw in keywords:
+            key = normalize_keyword(kw)
+            if key in bulk_index:
+                bulk[key] = bulk_index[key]
+        print(f"bulk 索引命中 {len(bulk)} 個關鍵字")
+    else:
+        if day_store:
+            from gsc_daystore import DayStore
+            store = DayStore(day_store)
+            missing_days = store.missing_days(site_url, start_date, end_date)
+            print(f"每日資料庫：區間內缺少 {len(missing_days)} 天，下載後於本機彙總...")
+            store.sync(service, site_url, start_date, end_date, row_limit, max_rows)
+            rows = store.iter_range_rows(site_url, start_date, end_date)
+        else:
+            rows = iter_bulk_rows(service, site_url, start_date, end_date, row_limit, max_rows)
+        bulk, scanned = match_bulk_rows(rows, keywords)
+        if day_store:
+            store.close()
+        print(f"bulk 查詢讀取 {scanned} 筆 query 資料，命中 {len(bulk)} 個關鍵字")
+
+    missing = emit_bulk_hits(keywords, bulk, emit)
+    # 重複的關鍵字（含正規化後相同者）只查詢一次，結果再展開到每一次出現的位置
+    fan_out = FanOut(missing, emit)
+    occurrences = len(missing)
+    missing = dedupe_keywords(missing)
+    if len(missing) < occurrences:
+        print(f"未命中的關鍵字去除重複後剩 {len(missing)} 個，省下 {occurrences - len(missing)} 次重複查詢")
+
+    deliver = fan_out.put
+    if resolved is not None:
+        queued = []
+        for kw in missing:
+            known = resolved.get(_keyword_digest(kw))
+            if known is None:
+                queued.append(kw)
+            else:
+                deliver(dict(zip(("keyword", "clicks", "impressions", "position", "found_by"), (kw, *known))))
+        if len(queued) < len(missing):
+            print(f"{len(missing) - len(queued)} 個關鍵字沿用先前查詢的結果")
+        missing = queued
+
+        def deliver(row):
+            resolved[_keyword_digest(row["keyword"])] = (row["clicks"], row["impressions"], row["position"], row["found_by"])
+            fan_out.put(row)
+
+    if exact_mode == "batch":
+        batches = list(build_keyword_batches(missing, batch_size))
+        print(f"{len(missing)} 個關鍵字未在 bulk 結果中發現，將以批次 regex 查詢補上（{workers} 個 worker）")
+
+        def on_batch(batch, batch_results):
+            for kw, d in zip(batch, batch_results):
+                deliver(_result_row(kw, d, "batch"))
+
+        run_exact_queries(lambda: service, site_url, start_date, end_date, batches,
+                          fetch=fetch_exact_batch, workers=workers, on_result=on_batch)
+        print(f"批次查詢共送出 {len(batches)} 個請求（逐一查詢需 {len(missing)} 個）")
+    else:
+        print(f"{len(missing)} 個關鍵字未在 bulk 結果中發現，將以精確查詢補上（{workers} 個 worker）")
+
+        def on_exact(kw, d):
+            if d:
+                deliver(_result_row(kw, d, "exact"))
+            else:
+                deliver({"keyword": kw, "clicks": 0, "impressions": 0, "position": "", "found_by": "none"})
+
+        run_exact_queries(lambda: service, site_url, start_date, end_date, missing,
+                          workers=workers, on_result=on_exact)
+    return count if on_row is not None else out_rows
+
+
+def iter_keywords(path):
+    """逐列讀取關鍵字檔並逐一 yield 關鍵字（generator），不把整個檔案載入記憶體。
+
+    CSV 取每列第一欄並以逗號切分（支援整列逗號串接的關鍵字）；Parquet / Arrow 報表取 keyword（或 query）欄，
+    沒有則取第一欄，並以 record batch 為單位讀取。
+    """
+    from gsc_writer import is_columnar_path, iter_columnar_values
+
+    if is_columnar_path(path):
+        for v in iter_columnar_values(path, ("keyword", "query")):
+            if v is not None and str(v).strip():
+                yield str(v).strip()
+        return
     # 修正：處理好多列的逗號分隔關鍵字
-    kws = []
     with open(path, newline="", encoding="utf-8-sig") as fh:
-        reader = csv.reader(fh)
-        for row in reader:
+        for row in csv.reader(fh):
             if not row:
                 continue
             # 對每一列的第一個元素進行逗號切分
-            parts = [p.strip() for p in row[0].split(',') if p.strip()]
-            kws.extend(parts)
-    return kws
+            for p in row[0].split(','):
+                if p.strip():
+                    yield p.strip()
 
 
-def write_output(output_path, rows):
-    fieldnames = ["keyword", "clicks", "impressions", "position", "found_by"]
-    # 若輸出為 .xlsx，使用 pandas 寫入 Excel，否則寫 CSV
-    if output_path.lower().endswith(('.xlsx', '.xls')):
-        try:
-            import pandas as pd
+def load_keywords(path):
+    return list(iter_keywords(path))
+
+
+def _keyword_digest(keyword):
+    # 正規化後關鍵字的 64-bit 摘要；數百萬個關鍵字的碰撞機率可忽略，記憶體用量與關鍵字長度無關
+    return int.from_bytes(hashlib.blake2b(normalize_keyword(keyword).encode("utf-8"), digest_size=8).digest(), "big")
+
 
-            df = pd.DataFrame(rows, columns=fieldnames)
-            df.to_excel(output_path, index=False)
+def iter_unique_keywords(keywords):
+    """dedupe_keywords 的串流版本：只 yield 每個關鍵字（依 normalize_keyword）第一次出現的寫法。
+
+    已出現的關鍵字只記錄 64-bit 摘要而非字串本身，適合數百萬列、無法整份載入的關鍵字檔。
+    """
+    seen = set()
+    for kw in keywords:
+        digest = _keyword_digest(kw)
+        if digest not in seen:
+            seen.add(digest)
+            yield kw
+
+
+def iter_keyword_chunks(keywords, chunk_size):
+    """把關鍵字 iterable 切成每段最多 chunk_size 個的 list。"""
+    it = iter(keywords)
+    while True:
+        chunk = list(islice(it, max(1, chunk_size)))
+        if not chunk:
             return
-        except Exception:
-            # 若 pandas 不可用，回退到 CSV
-            pass
+        yield chunk
 
-    with open(output_path, "w", newline="", encoding="utf-8-sig") as fh:
-        writer = csv.DictWriter(fh, fieldnames=fieldnames)
-        writer.writeheader()
+
+def collect_report_rows_chunked(service, site_url, start_date, end_date, keywords, chunk_size=100000, row_limit=25000,
+                                max_rows=None, exact_mode="single", batch_size=100, workers=1, day_store=None, on_row=None,
+                                bulk_index=None):
+    """collect_report_rows 的分段版本：keywords 可為 generator（例如 iter_keywords），每次只處理 chunk_size 個關鍵字。
+
+    bulk 資料只下載一次並建立索引，之後每段關鍵字各自比對與補查，記憶體用量取決於 bulk 筆數與 chunk_size，
+    與關鍵字總數無關。重複的關鍵字與 collect_report_rows 相同，每次出現都輸出一列；已查詢過的關鍵字只保留 64-bit 摘要與
+    數值，之後的分段直接沿用、不再查詢。輸出順序為每段內 bulk 命中在前，其餘依關鍵字順序。
+    on_row、bulk_index 與回傳值同 collect_report_rows。
+    """
+    out_rows = []
+    sink = on_row or out_rows.append
+    count = 0
+
+    def emit(row):
+        nonlocal count
+        count += 1
+        sink(row)
+
+    if bulk_index is None and day_store:
+        from gsc_daystore import DayStore
+        store = DayStore(day_store)
+        missing_days = store.missing_days(site_url, start_date, end_date)
+        print(f"每日資料庫：區間內缺少 {len(missing_days)} 天，下載後於本機彙總...")
+        store.sync(service, site_url, start_date, end_date, row_limit, max_rows)
+        bulk_index = build_bulk_index(store.iter_range_rows(site_url, start_date, end_date))
+        store.close()
+    elif bulk_index is None:
+        bulk_index = build_bulk_index(iter_bulk_rows(service, site_url, start_date, end_date, row_limit, max_rows))
+    print(f"bulk 查詢取得 {len(bulk_index)} 個 query，關鍵字將每 {chunk_size} 個分段比對")
+
+    total = 0
+    seen = set()
+    resolved = {}
+
+    def counted(items):
+        nonlocal total
+        for kw in items:
+            total += 1
+            seen.add(_keyword_digest(kw))
+            yield kw
+
+    for i, chunk in enumerate(iter_keyword_chunks(counted(keywords), chunk_size), 1):
+        print(f"第 {i} 段：{len(chunk)} 個關鍵字")
+        collect_report_rows(service, site_url, start_date, end_date, chunk, exact_mode=exact_mode, batch_size=batch_size,
+                            workers=workers, bulk_index=bulk_index, on_row=emit, resolved=resolved)
+    unique = len(seen)
+    if unique < total:
+        print(f"關鍵字共 {total} 個，去除重複後 {unique} 個")
+    return count if on_row is not None else out_rows
+
+
+def write_output(output_path, rows):
+    # 依副檔名寫出 CSV / Excel / JSONL（見 gsc_writer.open_writer）
+    from gsc_writer import open_writer
+
+    with open_writer(output_path) as writer:
         for r in rows:
-            writer.writerow(r)
+            writer.write(r)
+
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def parse_importtime(lines):
+    """解析 python -X importtime 的輸出，回傳 [(module, self_us, cumulative_us, depth)]。"""
+    records = []
+    for line in lines:
+        m = _IMPORTTIME_RE.match(line)
+        if m:
+            records.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return records
+
+
+def startup_profile(argv, top=15):
+    """以 python -X importtime 重新執行同一個指令（不含 --startup-profile），執行完後列出 import 耗時，回傳 exit code。
+
+    一般輸出照常顯示；interpreter 啟動時（site 完成前）載入的模組只列合計，不列入排行。
+    """
+    import subprocess
+
+    cmd = [sys.executable, "-X", "importtime", os.path.abspath(__file__), *argv]
+    started = time.perf_counter()
+    proc = subprocess.run(cmd, stderr=subprocess.PIPE, text=True, encoding="utf-8", errors="replace")
+    wall = time.perf_counter() - started
+    lines = proc.stderr.splitlines()
+    for line in lines:
+        if not line.startswith("import time:"):
+            print(line, file=sys.stderr)
+    records = parse_importtime(lines)
+    # importtime 依完成順序輸出，site 完成之前的都是 interpreter 啟動時載入的模組
+    site = next((i for i, r in enumerate(records) if r[0] == "site" and r[3] == 0), -1)
+    startup = [r for r in records[:site + 1] if r[3] == 0]
+    program = [r for r in records[site + 1:] if r[3] == 0]
+    print("\n啟動 import 耗時（python -X importtime）：")
+    print(f"  總執行時間 {wall * 1000:.0f} ms；interpreter 啟動 {sum(r[2] for r in startup) / 1000:.1f} ms，"
+          f"本程式的 import {sum(r[2] for r in program) / 1000:.1f} ms（共 {len(records)} 個模組）")
+    print("  最慢的頂層 import（含子模組）：")
+    for name, _, cumulative, _ in sorted(program, key=lambda r: -r[2])[:top]:
+        print(f"    {cumulative / 1000:8.1f} ms  {name}")
+    print("  自身耗時最多的模組：")
+    for name, self_us, _, _ in sorted(records[site + 1:], key=lambda r: -r[1])[:top]:
+        print(f"    {self_us / 1000:8.1f} ms  {name}")
+    return proc.returncode
 
 
 def main():
+    if "--startup-profile" in sys.argv[1:]:
+        # 必須在 parse_args 之前處理，--help 等會提早結束的指令也能量測
+        raise SystemExit(startup_profile([a for a in sys.argv[1:] if a != "--startup-profile"]))
     parser = argparse.ArgumentParser()
     parser.add_argument("--property", required=True, help="Search Console property URL, e.g. https://example.com")
-    parser.add_argument("--keywords", required=True, help="CSV 檔，第一欄為關鍵字 (no header required)")
+    parser.add_argument("--keywords", required=True, help="CSV 檔，第一欄為關鍵字 (no header required)；也可用先前輸出的 .parquet / .arrow 報表")
     parser.add_argument("--start-date", required=True, help="YYYY-MM-DD")
     parser.add_argument("--end-date", required=True, help="YYYY-MM-DD")
     parser.add_argument("--service-account", default=None, help="service account JSON 路徑 (可選)。若未提供，可透過環境變數 GSC_SERVICE_ACCOUNT 指定路徑")
     parser.add_argument("--delegated-user", default=None, help="若使用 service account 並需委派，填入被委派的帳號 email")
     parser.add_argument("--oauth-client", default=None, help="OAuth client_secret.json，若不使用 service account 可提供此檔進行 OAuth Flow")
-    parser.add_argument("--row-limit", type=int, default=25000, help="bulk 查詢的 rowLimit (預設 25000)")
-    parser.add_argument("--output", default="gsc_keyword_report.csv", help="輸出 CSV 檔名")
+    parser.add_argument("--row-limit", type=int, default=25000, help="bulk 查詢的 rowLimit (預設 25000)；分頁模式下為每頁筆數")
+    parser.add_argument("--paginate", action="store_true", help="bulk 查詢以 startRow 分頁，持續抓取直到 API 無更多資料或達 --max-bulk-rows")
+    parser.add_argument("--max-bulk-rows", type=int, default=None, help="分頁模式下最多抓取的 query 筆數 (預設不限)")
+    parser.add_argument("--exact-mode", choices=["single", "batch"], default="single", help="bulk 未命中關鍵字的補查方式：single 逐一查詢；batch 以 regex 一次查詢多個關鍵字")
+    parser.add_argument("--batch-size", type=int, default=100, help="batch 模式下每個請求最多包含的關鍵字數 (預設 100)")
+    parser.add_argument("--workers", type=int, default=4, help="精確查詢的並行 thread 數；--async 模式下為連線池的連線數 (預設 4)")
+    parser.add_argument("--qps", type=float, default=10, help="所有 worker 共用的每秒請求上限 (預設 10)")
+    parser.add_argument("--qpm", type=float, default=1200, help="所有 worker 共用的每分鐘請求上限 (預設 1200，GSC 預設配額)")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="改用 asyncio client：單一 thread、共用 keep-alive 連線池同時送出大量請求")
+    parser.add_argument("--max-in-flight", type=int, default=100, help="asyncio 模式下同時進行的請求數上限 (預設 100)")
+    parser.add_argument("--max-retries", type=int, default=5, help="遇到 429 / 5xx 時的最大重試次數 (預設 5，0 表示不重試)")
+    parser.add_argument("--cache-path", default=".gsc_cache.sqlite", help="查詢結果快取檔 (SQLite，預設 .gsc_cache.sqlite)")
+    parser.add_argument("--no-cache", action="store_true", help="不讀也不寫快取，所有資料重新下載")
+    parser.add_argument("--refresh-cache", action="store_true", help="忽略既有快取重新下載，並以新結果覆寫快取")
+    parser.add_argument("--prune-cache", action="store_true", help="執行前先清除過期快取並依 LRU 縮減到大小上限")
+    parser.add_argument("--cache-ttl", type=float, default=6, help="尚未定稿（近 3 天內）的區間快取有效小時數 (預設 6)；已結束的歷史區間永久有效")
+    parser.add_argument("--cache-max-mb", type=float, default=200, help="快取大小上限 MB，超過時淘汰最久未使用的項目 (預設 200)")
+    parser.add_argument("--day-store", default=None, help="每日資料庫路徑 (SQLite)。指定後以 date 維度只下載缺少的日子，並在本機彙總任意區間；一律以分頁下載完整的日子，下載筆數只受 --max-bulk-rows 限制（被截斷的日子不標記為完整）")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint journal 路徑 (預設為 <output>.checkpoint.jsonl)；執行中定期寫入已完成的關鍵字")
+    parser.add_argument("--resume", action="store_true", help="從 checkpoint 接續：相同 property 與日期區間已完成的關鍵字不再查詢")
+    parser.add_argument("--chunk-size", type=int, default=None, help="串流讀取關鍵字檔並每 N 個關鍵字分段比對與補查，適合數百萬列的關鍵字檔；重複的關鍵字每次出現都輸出一列，已查詢過的不再重複查詢")
+    parser.add_argument("--dimensions", default=None, help="一次下載 query 加上這些維度（逗號分隔：page,device,country），於本機彙總主報表並另外輸出每個維度的 <主檔名>.by-<維度>.<副檔名> 細分報表")
+    parser.add_argument("--shard", default=None, help="只處理第 i 個 shard（格式 i/N，例如 2/4），輸出寫到 <主檔名>.shard2-of-4.<副檔名>；以 gsc_shard.py merge 合併")
+    parser.add_argument("--output", default="gsc_keyword_report.csv", help="輸出檔名，依副檔名決定格式：.csv / .xlsx / .jsonl / .parquet / .arrow")
     parser.add_argument("--mock", action="store_true", help="不呼叫 GSC API，使用隨機數據產生樣本報表（方便測試）")
+    parser.add_argument("--startup-profile", action="store_true", help="以 python -X importtime 執行同一個指令，結束後列出各模組的 import 耗時（量測冷啟動）")
+    parser.add_argument("--api-endpoint", default=None, help="改送到其他 API 端點，例如本機替身 server http://127.0.0.1:8080/（gsc_fake_server.py）；未指定憑證時不做認證")
     args = parser.parse_args()
+    from gsc_writer import is_columnar_path, pyarrow_available
+    if (is_columnar_path(args.output) or is_columnar_path(args.keywords)) and not pyarrow_available():
+        parser.error("Parquet / Arrow 格式需要安裝 pyarrow（pip install pyarrow）")
+    if args.use_async and args.day_store:
+        parser.error("--day-store 目前不支援 --async 模式")
+    if args.chunk_size and (args.use_async or args.resume):
+        parser.error("--chunk-size 目前不支援 --async 與 --resume")
+    dimensions = None
+    if args.dimensions:
+        from gsc_dimensions import parse_dimensions
+        try:
+            dimensions = parse_dimensions(args.dimensions)
+        except ValueError as exc:
+            parser.error(str(exc))
+        if args.use_async or args.day_store or args.shard:
+            parser.error("--dimensions 目前不支援 --async、--day-store 與 --shard")
+    shard = None
+    if args.shard:
+        from gsc_shard import in_shard, parse_shard, shard_output_path
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as exc:
+            parser.error(str(exc))
+        # 每個 shard 寫入各自的輸出與 checkpoint，多個 process 可共用同一組參數
+        args.output = shard_output_path(args.output, *shard)
+        if args.checkpoint:
+            args.checkpoint = shard_output_path(args.checkpoint, *shard)
 
     service = None
     creds = None
+    cache = None
+    limiter = RateLimiter(per_second=args.qps, per_minute=args.qpm)
+    retry = RetryPolicy(max_retries=args.max_retries)
+    # AIMD 並行上限：thread 模式以 --workers、asyncio 模式以 --max-in-flight 為上限
+    concurrency = AdaptiveConcurrency(args.max_in_flight if args.use_async else args.workers)
     if not args.mock:
-        creds = authenticate(args.service_account, args.delegated_user, args.oauth_client)
-        service = build("searchconsole", "v1", credentials=creds)
+        if args.api_endpoint and not (args.service_account or args.oauth_client):
+            # 替身 server 不檢查憑證；正式 API 仍須明確指定 service account 或 OAuth client
+            print(f"使用 API 端點 {args.api_endpoint}（不認證）")
+        else:
+            creds = authenticate(args.service_account, args.delegated_user, args.oauth_client)
+        if not args.no_cache:
+            from gsc_cache import ResponseCache
+            cache = ResponseCache(args.cache_path, max_bytes=int(args.cache_max_mb * 1024 * 1024), open_ttl=args.cache_ttl * 3600)
+            if args.prune_cache:
+                print(f"已清除 {cache.prune()} 筆過期或超出大小上限的快取")
 
-    print("載入關鍵字清單...")
-    keywords = load_keywords(args.keywords)
-    print(f"載入 {len(keywords)} 個關鍵字")
-    out_rows = []
-    if args.mock:
-        print("使用 mock 模式產生範例數據（不呼叫 GSC API）...")
-        random.seed(42)
-        for kw in keywords:
-            clicks = random.randint(0, 200)
-            impressions = clicks * random.randint(1, 50)
-            position = round(random.uniform(1, 50), 2) if impressions > 0 else ""
-            out_rows.append({
-                "keyword": kw,
-                "clicks": clicks,
-                "impressions": impressions,
-                "position": position,
-                "found_by": "mock",
-            })
+    if not args.mock and not args.use_async:
+        service = build_service_stack(creds, limiter, retry, concurrency, cache, args.refresh_cache, args.api_endpoint)
+
+    if args.chunk_size:
+        # 不先載入整份清單，邊讀檔邊分段處理
+        print(f"以串流方式讀取關鍵字清單，每 {args.chunk_size} 個一段...")
+        keywords = iter_keywords(args.keywords)
+        if shard:
+            keywords = in_shard(keywords, *shard)
     else:
-        print("嘗試以 bulk 查詢擷取最多前 rows 的 query 資料（可快速覆蓋大部分關鍵字）...")
-        bulk = fetch_bulk_queries(service, args.property, args.start_date, args.end_date, args.row_limit)
-        print(f"bulk 查詢取得 {len(bulk)} 筆 query 資料")
+        print("載入關鍵字清單...")
+        keywords = load_keywords(args.keywords)
+        print(f"載入 {len(keywords)} 個關鍵字")
+        if shard:
+            keywords = list(in_shard(keywords, *shard))
+            print(f"shard {shard[0]}/{shard[1]}：負責其中 {len(keywords)} 個關鍵字")
+    checkpoint = None
+    done = {}
+    if not args.mock:
+        from gsc_checkpoint import Checkpoint
+        checkpoint = Checkpoint(args.checkpoint or args.output + ".checkpoint.jsonl", args.property, args.start_date, args.end_date)
+        if args.resume:
+            done = checkpoint.load()
+            print(f"從 checkpoint 接續：已完成 {len(done)} 個關鍵字，略過不再查詢")
+        checkpoint.open(resume=args.resume)
+    all_keywords = keywords
+    if done:
+        keywords = [kw for kw in keywords if kw not in done]
 
-        missing = []
-        for kw in keywords:
-            key = kw.lower()
-            if key in bulk:
-                d = bulk[key]
-                out_rows.append({
-                    "keyword": kw,
-                    "clicks": d["clicks"],
-                    "impressions": d["impressions"],
-                    "position": d["position"],
-                    "found_by": "bulk",
-                })
-            else:
-                missing.append(kw)
-
-        print(f"{len(missing)} 個關鍵字未在 bulk 結果中發現，將逐一以精確查詢補上（速度較慢）")
-        for i, kw in enumerate(missing, 1):
-            # 緩慢速率限制保護
-            if i % 50 == 0:
-                time.sleep(1)
-            d = fetch_exact_query(service, args.property, args.start_date, args.end_date, kw)
-            if d:
-                out_rows.append({
+    # 結果依輸出順序產生，直接串流寫入輸出檔，記憶體用量不隨關鍵字數成長；
+    # 從 checkpoint 接續時需與已完成的結果合併排序，才先收集在記憶體中
+    from gsc_writer import open_writer
+    collected = []
+    writer = None
+    if done:
+        sink = collected.append
+    else:
+        print(f"寫出結果到 {args.output} ...")
+        writer = open_writer(args.output)
+        sink = writer.write
+
+    def on_row(row):
+        sink(row)
+        if checkpoint is not None:
+            checkpoint.record(row)
+
+    # 每日資料庫需要完整的日子，否則被 --row-limit 截斷的區間每次都會重新下載：此時一律分頁，只受 --max-bulk-rows 限制
+    bulk_max_rows = args.max_bulk_rows if args.paginate or args.day_store else args.row_limit
+    dimension_store = None
+    bulk_index = None
+    try:
+        if dimensions and not args.mock:
+            from gsc_dimensions import fetch_dimension_store
+            print(f"以 query + {' / '.join(dimensions)} 維度分頁下載，於本機彙總...")
+            dimension_store = fetch_dimension_store(service, args.property, args.start_date, args.end_date, dimensions,
+                                                    args.row_limit, bulk_max_rows)
+            bulk_index = dimension_store.query_index()
+            print(f"下載 {len(dimension_store)} 列多維度資料，涵蓋 {len(bulk_index)} 個 query")
+        if args.mock:
+            print("使用 mock 模式產生範例數據（不呼叫 GSC API）...")
+            random.seed(42)
+            for kw in keywords:
+                clicks = random.randint(0, 200)
+                impressions = clicks * random.randint(1, 50)
+                position = round(random.uniform(1, 50), 2) if impressions > 0 else ""
+                on_row({
                     "keyword": kw,
-                    "clicks": d["clicks"],
-                    "impressions": d["impressions"],
-                    "position": d["position"],
-                    "found_by": "exact",
+                    "clicks": clicks,
+                    "impressions": impressions,
+                    "position": position,
+                    "found_by": "mock",
                 })
-            else:
-                out_rows.append({"keyword": kw, "clicks": 0, "impressions": 0, "position": "", "found_by": "none"})
+        elif args.use_async:
+            import asyncio
+            import gsc_async
+
+            async def run():
+                endpoint = args.api_endpoint or gsc_async.DEFAULT_ENDPOINT
+                async with gsc_async.AsyncSearchConsoleClient(creds, api_endpoint=endpoint, limiter=limiter, max_connections=args.workers,
+                                                              cache=cache, refresh_cache=args.refresh_cache, retry=retry,
+                                                              concurrency=concurrency) as client:
+                    await gsc_async.collect_report_rows(
+                        client, args.property, args.start_date, args.end_date, keywords,
+                        row_limit=args.row_limit, max_rows=bulk_max_rows,
+                        exact_mode=args.exact_mode, batch_size=args.batch_size, max_in_flight=args.max_in_flight,
+                        on_row=on_row,
+                    )
+
+            asyncio.run(run())
+        elif args.chunk_size:
+            collect_report_rows_chunked(
+                service, args.property, args.start_date, args.end_date, keywords, chunk_size=args.chunk_size,
+                row_limit=args.row_limit, max_rows=bulk_max_rows,
+                exact_mode=args.exact_mode, batch_size=args.batch_size, workers=args.workers,
+                day_store=args.day_store, on_row=on_row, bulk_index=bulk_index,
+            )
+        else:
+            if args.paginate and not args.day_store and bulk_index is None:
+                print("以分頁方式擷取 bulk query 資料，邊下載邊比對關鍵字...")
+            elif not args.day_store and bulk_index is None:
+                print("嘗試以 bulk 查詢擷取最多前 rows 的 query 資料（可快速覆蓋大部分關鍵字）...")
+            collect_report_rows(
+                service, args.property, args.start_date, args.end_date, keywords,
+                row_limit=args.row_limit, max_rows=bulk_max_rows,
+                exact_mode=args.exact_mode, batch_size=args.batch_size, workers=args.workers,
+                day_store=args.day_store, on_row=on_row, bulk_index=bulk_index,
+            )
+    except BaseException:
+        # 中斷時不留下不完整的報表；已完成的結果仍保存在 checkpoint 中
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is not None:
+        writer.close()
+    else:
+        # 合併 checkpoint 中已完成的結果，排列方式與一次跑完相同：bulk 命中在前，其餘依關鍵字清單順序
+        results = dict(done)
+        results.update((r["keyword"], r) for r in collected)
+        ordered = [results[kw] for kw in all_keywords if kw in results]
+        print(f"寫出結果到 {args.output} ...")
+        write_output(args.output, [r for r in ordered if r["found_by"] == "bulk"] + [r for r in ordered if r["found_by"] != "bulk"])
+    if dimension_store is not None:
+        # 同一份下載資料在本機彙總出每個維度的細分報表，不再呼叫 API
+        from gsc_dimensions import METRIC_FIELDS, breakdown_output_path
+        for d in dimensions:
+            path = breakdown_output_path(args.output, d)
+            with open_writer(path, ["keyword", d, *METRIC_FIELDS]) as breakdown:
+                for row in dimension_store.breakdown_rows(iter_unique_keywords(iter_keywords(args.keywords)), d):
+                    breakdown.write(row)
+            print(f"寫出關鍵字 × {d} 細分 {breakdown.rows} 列到 {path}")
+    if limiter.waited:
+        print(f"速率限制累計等待 {limiter.waited:.1f} 秒")
+    if not args.mock:
+        print(f"API 重試統計：{retry.summary()}；並行上限最低降至 {concurrency.lowest}")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"快取命中 {stats['hits']} 次、未命中 {stats['misses']} 次（快取共 {stats['entries']} 筆，{stats['bytes'] / 1024 / 1024:.1f} MB）")
+        cache.close()
 
-    print(f"寫出結果到 {args.output} ...")
-    write_output(args.output, out_rows)
+    if checkpoint is not None:
+        # 報表已完整寫出，checkpoint 不再需要
+        checkpoint.remove()
     print("完成。可用 Excel 或 pandas 開啟 CSV。")
 
 
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+gsc_retry.py
+
+GSC API 請求的重試與自適應並行控制。
+
+- RetryPolicy：遇到 429 / 5xx / 配額類 403 / 連線錯誤時以 jittered exponential backoff 重試，
+  若回應帶有 Retry-After 則以其為準；統計重試次數供執行結束時回報。
+- AdaptiveConcurrency：AIMD 方式調整同時進行的請求數，遇到節流時減半，連續成功時逐步加回。
+
+googleapiclient 的 HttpError（exc.resp.status）與 gsc_async.HttpError（exc.status）都支援。
+"""
+import random
+import socket
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# 403 搭配這些 reason 代表配額或速率限制，而非權限不足
+QUOTA_REASONS = (b"rateLimitExceeded", b"userRateLimitExceeded", b"quotaExceeded")
+
+
+def error_status(exc):
+    status = getattr(exc, "status", None)
+    if status is None:
+        resp = getattr(exc, "resp", None)
+        status = getattr(resp, "status", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _error_headers(exc):
+    headers = getattr(exc, "headers", None)
+    if headers is None:
+        headers = getattr(exc, "resp", None)
+    return headers or {}
+
+
+def _error_content(exc):
+    content = getattr(exc, "content", b"") or b""
+    return content if isinstance(content, bytes) else str(content).encode("utf-8", "replace")
+
+
+def is_throttle(exc):
+    status = error_status(exc)
+    if status == 429:
+        return True
+    return status == 403 and any(r in _error_content(exc) for r in QUOTA_REASONS)
+
+
+def is_retryable(exc):
+    if isinstance(exc, (ConnectionError, socket.timeout, TimeoutError)):
+        return True
+    # asyncio 只在 asyncio client 使用時才會被載入；尚未載入時不可能丟出 asyncio.TimeoutError
+    asyncio = sys.modules.get("asyncio")
+    if asyncio is not None and isinstance(exc, asyncio.TimeoutError):
+        return True
+    return error_status(exc) in RETRYABLE_STATUS or is_throttle(exc)
+
+
+def retry_after_seconds(exc):
+    """解析 Retry-After 標頭（秒數或 HTTP-date），沒有時回傳 None。"""
+    headers = _error_headers(exc)
+    value = None
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+    except AttributeError:
+        return None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    # HTTP 日期格式的 Retry-After 很少見，用到時才載入 email.utils
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    def __init__(self, max_retries=5, base_delay=1.0, max_delay=60.0, sleep=time.sleep, rand=random.random):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._rand = rand
+        self._lock = threading.Lock()
+        self.retries = Counter()
+        self.gave_up = 0
+
+    def delay(self, attempt, exc):
+        hinted = retry_after_seconds(exc)
+        if hinted is not None:
+            return min(hinted, self.max_delay)
+        # full jitter：0 ~ base * 2^attempt 之間隨機，避免所有 worker 同時重試
+        return self._rand() * min(self.max_delay, self.base_delay * (2 ** attempt))
+
+    def _should_retry(self, attempt, exc):
+        if not is_retryable(exc):
+            return False
+        with self._lock:
+            if attempt >= self.max_retries:
+                self.gave_up += 1
+                return False
+            self.retries[error_status(exc) or type(exc).__name__] += 1
+        return True
+
+    def call(self, fn):
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except Exception as exc:
+                if not self._should_retry(attempt, exc):
+                    raise
+                self._sleep(self.delay(attempt, exc))
+                attempt += 1
+
+    async def call_async(self, fn):
+        import asyncio
+
+        attempt = 0
+        while True:
+            try:
+                return await fn()
+            except Exception as exc:
+                if not self._should_retry(attempt, exc):
+                    raise
+                await asyncio.sleep(self.delay(attempt, exc))
+                attempt += 1
+
+    def summary(self):
+        total = sum(self.retries.values())
+        if not total and not self.gave_up:
+            return "無重試"
+        detail = "、".join(f"{k}: {v}" for k, v in sorted(self.retries.items(), key=lambda kv: str(kv[0])))
+        return f"重試 {total} 次（{detail}），放棄 {self.gave_up} 個請求"
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class AdaptiveConcurrency:
+    """AIMD 並行上限：節流時上限減半（multiplicative decrease），每累積 limit 次成功加 1（additive increase）。"""
+
+    def __init__(self, max_limit, min_limit=1, cooldown=1.0, clock=time.monotonic):
+        self.max_limit = max(1, int(max_limit))
+        self.min_limit = max(1, min(int(min_limit), self.max_limit))
+        self.limit = self.max_limit
+        self.lowest = self.limit
+        self.in_flight = 0
+        self._successes = 0
+        self._cooldown = cooldown
+        self._clock = clock
+        self._last_decrease = None
+        self._cond = threading.Condition()
+        # acquire_async 等待中的 (event loop, future)；名額釋出時與 thread 的等待者一起喚醒
+        self._async_waiters = deque()
+
+    def _notify_locked(self):
+        self._cond.notify_all()
+        while self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            # release 可能在其他 thread 呼叫，future 只能在所屬的 event loop 中設定
+            loop.call_soon_threadsafe(_wake, waiter)
+
+    def try_acquire(self):
+        with self._cond:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self):
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._notify_locked()
+
+    def on_success(self):
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.max_limit:
+                self._successes = 0
+                self.limit += 1
+                self._notify_locked()
+
+    def on_throttle(self):
+        with self._cond:
+            now = self._clock()
+            # 同一波節流回應只減半一次，避免上限瞬間掉到最低
+            if self._last_decrease is not None and now - self._last_decrease < self._cooldown:
+                return
+            self._last_decrease = now
+            self._successes = 0
+            self.limit = max(self.min_limit, self.limit // 2)
+            self.lowest = min(self.lowest, self.limit)
+
+    def guarded(self, fn):
+        """在並行上限內執行一次 fn，並依結果調整上限（供 RetryPolicy.call 使用）。"""
+        self.acquire()
+        try:
+            result = fn()
+        except Exception as exc:
+            if is_throttle(exc):
+                self.on_throttle()
+            raise
+        finally:
+            self.release()
+        self.on_success()
+        return result
+
+    async def guarded_async(self, fn):
+        await self.acquire_async()
+        try:
+            result = await fn()
+        except Exception as exc:
+            if is_throttle(exc):
+                self.on_throttle()
+            raise
+        finally:
+            self.release()
+        self.on_success()
+        return result
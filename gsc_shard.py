@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+gsc_shard.py
+
+把同一份關鍵字清單拆成 N 個 shard，分別由多個 process（或共用檔案系統的多台機器）執行，最後合併成一份報表。
+
+每個關鍵字依正規化後的穩定雜湊（blake2b，與 Python 的 hash() 不同，不受 process 或機器影響）固定分到一個 shard，
+正規化後相同的重複關鍵字一定落在同一個 shard。`gsc_keyword_report.py --shard 2/4` 只處理第 2 個 shard，
+輸出寫到 <output 主檔名>.shard2-of-4.<副檔名>；所有 shard 完成後以 merge 依原始關鍵字順序合併。
+
+用法：
+  # 本機以 4 個 process 執行並自動合併（其餘參數原樣傳給 gsc_keyword_report.py）
+  python gsc_shard.py run --shards 4 --keywords kw.csv --output report.csv \\
+      --property sc-domain:example.com --start-date 2025-01-01 --end-date 2025-01-31 --service-account sa.json
+
+  # 多台機器：各自執行一個 shard，再由任一台合併
+  python gsc_keyword_report.py --shard 1/4 --keywords kw.csv --output report.csv ...
+  python gsc_shard.py merge --shards 4 --keywords kw.csv --output report.csv
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from gsc_keyword_report import _keyword_digest, iter_keywords
+from gsc_writer import iter_report_rows, open_writer
+
+REPORT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gsc_keyword_report.py")
+
+
+def parse_shard(text):
+    """解析 "i/N"（i 為 1..N），回傳 (i, N)；格式錯誤時丟出 ValueError。"""
+    try:
+        index, count = (int(p) for p in text.split("/"))
+    except ValueError:
+        raise ValueError(f"shard 格式應為 i/N，例如 1/4：{text}") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard 編號需介於 1 到 {count}：{text}")
+    return index, count
+
+
+def shard_of(keyword, count):
+    """關鍵字所屬的 shard 編號（1..count）。"""
+    return _keyword_digest(keyword) % count + 1
+
+
+def in_shard(keywords, index, count):
+    """只 yield 屬於第 index 個 shard 的關鍵字（keywords 可為 generator）。"""
+    return (kw for kw in keywords if shard_of(kw, count) == index)
+
+
+def shard_output_path(path, index, count):
+    # report.csv -> report.shard2-of-4.csv
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{index}-of-{count}{ext}"
+
+
+class _Cursor:
+    """逐列讀取 shard 輸出中符合條件的列，可先 peek 再決定是否取用。"""
+
+    def __init__(self, path, predicate):
+        self._rows = (r for r in iter_report_rows(path) if predicate(r))
+        self._next = next(self._rows, None)
+
+    def peek(self):
+        return self._next
+
+    def take(self):
+        row = self._next
+        self._next = next(self._rows, None)
+        return row
+
+
+def merge_shards(keywords, shard_paths, output):
+    """把各 shard 的輸出依 keywords 的順序合併寫入 output，回傳寫出的列數。
+
+    每個 shard 的輸出為「bulk 命中在前，其餘在後」，兩部分各自依關鍵字順序排列，因此每個 shard 開兩個游標，
+    依序走過關鍵字清單即可合併，記憶體用量與列數無關。合併後有 shard 的列沒有對應到關鍵字時丟出 ValueError
+    （例如 shard 使用了不同的關鍵字清單或 shard 數）。
+    """
+    count = len(shard_paths)
+    cursors = [
+        (_Cursor(p, lambda r: r.get("found_by") == "bulk"), _Cursor(p, lambda r: r.get("found_by") != "bulk"))
+        for p in shard_paths
+    ]
+    with open_writer(output) as writer:
+        for kw in keywords:
+            for cursor in cursors[shard_of(kw, count) - 1]:
+                row = cursor.peek()
+                if row is not None and str(row.get("keyword")) == kw:
+                    writer.write(cursor.take())
+                    break
+        leftover = sum(1 for pair in cursors for cursor in pair if cursor.peek() is not None)
+        if leftover:
+            raise ValueError(f"有 {leftover} 個 shard 輸出含有不在關鍵字清單中（或順序不符）的列，請確認各 shard 使用相同的關鍵字清單與 shard 數")
+    return writer.rows
+
+
+def run_shards(count, processes, keywords_path, output, report_args, qps=None, qpm=None):
+    """以最多 processes 個 process 同時執行 count 個 shard，回傳每個 shard 的 (index, returncode, seconds)。
+
+    每個 shard 的輸出寫到 <shard 輸出>.log。qps / qpm 為所有同時執行的 process 合計的上限，平均分給每個 process。
+    """
+    processes = max(1, min(processes, count))
+    extra = []
+    if qps is not None:
+        extra += ["--qps", str(qps / processes)]
+    if qpm is not None:
+        extra += ["--qpm", str(qpm / processes)]
+
+    def run_one(index):
+        cmd = [sys.executable, REPORT_SCRIPT, *report_args, "--keywords", keywords_path, "--output", output,
+               "--shard", f"{index}/{count}", *extra]
+        log_path = shard_output_path(output, index, count) + ".log"
+        started = time.perf_counter()
+        with open(log_path, "w", encoding="utf-8") as log:
+            code = subprocess.run(cmd, stdout=log, stderr=subprocess.STDOUT).returncode
+        seconds = time.perf_counter() - started
+        status = "完成" if code == 0 else f"失敗（exit {code}），詳見 {log_path}"
+        print(f"shard {index}/{count} {status}，耗時 {seconds:.1f} 秒")
+        return index, code, seconds
+
+    with ThreadPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(run_one, range(1, count + 1)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以多個 process 分 shard 執行 gsc_keyword_report，並合併各 shard 的輸出")
+    parser.add_argument("action", choices=["run", "merge"], help="run：在本機執行所有 shard 後合併；merge：只合併已完成的 shard 輸出")
+    parser.add_argument("--shards", type=int, required=True, help="shard 數 N")
+    parser.add_argument("--keywords", required=True, help="完整的關鍵字檔（與各 shard 使用的相同）")
+    parser.add_argument("--output", required=True, help="合併後的輸出檔；各 shard 的輸出為 <主檔名>.shardI-of-N.<副檔名>")
+    parser.add_argument("--processes", type=int, default=None, help="run 時同時執行的 process 數 (預設為 CPU 核心數)")
+    parser.add_argument("--qps", type=float, default=None, help="run 時所有 process 合計的每秒請求上限，平均分給每個 process")
+    parser.add_argument("--qpm", type=float, default=None, help="run 時所有 process 合計的每分鐘請求上限，平均分給每個 process")
+    parser.add_argument("--keep-shards", action="store_true", help="合併後保留各 shard 的輸出檔（與 run 的執行記錄）")
+    args, report_args = parser.parse_known_args()
+    if args.shards < 1:
+        parser.error("--shards 需大於 0")
+    if args.action == "merge" and report_args:
+        parser.error(f"merge 不接受的參數：{' '.join(report_args)}")
+
+    if args.action == "run":
+        # 每個 process 各自驗證；OAuth 互動流程無法在多個 process 中進行，請使用 service account
+        processes = args.processes or os.cpu_count() or 1
+        print(f"以 {min(processes, args.shards)} 個 process 執行 {args.shards} 個 shard...")
+        results = run_shards(args.shards, processes, args.keywords, args.output, report_args, args.qps, args.qpm)
+        failed = [index for index, code, _ in results if code != 0]
+        if failed:
+            print(f"shard {', '.join(map(str, failed))} 失敗，未合併；修正後可對失敗的 shard 加上 --resume 重新執行，再執行 merge")
+            raise SystemExit(1)
+
+    shard_paths = [shard_output_path(args.output, i, args.shards) for i in range(1, args.shards + 1)]
+    missing = [p for p in shard_paths if not os.path.exists(p)]
+    if missing:
+        print(f"找不到 shard 輸出：{', '.join(missing)}")
+        raise SystemExit(2)
+    rows = merge_shards(iter_keywords(args.keywords), shard_paths, args.output)
+    print(f"已合併 {args.shards} 個 shard，共 {rows} 列 -> {args.output}")
+    if not args.keep_shards:
+        for p in shard_paths:
+            os.remove(p)
+            if args.action == "run":
+                os.remove(p + ".log")
+
+
+if __name__ == "__main__":
+    main()
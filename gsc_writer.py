@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+gsc_writer.py
+
+報表輸出的串流 writer：每一列結果產生時立即寫入，不需先把所有結果累積在記憶體中。
+
+- CsvReportWriter：utf-8-sig CSV（Excel 可直接開啟）
+- XlsxReportWriter：openpyxl write-only 模式，記憶體用量與列數無關
+- JsonlReportWriter：每列一個 JSON 物件
+- ParquetReportWriter / ArrowReportWriter：欄位型別固定（clicks / impressions 為 int64、position 為 float64）的
+  欄式格式並以 zstd 壓縮，分析工具可直接載入而不必解析 CSV；需要 pyarrow（選用套件）
+
+寫入期間內容先寫到 <output>.part，close() 時才改名為正式檔名，中斷時不會留下看似完整的半份報表。
+
+用法：
+  with open_writer("report.xlsx") as writer:
+      for row in rows:
+          writer.write(row)
+"""
+import abc
+import csv
+import importlib.util
+import json
+import os
+
+FIELDNAMES = ["keyword", "clicks", "impressions", "position", "found_by"]
+PARQUET_EXTENSIONS = (".parquet",)
+ARROW_EXTENSIONS = (".arrow", ".feather")
+# 欄式格式的欄位型別；未列出的欄位為字串
+_INT_FIELDS = {"clicks", "impressions"}
+_FLOAT_FIELDS = {"position"}
+
+
+class ReportWriter(abc.ABC):
+    def __init__(self, path, fieldnames=FIELDNAMES):
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.rows = 0
+        self._tmp_path = path + ".part"
+
+    def write(self, row):
+        self._write(row)
+        self.rows += 1
+
+    @abc.abstractmethod
+    def _write(self, row):
+        """寫入一列（write 已負責計數）。"""
+
+    @abc.abstractmethod
+    def _finish(self):
+        """寫完剩餘內容並關閉暫存檔（close 與 abort 都會呼叫）。"""
+
+    def close(self):
+        if self._tmp_path is None:
+            return
+        self._finish()
+        os.replace(self._tmp_path, self.path)
+        self._tmp_path = None
+
+    def abort(self):
+        """放棄寫入並刪除暫存檔。"""
+        if self._tmp_path is None:
+            return
+        try:
+            self._finish()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+            self._tmp_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class CsvReportWriter(ReportWriter):
+    def __init__(self, path, fieldnames=FIELDNAMES):
+        super().__init__(path, fieldnames)
+        self._fh = open(self._tmp_path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.DictWriter(self._fh, fieldnames=self.fieldnames)
+        self._writer.writeheader()
+
+    def _write(self, row):
+        self._writer.writerow(row)
+
+    def _finish(self):
+        self._fh.close()
+
+
+class JsonlReportWriter(ReportWriter):
+    def __init__(self, path, fieldnames=FIELDNAMES):
+        super().__init__(path, fieldnames)
+        self._fh = open(self._tmp_path, "w", encoding="utf-8")
+
+    def _write(self, row):
+        self._fh.write(json.dumps({k: row.get(k) for k in self.fieldnames}, ensure_ascii=False) + "\n")
+
+    def _finish(self):
+        self._fh.close()
+
+
+class XlsxReportWriter(ReportWriter):
+    def __init__(self, path, fieldnames=FIELDNAMES):
+        from openpyxl import Workbook
+
+        super().__init__(path, fieldnames)
+        # write-only workbook：每列寫入後即序列化到暫存檔，不保留 cell 物件
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet()
+        self._ws.append(self.fieldnames)
+
+    def _write(self, row):
+        self._ws.append([row.get(k) for k in self.fieldnames])
+
+    def _finish(self):
+        self._wb.save(self._tmp_path)
+
+
+def pyarrow_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Parquet / Arrow 格式需要安裝 pyarrow（pip install pyarrow）") from None
+    return pyarrow
+
+
+def _arrow_schema(pa, fieldnames):
+    def field_type(name):
+        if name in _INT_FIELDS:
+            return pa.int64()
+        if name in _FLOAT_FIELDS:
+            return pa.float64()
+        return pa.string()
+
+    return pa.schema([(name, field_type(name)) for name in fieldnames])
+
+
+def _arrow_value(name, value):
+    # 空字串（例如沒有曝光時的 position）在欄式格式中存為 null
+    if value is None or value == "":
+        return None
+    if name in _INT_FIELDS:
+        return int(value)
+    if name in _FLOAT_FIELDS:
+        return float(value)
+    return str(value)
+
+
+class _ArrowBatchWriter(ReportWriter):
+    """累積 batch_size 列後轉成一個 RecordBatch 寫出，記憶體用量以一個 batch 為上限。"""
+
+    def __init__(self, path, fieldnames=FIELDNAMES, batch_size=50000):
+        super().__init__(path, fieldnames)
+        self._pa = _import_pyarrow()
+        self.schema = _arrow_schema(self._pa, self.fieldnames)
+        self.batch_size = batch_size
+        self._columns = {name: [] for name in self.fieldnames}
+        self._buffered = 0
+        self._open_sink()
+
+    def _write(self, row):
+        for name, values in self._columns.items():
+            values.append(_arrow_value(name, row.get(name)))
+        self._buffered += 1
+        if self._buffered >= self.batch_size:
+            self._flush_batch()
+
+    def _flush_batch(self):
+        if not self._buffered:
+            return
+        self._write_batch(self._pa.RecordBatch.from_pydict(self._columns, schema=self.schema))
+        self._columns = {name: [] for name in self.fieldnames}
+        self._buffered = 0
+
+    def _finish(self):
+        self._flush_batch()
+        self._close_sink()
+
+    @abc.abstractmethod
+    def _open_sink(self):
+        """開啟寫入 self._tmp_path 的 sink。"""
+
+    @abc.abstractmethod
+    def _write_batch(self, batch):
+        """寫出一個 RecordBatch。"""
+
+    @abc.abstractmethod
+    def _close_sink(self):
+        """關閉 sink。"""
+
+
+class ParquetReportWriter(_ArrowBatchWriter):
+    def _open_sink(self):
+        import pyarrow.parquet as pq
+
+        self._sink = pq.ParquetWriter(self._tmp_path, self.schema, compression="zstd")
+
+    def _write_batch(self, batch):
+        self._sink.write_batch(batch)
+
+    def _close_sink(self):
+        self._sink.close()
+
+
+class ArrowReportWriter(_ArrowBatchWriter):
+    """Arrow IPC 檔案格式（即 Feather v2），pandas.read_feather / pyarrow.feather.read_table 可直接讀取。"""
+
+    def _open_sink(self):
+        options = self._pa.ipc.IpcWriteOptions(compression="zstd")
+        self._file = self._pa.OSFile(self._tmp_path, "wb")
+        self._sink = self._pa.ipc.new_file(self._file, self.schema, options=options)
+
+    def _write_batch(self, batch):
+        self._sink.write_batch(batch)
+
+    def _close_sink(self):
+        self._sink.close()
+        self._file.close()
+
+
+def is_columnar_path(path):
+    return path.lower().endswith(PARQUET_EXTENSIONS + ARROW_EXTENSIONS)
+
+
+def iter_columnar_values(path, names=()):
+    """逐個 record batch 讀取 Parquet / Arrow 報表中的一欄並逐值 yield；取 names 中第一個存在的欄位（不分大小寫），
+    都沒有則取第一欄。整個檔案不會一次載入記憶體。"""
+    pa = _import_pyarrow()
+
+    def pick(column_names):
+        lowered = [n.strip().lower() for n in column_names]
+        return next((lowered.index(n) for n in names if n in lowered), 0)
+
+    if path.lower().endswith(PARQUET_EXTENSIONS):
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(path)
+        column = pf.schema_arrow.names[pick(pf.schema_arrow.names)]
+        batches = pf.iter_batches(batch_size=65536, columns=[column])
+        index = 0
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        index = pick(reader.schema.names)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    for batch in batches:
+        yield from batch.column(index).to_pylist()
+
+
+def open_columnar_batches(path, batch_size=65536):
+    """開啟 Parquet / Arrow 報表，回傳 (欄名, 總列數, record batch iterator)；batch 依序讀取，整個檔案不會一次載入記憶體。"""
+    pa = _import_pyarrow()
+    if path.lower().endswith(PARQUET_EXTENSIONS):
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(path)
+        return pf.schema_arrow.names, pf.metadata.num_rows, pf.iter_batches(batch_size=batch_size)
+    reader = pa.ipc.open_file(pa.memory_map(path))
+    return reader.schema.names, reader.count_rows(), (reader.get_batch(i) for i in range(reader.num_record_batches))
+
+
+def iter_report_rows(path):
+    """逐列讀回報表（CSV / XLSX / JSONL / Parquet / Arrow），yield 以欄名為 key 的 dict。
+    CSV 與 XLSX 的數值為讀到的原樣（CSV 為字串），欄式格式的 null 轉成空字串。"""
+    lower = path.lower()
+    if is_columnar_path(path):
+        _, _, batches = open_columnar_batches(path)
+        for batch in batches:
+            for row in batch.to_pylist():
+                yield {k: "" if v is None else v for k, v in row.items()}
+    elif lower.endswith((".xlsx", ".xls")):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None) or ()
+            for values in rows:
+                yield {k: "" if v is None else v for k, v in zip(header, values)}
+        finally:
+            wb.close()
+    elif lower.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            yield from csv.DictReader(fh)
+
+
+def open_writer(path, fieldnames=FIELDNAMES):
+    """依副檔名選擇 writer：.xlsx / .xls -> Excel，.jsonl -> JSONL，.parquet -> Parquet，
+    .arrow / .feather -> Arrow IPC，其餘 CSV。Parquet / Arrow 缺少 pyarrow 時丟出 ImportError。"""
+    lower = path.lower()
+    if lower.endswith(PARQUET_EXTENSIONS):
+        return ParquetReportWriter(path, fieldnames)
+    if lower.endswith(ARROW_EXTENSIONS):
+        return ArrowReportWriter(path, fieldnames)
+    if lower.endswith((".xlsx", ".xls")):
+        try:
+            return XlsxReportWriter(path, fieldnames)
+        except ImportError:
+            # 若 openpyxl 不可用，回退到 CSV
+            pass
+    if lower.endswith(".jsonl"):
+        return JsonlReportWriter(path, fieldnames)
+    return CsvReportWriter(path, fieldnames)
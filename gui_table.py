@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+"""
+gui_table.py
+
+run_gui 的結果表格：資料存在 TableModel，畫面上的 ttk.Treeview 只保留固定數量的列（約一個畫面的高度）。
+
+原本每一列資料都 tree.insert 成一個 Treeview item，數萬列就要數秒且整個 UI 停住，因此只能載入前 10,000 列。
+VirtualTable 捲動時只把目前可見範圍的資料填進這些固定的列（tree.item(..., values=...)），
+捲軸由程式自行計算，item 數量與資料列數無關，百萬列的報表也能立即開啟與捲動。
+
+報表的讀取與欄位轉換由 TableLoader 在背景 thread 進行，每讀完一段就放進 queue，主執行緒以 after() 定期 poll()
+取出並附加到 TableModel，因此前幾段資料載入後就能捲動與查看，進度以已讀取的位元組比例表示。背景 thread 不碰任何 Tk 物件。
+CSV 的編碼由 BOM 與有限大小的位元組樣本判斷（sniff_encoding，依路徑與 mtime 快取），每個檔案只完整讀取一次。
+
+用法：
+  model = TableModel()
+  table = VirtualTable(frame, model)
+  table.grid(row=2, column=0)
+  loader = TableLoader('report.csv').start()
+  for msg in loader.poll():                            # 在 after() 的 callback 中呼叫
+      if msg[0] == 'rows':
+          model.extend(msg[1]); table.refresh(keep_position=True)
+  model.set_filter(model.filter_indices('點擊', '>', '10')); table.refresh()   # 篩選後重新繪製
+  model.sort('點擊', descending=True); table.refresh()                          # 排序後重新繪製
+"""
+import codecs
+import csv
+import os
+import queue
+import threading
+import tkinter as tk
+from array import array
+from collections.abc import Sequence
+from tkinter import ttk
+
+from gsc_writer import is_columnar_path, open_columnar_batches
+
+# 表格顯示的欄位：關鍵字、排名、點擊、曝光、點擊率
+DISPLAY_COLUMNS = ['關鍵字', '排名', '點擊', '曝光', '點擊率']
+NUMERIC_COLUMNS = DISPLAY_COLUMNS[1:]
+NAN = float('nan')
+# 沒有 BOM 時依序嘗試的編碼（latin1 可解碼任何位元組，作為最後的選擇）
+CSV_ENCODINGS = ['utf-8', 'cp950', 'cp936', 'latin1']
+SNIFF_BYTES = 64 * 1024
+
+# (絕對路徑, mtime_ns) -> 編碼
+_encoding_cache = {}
+
+
+def _number(text):
+    """'1,234' -> 1234.0；空白或無法解析時回傳 NaN。"""
+    try:
+        return float(str(text).replace(',', ''))
+    except ValueError:
+        return NAN
+
+
+def _format_count(v):
+    if v != v:
+        return ''
+    return str(int(v)) if v.is_integer() else str(v)
+
+
+# 顯示時才把數值格式化成字串（NaN 顯示為空白）
+FORMATTERS = {
+    '排名': lambda v: '' if v != v else str(v),
+    '點擊': _format_count,
+    '曝光': _format_count,
+    '點擊率': lambda v: '' if v != v else f'{v}%',
+}
+
+
+class _FormattedRows(Sequence):
+    """TableModel 全部資料（原始順序）的唯讀顯示列，存取時才格式化。"""
+
+    def __init__(self, model):
+        self._model = model
+
+    def __len__(self):
+        return len(self._model.keywords)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._model.format_row(j) for j in range(len(self))[i]]
+        return self._model.format_row(range(len(self))[i])
+
+
+class TableModel:
+    """表格資料以欄儲存：關鍵字為字串 list，排名、點擊、曝光、點擊率為 array('d')（缺值為 NaN）。
+
+    數值只在載入時解析一次，排序、篩選與統計直接使用數值欄，只有畫面上可見的列才格式化成字串；
+    排名與點擊率保存到顯示的精度（一位、兩位小數），因此比較結果與畫面一致。
+    view 為目前顯示的列索引，由篩選（set_filter）與排序（sort）組合而成，不複製資料；rows 為全部資料的顯示列（匯出用）。
+
+    每個欄位第一次排序時計算一次升冪的排列（argsort）並快取，之後的排序與升降冪切換只需反轉或套用快取的排列；
+    資料增加時快取失效。
+    """
+
+    columns = DISPLAY_COLUMNS
+
+    def __init__(self):
+        self.keywords = []
+        self.numbers = {c: array('d') for c in NUMERIC_COLUMNS}
+        self.rows = _FormattedRows(self)
+        self.view = range(0)
+        self.filter = None
+        self.sort_by = None
+        self._permutations = {}
+        # (欄位, filter, 篩選後的升冪排列)：篩選不變時切換升降冪不必重新過濾
+        self._filtered = None
+
+    def __len__(self):
+        return len(self.view)
+
+    def format_row(self, i):
+        """第 i 筆資料（原始順序）的顯示列。"""
+        return [self.keywords[i]] + [FORMATTERS[c](self.numbers[c][i]) for c in NUMERIC_COLUMNS]
+
+    def row(self, i):
+        """view 中第 i 列的顯示列。"""
+        return self.format_row(self.view[i])
+
+    def window(self, start, count):
+        """view 中從 start 開始最多 count 列的顯示列。"""
+        return [self.format_row(i) for i in self.view[start:start + count]]
+
+    def extend(self, columns):
+        """附加 (keywords, 排名, 點擊, 曝光, 點擊率) 欄；沒有篩選時新的列也會顯示。"""
+        keywords, *numbers = columns
+        self.keywords.extend(keywords)
+        for c, values in zip(NUMERIC_COLUMNS, numbers):
+            self.numbers[c].extend(values)
+        self._permutations.clear()
+        self._filtered = None
+        self._update_view()
+
+    def set_filter(self, indices=None):
+        """只顯示 indices（原始順序的列索引，例如 filter_indices 的結果）；None 表示顯示全部。排序維持不變。"""
+        self.filter = indices
+        self._update_view()
+
+    def sort(self, col, descending=False):
+        """依 col 排序顯示的列；col 為 None 時回到原始順序。篩選維持不變。"""
+        self.sort_by = None if col is None else (col, descending)
+        self._update_view()
+
+    def permutation(self, col):
+        """col 升冪排序的列索引（argsort，相同值維持原始順序），第一次依該欄排序時才計算並快取。"""
+        perm = self._permutations.get(col)
+        if perm is None:
+            keys = self.sort_keys(col)
+            perm = self._permutations[col] = array('I', sorted(range(len(keys)), key=keys.__getitem__))
+        return perm
+
+    def _update_view(self):
+        if self.sort_by is None:
+            self.view = range(len(self.keywords)) if self.filter is None else self.filter
+            return
+        col, descending = self.sort_by
+        perm = self.permutation(col)
+        if self.filter is not None:
+            cached = self._filtered
+            if cached is None or cached[0] != col or cached[1] is not self.filter:
+                mask = bytearray(len(self.keywords))
+                for i in self.filter:
+                    mask[i] = 1
+                cached = self._filtered = (col, self.filter, array('I', (i for i in perm if mask[i])))
+            perm = cached[2]
+        self.view = perm[::-1] if descending else perm
+
+    def column(self, col):
+        """整欄的資料：關鍵字欄為字串 list，其餘為 array('d')。"""
+        return self.keywords if col == DISPLAY_COLUMNS[0] else self.numbers[col]
+
+    def column_data(self):
+        """{欄名: 整欄資料}，可直接交給 pandas.DataFrame（數值欄保留型別，缺值為 NaN）。"""
+        return {c: self.column(c) for c in self.columns}
+
+    def sort_keys(self, col):
+        """排序用的鍵：關鍵字欄為字串，數值欄缺值視為 0。"""
+        if col not in self.numbers:
+            return self.keywords
+        return [0.0 if v != v else v for v in self.numbers[col]]
+
+    def filter_indices(self, col, op, text):
+        """符合條件的列索引（原始順序）：關鍵字欄為不分大小寫的包含；數值欄以 op（'>'、'='、'<'）比較，缺值不符合。
+
+        text 不是數字時丟出 ValueError。
+        """
+        if col not in self.numbers:
+            text = text.lower()
+            return [i for i, kw in enumerate(self.keywords) if text in kw.lower()]
+        target = float(text)
+        values = self.numbers[col]
+        if op == '>':
+            return [i for i, v in enumerate(values) if v > target]
+        if op == '<':
+            return [i for i, v in enumerate(values) if v < target]
+        return [i for i, v in enumerate(values) if abs(v - target) < 1e-9]
+
+    def stats(self):
+        """(關鍵字數, 總點擊, 總曝光, 平均排名)；沒有任何排名時平均排名為 None。"""
+        positions = [v for v in self.numbers['排名'] if v == v]
+        return (
+            len(self.keywords),
+            sum(v for v in self.numbers['點擊'] if v == v),
+            sum(v for v in self.numbers['曝光'] if v == v),
+            sum(positions) / len(positions) if positions else None,
+        )
+
+
+def _report_column_indexes(header):
+    """標題列中 (關鍵字, 點擊, 曝光, 排名) 各欄的位置，找不到的欄為 None。"""
+    src_cols = [str(c).strip().lower() for c in header]
+
+    def idx(names):
+        for n in names:
+            if n in src_cols:
+                return src_cols.index(n)
+        return None
+
+    return (idx(['keyword', 'query']), idx(['clicks', 'click']), idx(['impressions', 'impression']),
+            idx(['position', 'avg_position', 'pos']))
+
+
+def _ctr(clicks, impressions):
+    # 點擊率（%）取兩位小數；曝光缺值或為 0 時為 NaN，點擊缺值視為 0
+    if impressions == impressions and impressions:
+        return round((0.0 if clicks != clicks else clicks) / impressions * 100, 2)
+    return NAN
+
+
+def report_row_parser(header):
+    """依報表標題列回傳解析函式：原始列 -> (關鍵字, 排名, 點擊, 曝光, 點擊率) 的型別值。
+
+    排名取一位小數，點擊率（%）由點擊 / 曝光計算並取兩位小數；缺值或無法解析為 NaN。
+    """
+    idx_keyword, idx_clicks, idx_impr, idx_pos = _report_column_indexes(header)
+
+    def cell(r, i):
+        return r[i] if i is not None and i < len(r) else ''
+
+    def parse(r):
+        clicks = _number(cell(r, idx_clicks))
+        impressions = _number(cell(r, idx_impr))
+        return str(cell(r, idx_keyword)), round(_number(cell(r, idx_pos)), 1), clicks, impressions, _ctr(clicks, impressions)
+
+    return parse
+
+
+def _to_columns(rows):
+    # [(keyword, 排名, 點擊, 曝光, 點擊率), ...] -> (keywords, array, array, array, array)
+    keywords, *numbers = zip(*rows)
+    return (list(keywords), *(array('d', values) for values in numbers))
+
+
+def _sample_blocks(fh, size, head):
+    """除了開頭 head，另取檔案 1/3、2/3 處與結尾各一小段（從下一個換行之後開始，避免切在多位元組字元中間）。"""
+    blocks = [head]
+    if size > 2 * SNIFF_BYTES:
+        step = SNIFF_BYTES // 4
+        for offset in (size // 3, 2 * size // 3, size - step):
+            fh.seek(offset)
+            block = fh.read(step)
+            blocks.append(block[block.find(b'\n') + 1:])
+    return blocks
+
+
+def _decodes(blocks, encoding):
+    # final=False：樣本結尾切斷的多位元組字元不算錯誤
+    try:
+        for block in blocks:
+            codecs.getincrementaldecoder(encoding)().decode(block, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def sniff_encoding(path):
+    """以 BOM 與有限大小的樣本（開頭 64 KB 加上分散在檔案中的幾小段）判斷 CSV 的編碼，不讀取整個檔案。
+
+    結果依 (路徑, mtime) 快取，檔案未變更時不再讀取。沒有 BOM 的 UTF-16 以 NUL 位元組的位置判斷位元組順序。
+    """
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns)
+    encoding = _encoding_cache.get(key)
+    if encoding:
+        return encoding
+    with open(path, 'rb') as fh:
+        head = fh.read(SNIFF_BYTES)
+        if head.startswith(codecs.BOM_UTF8):
+            encoding = 'utf-8-sig'
+        elif head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            encoding = 'utf-16'
+        elif b'\x00' in head:
+            encoding = 'utf-16-le' if head[1::2].count(0) >= head[0::2].count(0) else 'utf-16-be'
+        else:
+            blocks = _sample_blocks(fh, st.st_size, head)
+            encoding = next(enc for enc in CSV_ENCODINGS if _decodes(blocks, enc))
+    _encoding_cache[key] = encoding
+    return encoding
+
+
+def report_encoding(path):
+    """Parquet / Arrow 回傳 'parquet' / 'arrow'；CSV 回傳 sniff_encoding 判斷的編碼。"""
+    if is_columnar_path(path):
+        return 'parquet' if path.lower().endswith('.parquet') else 'arrow'
+    return sniff_encoding(path)
+
+
+def iter_report_chunks(path, encoding, max_rows=None, chunk_size=20000):
+    """逐段讀取並解析報表，yield (columns, fraction)；columns 為 TableModel.extend 接受的欄，fraction 為已讀取的比例（0..1）。
+
+    編碼只依樣本判斷，樣本以外若有無法解碼的位元組，以替代字元顯示而不中斷載入。
+    """
+    if encoding in ('parquet', 'arrow'):
+        # 欄式格式：欄位已有型別，不需猜測編碼
+        yield from _iter_columnar_chunks(path, max_rows, chunk_size)
+        return
+    size = os.path.getsize(path) or 1
+    with open(path, newline='', encoding=encoding, errors='replace') as fh:
+        reader = csv.reader(fh)
+        parse = report_row_parser(next(reader, []))
+        chunk = []
+        for i, r in enumerate(reader):
+            if max_rows is not None and i >= max_rows:
+                break
+            chunk.append(parse(r))
+            if len(chunk) >= chunk_size:
+                # 文字模式迭代中不能 tell()，以底層 buffer 的位置估計進度
+                yield _to_columns(chunk), min(1.0, fh.buffer.tell() / size)
+                chunk = []
+        if chunk:
+            yield _to_columns(chunk), 1.0
+
+
+def _numeric_values(column, length):
+    """record batch 中的一欄 -> float list（缺值為 NaN）；數值型別直接轉換，其他型別（例如字串）逐值以 _number 解析。"""
+    if column is None:
+        return [NAN] * length
+    import pyarrow as pa
+
+    if pa.types.is_integer(column.type) or pa.types.is_floating(column.type) or pa.types.is_decimal(column.type):
+        return column.cast(pa.float64()).fill_null(NAN).to_pylist()
+    return [_number('' if v is None else str(v)) for v in column.to_pylist()]
+
+
+def _iter_columnar_chunks(path, max_rows, chunk_size):
+    # 逐個 record batch 讀取 Parquet / Arrow 報表，直接由有型別的欄建立 TableModel 的欄，不經過字串再解析
+    names, total, batches = open_columnar_batches(path, batch_size=chunk_size)
+    if max_rows is not None:
+        total = min(total, max_rows)
+    indexes = _report_column_indexes(names)
+    done = 0
+    # Arrow 檔的 batch 大小由寫入端決定，較大的 batch 再切成 chunk_size 列（slice 不複製資料）
+    pieces = (batch.slice(offset, chunk_size) for batch in batches for offset in range(0, batch.num_rows, chunk_size))
+    for batch in pieces:
+        if done >= total:
+            break
+        n = min(batch.num_rows, total - done)
+        batch = batch.slice(0, n)
+        keyword, clicks, impressions, position = (None if i is None else batch.column(i) for i in indexes)
+        keywords = ([''] * n if keyword is None else
+                    ['' if v is None else str(v) for v in keyword.to_pylist()])
+        clicks = _numeric_values(clicks, n)
+        impressions = _numeric_values(impressions, n)
+        positions = [round(v, 1) for v in _numeric_values(position, n)]
+        ctrs = list(map(_ctr, clicks, impressions))
+        done += n
+        yield (keywords, *(array('d', values) for values in (positions, clicks, impressions, ctrs))), done / total
+
+
+class TableLoader:
+    """在背景 thread 讀取報表，訊息依序放進 queue，由主執行緒呼叫 poll() 取出：
+
+    ('encoding', 編碼或 'parquet' / 'arrow')、('rows', 欄, 進度)、最後為 ('done',) 或 ('error', 例外)。
+    """
+
+    def __init__(self, path, max_rows=None, chunk_size=20000):
+        self.path = path
+        self.max_rows = max_rows
+        self.chunk_size = chunk_size
+        self._queue = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """停止讀取（例如表格被清除或開始載入另一個檔案）。"""
+        self._cancel.set()
+
+    def _run(self):
+        try:
+            encoding = report_encoding(self.path)
+            self._queue.put(('encoding', encoding))
+            for rows, fraction in iter_report_chunks(self.path, encoding, self.max_rows, self.chunk_size):
+                if self._cancel.is_set():
+                    return
+                self._queue.put(('rows', rows, fraction))
+            self._queue.put(('done',))
+        except Exception as e:
+            self._queue.put(('error', e))
+
+    def poll(self):
+        """取出目前累積的所有訊息（不等待）。"""
+        messages = []
+        while True:
+            try:
+                messages.append(self._queue.get_nowait())
+            except queue.Empty:
+                return messages
+
+
+def clamp_top(top, total, visible):
+    """第一個可見列的位置限制在 0 到 total - visible 之間。"""
+    return max(0, min(top, total - visible))
+
+
+def scroll_fractions(top, total, visible):
+    """捲軸的 (first, last)，與 Scrollbar.set 的參數相同。"""
+    if total <= 0:
+        return 0.0, 1.0
+    return top / total, min(1.0, (top + visible) / total)
+
+
+class VirtualTable:
+    """以固定數量的 Treeview item 顯示 TableModel 的可見範圍。
+
+    tree 屬性為底層的 ttk.Treeview，欄位標題、欄寬與事件綁定照常使用；
+    tree.item(iid, 'values') 取得的是該 item 目前顯示的資料列。
+    """
+
+    def __init__(self, master, model, height=40):
+        self.model = model
+        self.top = 0
+        self.tree = ttk.Treeview(master, columns=model.columns, show='headings', height=height, selectmode='browse')
+        self.vsb = ttk.Scrollbar(master, orient='vertical', command=self.yview)
+        self.hsb = ttk.Scrollbar(master, orient='horizontal', command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.hsb.set)
+        self._slots = [self.tree.insert('', tk.END) for _ in range(height)]
+        self._attached = len(self._slots)
+        # 選取的是資料列（view 中的位置），捲動時跟著移動
+        self._selected = None
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self._scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda e: self._scroll_by(3))
+        for key, step in (('<Up>', -1), ('<Down>', 1)):
+            self.tree.bind(key, lambda e, s=step: self._move_selection(s))
+        self.tree.bind('<Prior>', lambda e: self._scroll_by(-len(self._slots)))
+        self.tree.bind('<Next>', lambda e: self._scroll_by(len(self._slots)))
+        self.tree.bind('<Home>', lambda e: self._scroll_to(0))
+        self.tree.bind('<End>', lambda e: self._scroll_to(len(self.model)))
+        self.tree.bind('<Configure>', self._on_configure)
+        # 建立時 model 通常是空的、沒有可量測的列；第一次有資料繪製後再依實際高度調整 item 數量
+        self._fitted = False
+        self._fit_job = None
+        self.tree.tag_configure('even', background='#ffffff')
+        self.tree.tag_configure('odd', background='#f6f6f6')
+        self.refresh()
+
+    def grid(self, row, column):
+        self.tree.grid(row=row, column=column, sticky='nsew')
+        self.vsb.grid(row=row, column=column + 1, sticky='ns')
+        self.hsb.grid(row=row + 1, column=column, sticky='ew')
+
+    def destroy(self):
+        if self._fit_job is not None:
+            self.tree.after_cancel(self._fit_job)
+        for w in (self.tree, self.vsb, self.hsb):
+            w.destroy()
+
+    # ----- 繪製 -----
+    def refresh(self, keep_position=False):
+        """依 model 重新繪製；資料或 view 改變後呼叫。預設捲回頂端並清除選取。"""
+        if not keep_position:
+            self.top = 0
+            self._selected = None
+        self._render()
+
+    def _render(self):
+        total = len(self.model)
+        self.top = clamp_top(self.top, total, len(self._slots))
+        rows = self.model.window(self.top, len(self._slots))
+        # 資料不足一個畫面時，多出來的 item 暫時 detach，不顯示空白列
+        for i in range(self._attached, len(rows)):
+            self.tree.move(self._slots[i], '', i)
+        for i in range(len(rows), self._attached):
+            self.tree.detach(self._slots[i])
+        self._attached = len(rows)
+        for i, values in enumerate(rows):
+            pos = self.top + i
+            self.tree.item(self._slots[i], values=values, tags=('even' if pos % 2 == 0 else 'odd',))
+        selected = self._selected is not None and 0 <= self._selected - self.top < len(rows)
+        self.tree.selection_set([self._slots[self._selected - self.top]] if selected else [])
+        self.vsb.set(*scroll_fractions(self.top, total, len(rows)))
+        if rows and not self._fitted and self._fit_job is None:
+            self._fit_job = self.tree.after_idle(self._fit)
+
+    def _fit(self):
+        # 先完成尚未處理的版面配置，bbox 才量得到剛填入資料的列；仍量不到時下一次繪製會再試
+        self._fit_job = None
+        self.tree.update_idletasks()
+        self._on_configure()
+
+    def _scroll_to(self, top):
+        if clamp_top(top, len(self.model), len(self._slots)) != self.top:
+            self.top = top
+            self._render()
+        return 'break'
+
+    def _scroll_by(self, rows):
+        return self._scroll_to(self.top + rows)
+
+    # ----- 事件 -----
+    def yview(self, *args):
+        """垂直捲軸的 command：('moveto', fraction) 或 ('scroll', n, 'units' | 'pages')。"""
+        if args[0] == 'moveto':
+            self._scroll_to(int(float(args[1]) * len(self.model)))
+        elif args[0] == 'scroll':
+            step = len(self._slots) if args[2] == 'pages' else 1
+            self._scroll_by(int(args[1]) * step)
+
+    def _on_mousewheel(self, event):
+        # Windows 的 delta 為 120 的倍數，macOS 為較小的整數
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_by(-3 * delta)
+
+    def _on_select(self, event=None):
+        sel = self.tree.selection()
+        if sel and sel[0] in self._slots:
+            self._selected = self.top + self._slots.index(sel[0])
+
+    def _move_selection(self, step):
+        total = len(self.model)
+        if not total:
+            return 'break'
+        pos = self.top if self._selected is None else max(0, min(self._selected + step, total - 1))
+        self._selected = pos
+        if pos < self.top:
+            self.top = pos
+        elif pos >= self.top + len(self._slots):
+            self.top = pos - len(self._slots) + 1
+        self._render()
+        return 'break'
+
+    def _on_configure(self, event=None):
+        # 依視窗實際高度調整 item 數量（以第一列的 bbox 取得標題列與每列的高度）
+        if not self._attached:
+            return
+        bbox = self.tree.bbox(self._slots[0])
+        if not bbox or bbox[3] <= 0:
+            return
+        self._fitted = True
+        fits = max(1, (self.tree.winfo_height() - bbox[1]) // bbox[3])
+        if fits == len(self._slots):
+            return
+        if fits > len(self._slots):
+            new = [self.tree.insert('', tk.END) for _ in range(fits - len(self._slots))]
+            for iid in new:
+                self.tree.detach(iid)
+            self._slots.extend(new)
+        else:
+            for iid in self._slots[fits:]:
+                self.tree.delete(iid)
+            del self._slots[fits:]
+            self._attached = min(self._attached, fits)
+        self._render()
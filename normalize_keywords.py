@@ -3,50 +3,80 @@
 簡單工具：將單行、逗號分隔或每行一個關鍵字的 allKeyWord.csv 轉成每行一個關鍵字的 CSV
 
 輸出檔案：allKeyWord_normalized.csv（每行一個關鍵字，UTF-8-SIG）
+重複的關鍵字（忽略大小寫、全形 / 半形與多餘空白）只保留第一次出現的寫法；加上 --keep-duplicates 則全部保留。
 """
 import csv
+import itertools
 import sys
 import os
 
 
-def normalize(in_path, out_path):
-    kws = []
+def iter_file_keywords(in_path):
+    """逐列讀取輸入檔並 yield 關鍵字；只預讀前兩列判斷格式，不把整個檔案載入記憶體。"""
     with open(in_path, newline="", encoding="utf-8-sig") as fh:
         reader = csv.reader(fh)
-        rows = list(reader)
-        if not rows:
-            print("輸入檔案為空")
+        first = next(reader, None)
+        if first is None:
             return
-        # 情形 A: 單列但 csv.reader 已把逗號分割成多個欄位
-        if len(rows) == 1 and len(rows[0]) > 1:
-            kws = [p.strip() for p in rows[0] if p.strip()]
-        # 情形 B: 單列且整個欄位是用逗號串接的長字串
-        elif len(rows) == 1 and "," in rows[0][0]:
-            parts = [p.strip() for p in rows[0][0].split(",") if p.strip()]
-            kws = parts
-        else:
-            for row in rows:
-                if not row:
-                    continue
-                kws.append(row[0].strip())
-
-    # 寫出每行一個關鍵字
+        second = next(reader, None)
+        if second is None:
+            # 情形 A: 單列但 csv.reader 已把逗號分割成多個欄位
+            if len(first) > 1:
+                yield from (p.strip() for p in first if p.strip())
+            # 情形 B: 單列且整個欄位是用逗號串接的長字串
+            elif first and "," in first[0]:
+                yield from (p.strip() for p in first[0].split(",") if p.strip())
+            elif first:
+                yield first[0].strip()
+            return
+        for row in itertools.chain([first, second], reader):
+            if not row:
+                continue
+            yield row[0].strip()
+
+
+def normalize(in_path, out_path, dedupe=True):
+    kws = iter_file_keywords(in_path)
+    first = next(kws, None)
+    if first is None:
+        print("輸入檔案為空")
+        return
+    total = 0
+
+    def counted(items):
+        nonlocal total
+        for kw in items:
+            total += 1
+            yield kw
+
+    kws = counted(itertools.chain([first], kws))
+    if dedupe:
+        from gsc_keyword_report import iter_unique_keywords
+
+        kws = iter_unique_keywords(kws)
+
+    # 邊讀邊寫出每行一個關鍵字
+    written = 0
     with open(out_path, "w", newline="", encoding="utf-8-sig") as fh:
         writer = csv.writer(fh)
         for k in kws:
             writer.writerow([k])
+            written += 1
 
-    print(f"已寫出 {len(kws)} 個關鍵字到 {out_path}")
+    if written < total:
+        print(f"移除 {total - written} 個重複關鍵字")
+    print(f"已寫出 {written} 個關鍵字到 {out_path}")
 
 
 if __name__ == "__main__":
     in_path = "allKeyWord.csv"
     out_path = "allKeyWord_normalized.csv"
-    if len(sys.argv) >= 2:
-        in_path = sys.argv[1]
-    if len(sys.argv) >= 3:
-        out_path = sys.argv[2]
+    args = [a for a in sys.argv[1:] if a != "--keep-duplicates"]
+    if len(args) >= 1:
+        in_path = args[0]
+    if len(args) >= 2:
+        out_path = args[1]
     if not os.path.exists(in_path):
         print(f"找不到輸入檔：{in_path}")
         sys.exit(2)
-    normalize(in_path, out_path)
+    normalize(in_path, out_path, dedupe="--keep-duplicates" not in sys.argv)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+rate_limiter.py
+
+共用的 token bucket 速率限制器，讓多個 thread 一起遵守 GSC API 的每秒 / 每分鐘請求配額。
+
+用法：
+  limiter = RateLimiter(per_second=10, per_minute=1200)
+  limiter.acquire()  # 每次送出請求前呼叫，必要時會 sleep 到有 token 為止
+  await limiter.acquire_async()  # asyncio 程式碼中使用
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    """以固定速率 rate（token/秒）補充、最多存 capacity 個 token 的 bucket。非 thread-safe，由 RateLimiter 加鎖。"""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate 必須大於 0")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._last = clock()
+
+    def refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def wait_time(self):
+        # 距離下一個 token 可用還需等待的秒數（已有 token 時為 0）；容許浮點誤差，避免極小的等待反覆迴圈
+        if self.tokens >= 1 - 1e-9:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """同時套用每秒與每分鐘上限的 thread-safe 限速器；所有 bucket 都有 token 時才放行一個請求。"""
+
+    def __init__(self, per_second=None, per_minute=None, clock=time.monotonic, sleep=time.sleep):
+        self._lock = threading.Lock()
+        self._sleep = sleep
+        self._buckets = []
+        if per_second:
+            self._buckets.append(TokenBucket(per_second, clock=clock))
+        if per_minute:
+            # 每分鐘配額以平滑速率發放，burst 上限為一秒的量，避免一開始就把整分鐘的配額用完
+            self._buckets.append(TokenBucket(per_minute / 60.0, capacity=max(1.0, per_minute / 60.0), clock=clock))
+        self.acquired = 0
+        self.waited = 0.0
+
+    def _reserve(self):
+        # 有 token 時取走一個並回傳 0，否則回傳需等待的秒數
+        with self._lock:
+            for b in self._buckets:
+                b.refill()
+            wait = max([b.wait_time() for b in self._buckets] or [0.0])
+            if wait <= 0:
+                for b in self._buckets:
+                    b.tokens -= 1
+                self.acquired += 1
+                return 0.0
+            self.waited += wait
+            return wait
+
+    def acquire(self):
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            self._sleep(wait)
+
+    async def acquire_async(self):
+        # asyncio 版本：等待期間讓出 event loop，不阻塞其他進行中的請求
+        import asyncio
+
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
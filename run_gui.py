@@ -24,6 +24,9 @@ import re
 from datetime import date, timedelta
 from datetime import datetime
 
+from gsc_writer import is_columnar_path, pyarrow_available
+from gui_table import NUMERIC_COLUMNS, TableLoader, TableModel, VirtualTable
+
 # Try to import ttkbootstrap for modern theming. Style will be created
 # in the App __init__ (bound to the existing Tk root) to avoid creating
 # a second hidden root window.
@@ -37,6 +40,11 @@ except Exception:
 
 
 SCRIPT = "gsc_keyword_report.py"
+DAYSTORE_PATH = ".gsc_days.sqlite"
+# 自動載入時偵測的報表格式
+REPORT_PATTERNS = ('*.csv', '*.parquet', '*.arrow', '*.feather')
+# 背景載入表格時，主執行緒取出已讀取資料的間隔（毫秒）
+LOAD_POLL_MS = 50
 
 
 class App(tk.Tk):
@@ -149,6 +157,11 @@ class App(tk.Tk):
         self.outbase_var = tk.StringVar(value="gsc_keyword_report")
         ttk.Entry(frm, textvariable=self.outbase_var, width=30, style='Uniform.TEntry').grid(row=5, column=1, sticky=tk.W, padx=(8,8), pady=(2,2))
 
+        # incremental per-day store: overlapping preset ranges only download missing days.
+        # opt-in (like the CLI flag): date+query rows are far more numerous than query rows
+        self.daystore_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frm, text='使用本機每日資料庫（只下載缺少的日子）', variable=self.daystore_var).grid(row=6, column=1, columnspan=3, sticky=tk.W, padx=(8,8), pady=(2,2))
+
         # 輸出格式已移至下方按鈕列，預設值保留
         self.format_var = tk.StringVar(value='CSV')
 
@@ -199,8 +212,13 @@ class App(tk.Tk):
             self.stats_label.grid(row=0, column=0, columnspan=2, sticky=tk.W, padx=(4,4), pady=(4,8))
         except Exception:
             self.stats_label = None
+        # determinate progress for the background table load (shown next to the stats only while loading)
+        self.load_progress = ttk.Progressbar(self.table_frame, mode='determinate', maximum=1.0, length=160)
 
         self.tree = None
+        self.table = None
+        self.table_model = None
+        self._table_loader = None
         self.current_rows = []
         self.current_columns = []
         btn_frame = ttk.Frame(frm)
@@ -215,7 +233,7 @@ class App(tk.Tk):
         # if ttkbootstrap is present, use its Button for nicer style
         # format combobox placed to the left of the save button for clarity
         try:
-            self.fmt_combo_btn = ttk.Combobox(btn_frame, textvariable=self.format_var, values=['CSV', 'Excel (.xlsx)'], state='readonly', width=18, style='Uniform.TCombobox')
+            self.fmt_combo_btn = ttk.Combobox(btn_frame, textvariable=self.format_var, values=['CSV', 'Excel (.xlsx)', 'Parquet'], state='readonly', width=18, style='Uniform.TCombobox')
             self.fmt_combo_btn.grid(row=0, column=0, padx=(0,8), pady=(0,0))
         except Exception:
             pass
@@ -282,7 +300,7 @@ class App(tk.Tk):
                 btn.configure(style='Preset.TButton')
 
     def browse_kws(self):
-        p = filedialog.askopenfilename(initialdir='.', filetypes=[('CSV files','*.csv'),('All files','*.*')])
+        p = filedialog.askopenfilename(initialdir='.', filetypes=[('CSV files','*.csv'),('Parquet / Arrow','*.parquet *.arrow *.feather'),('All files','*.*')])
         if p:
             self.kws_var.set(p)
 
@@ -314,16 +332,24 @@ class App(tk.Tk):
         self.last_preset = '上個月'
 
     def clear_table(self):
-        if self.tree:
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            self.tree.destroy()
+        if self._table_loader:
+            self._table_loader.cancel()
+            self._table_loader = None
+            self.load_progress.grid_remove()
+        # filter UI is recreated once the next table has finished loading
+        if getattr(self, 'filter_frame', None):
+            self.filter_frame.destroy()
+            self.filter_frame = None
+        if self.table:
+            self.table.destroy()
+            self.table = None
+            self.table_model = None
             self.tree = None
             self.current_rows = []
             self.current_columns = []
 
-    def load_csv_into_table(self, path, max_rows=10000):
-        # read CSV and populate Treeview
+    def load_csv_into_table(self, path, max_rows=None):
+        # start loading a CSV / Parquet / Arrow report into the table; must be called on the main thread
         # resolve path for PyInstaller onefile bundles (sys._MEIPASS) if needed
         try:
             if not os.path.exists(path) and getattr(sys, 'frozen', False):
@@ -343,103 +369,19 @@ class App(tk.Tk):
                     self.kws_var.set(bundle_kws)
         except Exception:
             pass
-        rows = []
-        header = []
-        used_encoding = None
-        encodings_to_try = ['utf-8-sig', 'utf-8', 'utf-16', 'cp950', 'cp936', 'latin1']
-        for enc in encodings_to_try:
-            try:
-                with open(path, newline='', encoding=enc) as fh:
-                    reader = csv.reader(fh)
-                    try:
-                        header = next(reader)
-                    except StopIteration:
-                        header = []
-                    rows = []
-                    for i, r in enumerate(reader):
-                        rows.append(r)
-                        if i+1 >= max_rows:
-                            break
-                used_encoding = enc
-                break
-            except UnicodeDecodeError:
-                # try next encoding
-                continue
-            except Exception as e:
-                # for other errors, log and try next
-                self.append_log(f'嘗試使用編碼 {enc} 讀取失敗: {e}')
-                continue
-        if not used_encoding:
-            raise ValueError('無法開啟 CSV：不支援的編碼或檔案已損毀')
-
         # clear existing
         self.clear_table()
 
-        # map headers to Chinese columns if possible
-        src_cols = [c.strip().lower() for c in header]
-        # find indices
-        def idx(names):
-            for n in names:
-                if n in src_cols:
-                    return src_cols.index(n)
-            return None
-
-        idx_keyword = idx(['keyword', 'query'])
-        idx_clicks = idx(['clicks', 'click'])
-        idx_impr = idx(['impressions', 'impression'])
-        idx_pos = idx(['position', 'avg_position', 'pos'])
-
-        # Desired columns: Keyword, Position, Clicks, Impressions, CTR
-        display_cols = ['關鍵字', '排名', '點擊', '曝光', '點擊率']
-        mapped_rows = []
-        for r in rows:
-            mapped = []
-            # keyword
-            mapped.append(r[idx_keyword] if idx_keyword is not None and idx_keyword < len(r) else '')
-            # position
-            try:
-                pv = float(str(r[idx_pos]).replace(',',''))
-                mapped.append(str(round(pv, 1)))
-            except Exception:
-                mapped.append(r[idx_pos] if idx_pos is not None and idx_pos < len(r) else '')
-            # clicks
-            mapped.append(r[idx_clicks] if idx_clicks is not None and idx_clicks < len(r) else '')
-            # impressions
-            mapped.append(r[idx_impr] if idx_impr is not None and idx_impr < len(r) else '')
-            # ctr (clicks / impressions)
-            try:
-                c = float(str(r[idx_clicks]).replace(',', '')) if idx_clicks is not None and idx_clicks < len(r) and str(r[idx_clicks]) != '' else 0.0
-            except Exception:
-                c = 0.0
-            try:
-                im = float(str(r[idx_impr]).replace(',', '')) if idx_impr is not None and idx_impr < len(r) and str(r[idx_impr]) != '' else 0.0
-            except Exception:
-                im = 0.0
-            if im:
-                ctr = f"{round((c / im) * 100, 2)}%"
-            else:
-                ctr = ''
-            mapped.append(ctr)
-            mapped_rows.append(mapped)
-
-        self.current_columns = display_cols
-        self.current_rows = mapped_rows
-
-        # log detected encoding for debugging
-        try:
-            self.append_log(f'已偵測 CSV 編碼：{used_encoding}')
-        except Exception:
-            pass
-
-        # create tree (height shows ~40 rows; 加大一倍以顯示更多結果)
-        # place the tree below the stats label (row=1)
-        tree = ttk.Treeview(self.table_frame, columns=display_cols, show='headings', height=40)
-        vsb = ttk.Scrollbar(self.table_frame, orient='vertical', command=tree.yview)
-        hsb = ttk.Scrollbar(self.table_frame, orient='horizontal', command=tree.xview)
-        tree.configure(yscroll=vsb.set, xscroll=hsb.set)
-        tree.grid(row=2, column=0, sticky='nsew')
-        vsb.grid(row=2, column=1, sticky='ns')
-        hsb.grid(row=3, column=0, sticky='ew')
+        # virtualized table: only the visible rows (~40) exist as Treeview items, so the whole
+        # report can be loaded; place the tree below the stats label (row=1)
+        # typed columnar model: numbers are parsed once while loading; current_rows is a
+        # read-only view that formats display rows on access
+        self.table_model = TableModel()
+        self.current_columns = list(self.table_model.columns)
+        self.current_rows = self.table_model.rows
+        self.table = VirtualTable(self.table_frame, self.table_model, height=40)
+        tree = self.table.tree
+        self.table.grid(row=2, column=0)
         self.table_frame.rowconfigure(2, weight=1)
         self.table_frame.columnconfigure(0, weight=1)
 
@@ -450,7 +392,7 @@ class App(tk.Tk):
         except Exception:
             pass
 
-        for i, c in enumerate(display_cols):
+        for i, c in enumerate(self.current_columns):
             if i == 0:
                 tree.heading(c, text=c, anchor='w')
             else:
@@ -461,48 +403,63 @@ class App(tk.Tk):
             else:
                 tree.column(c, width=160, anchor='e')
 
-        # insert rows with alternating background (visual separator)
-        try:
-            for idx, r in enumerate(mapped_rows):
-                tag = 'even' if idx % 2 == 0 else 'odd'
-                # ensure numeric columns are right aligned; set tag for entire row
-                tree.insert('', tk.END, values=r, tags=(tag,))
-            # configure tag backgrounds
-            try:
-                tree.tag_configure('even', background='#ffffff')
-                tree.tag_configure('odd', background='#f6f6f6')
-            except Exception:
-                pass
-        except Exception:
-            for r in mapped_rows:
-                tree.insert('', tk.END, values=r)
-
         self.tree = tree
 
-        # update statistics line (single row, separated by |)
+        # parse and map rows in a background thread; chunks are handed to the main loop
+        # through the loader's queue (polled with after()), so the first rows show up right away
+        self._table_loader = TableLoader(path, max_rows).start()
+        self.stats_line_var.set('載入中…')
         try:
-            kw_count = len(mapped_rows)
-            total_clicks = 0
-            total_impr = 0
-            pos_vals = []
-            for r in mapped_rows:
-                # clicks (col 2), impressions (col 3), position (col 1)
-                try:
-                    c = str(r[2]).replace(',', '')
-                    total_clicks += float(c) if c != '' else 0.0
-                except Exception:
-                    pass
-                try:
-                    im = str(r[3]).replace(',', '')
-                    total_impr += float(im) if im != '' else 0.0
-                except Exception:
-                    pass
+            self.load_progress['value'] = 0
+            self.load_progress.grid(row=0, column=0, columnspan=2, sticky=tk.E, padx=(4,4), pady=(4,8))
+        except Exception:
+            pass
+        self.after(LOAD_POLL_MS, self._poll_table_loader, self._table_loader)
+
+    def _poll_table_loader(self, loader):
+        # runs on the main loop: append the chunks parsed so far and keep polling until done
+        if loader is not self._table_loader:
+            # superseded by a newer load or the table was cleared
+            return
+        for msg in loader.poll():
+            if msg[0] == 'encoding':
+                # log detected encoding for debugging
+                if msg[1] in ('parquet', 'arrow'):
+                    self.append_log(f'已載入 {msg[1]} 報表')
+                else:
+                    self.append_log(f'已偵測 CSV 編碼：{msg[1]}')
+            elif msg[0] == 'rows':
+                self.table_model.extend(msg[1])
+                self.table.refresh(keep_position=True)
                 try:
-                    p = float(str(r[1]).replace(',', ''))
-                    pos_vals.append(p)
+                    self.load_progress['value'] = msg[2]
                 except Exception:
                     pass
-            avg_pos = round(sum(pos_vals) / len(pos_vals), 1) if pos_vals else '-'
+                self.stats_line_var.set(f'載入中… {len(self.current_rows)} 列（{msg[2]:.0%}）')
+            elif msg[0] == 'error':
+                self._table_loader = None
+                self.load_progress.grid_remove()
+                self.stats_line_var.set('載入失敗')
+                self.append_log('Failed to load CSV into table: ' + str(msg[1]))
+                return
+            else:
+                self._table_loader = None
+                self.load_progress.grid_remove()
+                self._on_table_loaded()
+                return
+        self.after(LOAD_POLL_MS, self._poll_table_loader, loader)
+
+    def wait_table_loaded(self):
+        """Process events until the background table load finishes (used by tests and the benchmark)."""
+        while self._table_loader is not None:
+            self.update()
+            self.after(10)
+
+    def _on_table_loaded(self):
+        # update statistics line (single row, separated by |)
+        try:
+            kw_count, total_clicks, total_impr, avg_pos = self.table_model.stats()
+            avg_pos = round(avg_pos, 1) if avg_pos is not None else '-'
             stats_text = f'關鍵字數: {kw_count}  |  總點擊: {int(total_clicks)}  |  總曝光: {int(total_impr)}  |  平均排名: {avg_pos}'
             self.stats_line_var.set(stats_text)
         except Exception:
@@ -544,6 +501,24 @@ class App(tk.Tk):
                 messagebox.showinfo('已儲存', f'已儲存 CSV 到 {p}')
             except Exception as e:
                 messagebox.showerror('錯誤', str(e))
+        elif fmt == 'Parquet':
+            p = filedialog.asksaveasfilename(defaultextension='.parquet', filetypes=[('Parquet','*.parquet')], initialfile=self.get_export_filename('.parquet'))
+            if not p:
+                return
+            try:
+                try:
+                    import pandas as pd
+                except Exception:
+                    pd = None
+                if pd is None or not pyarrow_available():
+                    messagebox.showerror('缺少套件', '匯出 Parquet 需要安裝 pandas 和 pyarrow')
+                    return
+                # 數值欄直接使用模型中的型別資料（點擊率為百分比數值，缺值為 NaN）
+                df = pd.DataFrame(self.table_model.column_data())
+                df.to_parquet(p, index=False, compression='zstd')
+                messagebox.showinfo('已儲存', f'已儲存 Parquet 到 {p}')
+            except Exception as e:
+                messagebox.showerror('錯誤', str(e))
         else:
             # Excel export
             p = filedialog.asksaveasfilename(defaultextension='.xlsx', filetypes=[('Excel','*.xlsx')], initialfile=self.get_export_filename('.xlsx'))
@@ -605,34 +580,18 @@ class App(tk.Tk):
             pass
 
     def sort_by_column(self, col, numeric=False):
-        # sort tree items by given column; toggles ascending/descending and update heading indicator
+        # sort the model by given column (the active filter is kept); toggles ascending/descending and update heading indicator
         try:
-            children = list(self.tree.get_children(''))
-            data = [(self.tree.set(k, col), k) for k in children]
-            # try numeric
-            try:
-                # remove percentage / commas
-                def to_num(v):
-                    if isinstance(v, str):
-                        v2 = v.replace('%', '').replace(',', '')
-                        return float(v2) if v2 != '' else 0.0
-                    return float(v)
-                data = [(to_num(v), k) for v, k in data]
-            except Exception:
-                pass
             # toggle state
             cur = self.sort_state.get(col, False)
             # current False means ascending next; set reverse accordingly
             rev = not cur
-            data.sort(reverse=rev)
+            # the model caches one argsort per column, so toggling only flips the cached permutation
+            self.table_model.sort(col, descending=rev)
             # save toggled state
             self.sort_state[col] = not cur
-            for index, (val, k) in enumerate(data):
-                self.tree.move(k, '', index)
-            # after reorder, restore alternating row colors by reassigning tags
-            for i, k in enumerate(self.tree.get_children('')):
-                tag = 'even' if i % 2 == 0 else 'odd'
-                self.tree.item(k, tags=(tag,))
+            # rows are striped by display position, so redrawing the visible window is enough
+            self.table.refresh()
             # update heading indicator
             try:
                 # remove arrows from all headings
@@ -651,9 +610,11 @@ class App(tk.Tk):
         # measure content width and set column widths
         try:
             f = tkfont.Font()
+            # measure a sample only: measuring every row of a large report takes seconds
+            sample = self.current_rows[:1000]
             for i, col in enumerate(self.current_columns):
                 maxw = f.measure(col)
-                for r in self.current_rows:
+                for r in sample:
                     text = str(r[i]) if i < len(r) else ''
                     w = f.measure(text)
                     if w > maxw:
@@ -688,48 +649,19 @@ class App(tk.Tk):
         if not col or val_str == '':
             return
         try:
-            filtered = []
-            idx = self.current_columns.index(col)
-            is_numeric = col in ('排名', '點擊', '曝光', '點擊率')
-            
-            for r in self.current_rows:
-                if idx >= len(r): continue
-                cell_val = str(r[idx])
-                
-                if col == '關鍵字' or not is_numeric:
-                    if val_str in cell_val.lower():
-                        filtered.append(r)
-                else:
-                    # Numeric comparison
-                    try:
-                        c_num = float(cell_val.replace(',', '').replace('%', ''))
-                        v_num = float(val_str)
-                        match = False
-                        if op == '>': match = c_num > v_num
-                        elif op == '=': match = abs(c_num - v_num) < 1e-9
-                        elif op == '<': match = c_num < v_num
-                        if match:
-                            filtered.append(r)
-                    except:
-                        pass
-            
-            # clear tree
-            for it in self.tree.get_children():
-                self.tree.delete(it)
-            for idx, r in enumerate(filtered):
-                tag = 'even' if idx % 2 == 0 else 'odd'
-                self.tree.insert('', tk.END, values=r, tags=(tag,))
+            is_numeric = col in NUMERIC_COLUMNS
+            # compares against the typed columns; a non-numeric value for a numeric column raises ValueError
+            filtered = self.table_model.filter_indices(col, op, val_str)
+            self.table_model.set_filter(filtered)
+            self.table.refresh()
             self.append_log(f'已套用篩選：{col} {op if is_numeric else "包含"} "{val_str}"（{len(filtered)} 筆）')
         except Exception as e:
             self.append_log('篩選失敗: ' + str(e))
 
     def clear_filter(self):
         try:
-            for it in self.tree.get_children():
-                self.tree.delete(it)
-            for idx, r in enumerate(self.current_rows):
-                tag = 'even' if idx % 2 == 0 else 'odd'
-                self.tree.insert('', tk.END, values=r, tags=(tag,))
+            self.table_model.set_filter(None)
+            self.table.refresh()
             self.filter_val_var.set('')
             self.append_log('已清除篩選')
         except Exception as e:
@@ -896,7 +828,7 @@ class App(tk.Tk):
             import time, glob
             while not self._watch_stop:
                 try:
-                    csvs = glob.glob(os.path.join('.', '*.csv'))
+                    csvs = [p for pattern in REPORT_PATTERNS for p in glob.glob(os.path.join('.', pattern))]
                     if not csvs:
                         time.sleep(2)
                         continue
@@ -1029,11 +961,13 @@ class App(tk.Tk):
             try:
                 outputs = []
                 sa_path = self.sa_var.get().strip() if hasattr(self, 'sa_var') else ''
-                out_ext = '.csv' if fmt == 'CSV' else '.xlsx'
+                out_ext = {'CSV': '.csv', 'Parquet': '.parquet'}.get(fmt, '.xlsx')
                 out = self.get_export_filename(out_ext)
                 cli_args = ['--property', prop, '--keywords', kws, '--start-date', start, '--end-date', end, '--output', out]
                 if sa_path:
                     cli_args.extend(['--service-account', sa_path])
+                if self.daystore_var.get():
+                    cli_args.extend(['--day-store', DAYSTORE_PATH])
 
                 # log 查詢參數
                 self.append_log(f'查詢參數: property={prop}, keywords={kws}, start={start}, end={end}, output={out}, service-account={sa_path}')
@@ -1114,11 +1048,9 @@ class App(tk.Tk):
                         if os.path.exists(f):
                             self.append_log(f'Generated: {f}')
                             any_success = True
-                            if f.lower().endswith('.csv'):
-                                try:
-                                    self.load_csv_into_table(f)
-                                except Exception as e:
-                                    self.append_log('Failed to load CSV into table: ' + str(e))
+                            if f.lower().endswith('.csv') or is_columnar_path(f):
+                                # Tk widgets must only be touched on the main thread
+                                self.after(0, lambda p=f: self.load_csv_into_table(p))
                         else:
                             self.append_log(f'Failed to generate: {f}')
                     
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+關鍵字報表熱點路徑的 benchmark。
+
+以固定 seed 產生 1k ~ 1M 個關鍵字的合成資料，量測：
+- load_keywords：讀取關鍵字 CSV
+- match_bulk_rows：bulk 查詢結果與關鍵字比對
+- bulk_index：建立 bulk 查詢結果索引（BulkStore），另以 tracemalloc 量測與 dict of dicts 的記憶體用量
+- exact_single / exact_batch：精確查詢階段，經由完整的 googleapiclient 請求路徑打到本機替身 server
+- write_output_csv / write_output_xlsx：寫出報表
+- normalize_keywords：normalize_keywords.normalize
+- gui_load / gui_sort / gui_filter：App.load_csv_into_table 與表格排序、篩選（需要可用的 Tk 顯示環境，否則略過）
+
+結果存成 JSON（含 commit、Python 版本、每次執行秒數），可用 --compare 比較兩次結果找出效能退化。
+
+用法：
+  python tools/benchmark.py                                  # 全部項目，1k / 10k / 100k / 1M
+  python tools/benchmark.py --sizes 1000,10000 --only load_keywords,match_bulk_rows
+  python tools/benchmark.py --compare benchmark-abc1234.json benchmark-def5678.json
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+import gsc_keyword_report
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+BENCHMARKS = {}
+
+
+def benchmark(name, max_size=None):
+    """註冊 benchmark。函式接收 (workdir, n)，完成準備工作後回傳要計時的 callable；max_size 為預設的規模上限。"""
+
+    def register(fn):
+        BENCHMARKS[name] = (fn, max_size)
+        return fn
+
+    return register
+
+
+class Skip(Exception):
+    """環境不支援此 benchmark（例如沒有顯示環境）。"""
+
+
+def make_keywords(n, seed=0):
+    rng = random.Random(seed)
+    words = ["台北", "美食", "推薦", "價格", "評價", "best", "cheap", "near me", "2025", "ｐｒｏ", "攻略", "review"]
+    return [f"{rng.choice(words)} {rng.choice(words)} {i}" for i in range(n)]
+
+
+def write_keywords(path, keywords):
+    with open(path, "w", newline="", encoding="utf-8-sig") as fh:
+        writer = csv.writer(fh)
+        for kw in keywords:
+            writer.writerow([kw])
+    return path
+
+
+def make_result_rows(keywords, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for kw in keywords:
+        impressions = rng.randint(0, 5000)
+        rows.append({
+            "keyword": kw,
+            "clicks": rng.randint(0, impressions // 10 + 1),
+            "impressions": impressions,
+            "position": round(rng.uniform(1, 60), 2) if impressions else "",
+            "found_by": "bulk",
+        })
+    return rows
+
+
+@contextlib.contextmanager
+def quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@benchmark("load_keywords")
+def bench_load_keywords(workdir, n):
+    path = write_keywords(os.path.join(workdir, f"kws_{n}.csv"), make_keywords(n))
+    return lambda: gsc_keyword_report.load_keywords(path)
+
+
+@benchmark("match_bulk_rows")
+def bench_match_bulk_rows(workdir, n):
+    keywords = make_keywords(n)
+    # API 回傳的列：一半是關鍵字（大小寫不同），另一半是不相干的 query
+    rows = [{"keys": [kw.upper()], "clicks": 1, "impressions": 10, "position": 3.0} for kw in keywords[::2]]
+    rows += [{"keys": [f"other query {i}"], "clicks": 0, "impressions": 1, "position": 9.0} for i in range(n // 2)]
+    random.Random(1).shuffle(rows)
+    return lambda: gsc_keyword_report.match_bulk_rows(iter(rows), keywords)
+
+
+def _traced_bytes(build):
+    # build() 產生的物件在建立完成後仍佔用的記憶體
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        obj = build()
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del obj
+    return size
+
+
+@benchmark("bulk_index")
+def bench_bulk_index(workdir, n):
+    keywords = make_keywords(n)
+
+    def api_rows():
+        # 與分頁回應相同，每列都是新建立的物件，建立索引後即可釋放
+        rng = random.Random(2)
+        for kw in keywords:
+            yield {"keys": [kw.lower()], "clicks": rng.randint(0, 50), "impressions": rng.randint(50, 5000),
+                   "position": round(rng.uniform(1, 60), 2)}
+
+    def build_dict():
+        # 改用 BulkStore 之前的表示方式：每個 query 一個 record dict
+        result = {}
+        for r in api_rows():
+            rec = gsc_keyword_report._row_to_record(r)
+            result.setdefault(gsc_keyword_report.normalize_keyword(rec["query"]), rec)
+        return result
+
+    memory = {
+        "bytes": _traced_bytes(lambda: gsc_keyword_report.build_bulk_index(api_rows())),
+        "dict_bytes": _traced_bytes(build_dict),
+    }
+    return lambda: (gsc_keyword_report.build_bulk_index(api_rows()), memory)[1]
+
+
+def _exact_phase(workdir, n, fetch, items_fn):
+    from gsc_fake_server import FakeSearchConsoleServer, SyntheticDataset
+    from gsc_retry import AdaptiveConcurrency, RetryPolicy
+    from rate_limiter import RateLimiter
+
+    keywords = make_keywords(n)
+    server = FakeSearchConsoleServer(SyntheticDataset(keywords[::2])).start()
+    retry = RetryPolicy(max_retries=3)
+    service = gsc_keyword_report.build_service_stack(
+        None, RateLimiter(), retry, AdaptiveConcurrency(8), api_endpoint=server.endpoint)
+    items = items_fn(keywords)
+
+    def run():
+        server.reset_stats()
+        gsc_keyword_report.run_exact_queries(lambda: service, "https://example.com/", "2025-01-01", "2025-01-31",
+                                             items, fetch=fetch, workers=8, on_result=lambda item, result: None)
+        return {"requests": server.stats()["requests"]}
+
+    # 先跑一次讓替身 server 建好篩選結果的快取，計時只反映 client 端的請求路徑
+    run()
+    run.cleanup = server.stop
+    return run
+
+
+@benchmark("exact_single", max_size=10000)
+def bench_exact_single(workdir, n):
+    return _exact_phase(workdir, n, gsc_keyword_report.fetch_exact_query, lambda kws: kws)
+
+
+@benchmark("exact_batch", max_size=100000)
+def bench_exact_batch(workdir, n):
+    return _exact_phase(workdir, n, gsc_keyword_report.fetch_exact_batch,
+                        lambda kws: list(gsc_keyword_report.build_keyword_batches(kws, 100)))
+
+
+@benchmark("write_output_csv")
+def bench_write_output_csv(workdir, n):
+    rows = make_result_rows(make_keywords(n))
+    path = os.path.join(workdir, f"out_{n}.csv")
+    return lambda: gsc_keyword_report.write_output(path, rows)
+
+
+@benchmark("write_output_xlsx", max_size=100000)
+def bench_write_output_xlsx(workdir, n):
+    rows = make_result_rows(make_keywords(n))
+    path = os.path.join(workdir, f"out_{n}.xlsx")
+    return lambda: gsc_keyword_report.write_output(path, rows)
+
+
+@benchmark("normalize_keywords")
+def bench_normalize_keywords(workdir, n):
+    import normalize_keywords
+
+    src = write_keywords(os.path.join(workdir, f"raw_{n}.csv"), make_keywords(n))
+    dst = os.path.join(workdir, f"norm_{n}.csv")
+
+    def run():
+        with quiet():
+            normalize_keywords.normalize(src, dst)
+
+    return run
+
+
+def _gui_app(workdir, n):
+    import tkinter as tk
+
+    try:
+        import run_gui
+        app = run_gui.App()
+    except tk.TclError as exc:
+        raise Skip(f"Tk 無法啟動：{exc}")
+    app._watch_stop = True
+    app.autoload_var.set(False)
+    app.withdraw()
+    path = os.path.join(workdir, f"report_{n}.csv")
+    gsc_keyword_report.write_output(path, make_result_rows(make_keywords(n)))
+    return app, path
+
+
+@benchmark("gui_load", max_size=100000)
+def bench_gui_load(workdir, n):
+    app, path = _gui_app(workdir, n)
+
+    def run():
+        app.load_csv_into_table(path, max_rows=n)
+        app.wait_table_loaded()
+
+    run.cleanup = app.destroy
+    return run
+
+
+@benchmark("gui_sort", max_size=100000)
+def bench_gui_sort(workdir, n):
+    app, path = _gui_app(workdir, n)
+    app.load_csv_into_table(path, max_rows=n)
+    app.wait_table_loaded()
+
+    def run():
+        app.sort_by_column('點擊', numeric=True)
+        app.update_idletasks()
+
+    run.cleanup = app.destroy
+    return run
+
+
+@benchmark("gui_filter", max_size=100000)
+def bench_gui_filter(workdir, n):
+    app, path = _gui_app(workdir, n)
+    app.load_csv_into_table(path, max_rows=n)
+    app.wait_table_loaded()
+    app.filter_col_var.set('點擊')
+    app.filter_op_var.set('>')
+    app.filter_val_var.set('100')
+
+    def run():
+        app.apply_filter()
+        app.update_idletasks()
+
+    run.cleanup = app.destroy
+    return run
+
+
+def run_one(name, n, repeat, workdir):
+    fn, _ = BENCHMARKS[name]
+    result = {"name": name, "size": n}
+    try:
+        run = fn(workdir, n)
+    except Skip as exc:
+        result["skipped"] = str(exc)
+        return result
+    times = []
+    extra = None
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            extra = run()
+            times.append(time.perf_counter() - started)
+    finally:
+        cleanup = getattr(run, "cleanup", None)
+        if cleanup is not None:
+            cleanup()
+    best = min(times)
+    result.update({
+        "runs": times,
+        "min": best,
+        "median": statistics.median(times),
+        "items_per_sec": n / best if best > 0 else None,
+    })
+    if isinstance(extra, dict):
+        result["extra"] = extra
+    return result
+
+
+def run_suite(names, sizes, repeat=3, size_cap=None, log=print):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in names:
+            _, max_size = BENCHMARKS[name]
+            cap = size_cap.get(name, max_size) if size_cap else max_size
+            for n in sizes:
+                if cap is not None and n > cap:
+                    results.append({"name": name, "size": n, "skipped": f"超過規模上限 {cap}（可用 --no-cap 取消）"})
+                    continue
+                r = run_one(name, n, repeat, workdir)
+                if "skipped" in r:
+                    log(f"{name:<20} {n:>9}  略過：{r['skipped']}")
+                else:
+                    memory = ""
+                    if "bytes" in r.get("extra", {}):
+                        memory = f"  記憶體 {r['extra']['bytes'] / 1024 / 1024:.1f} MB"
+                        if "dict_bytes" in r["extra"]:
+                            memory += f"（dict of dicts {r['extra']['dict_bytes'] / 1024 / 1024:.1f} MB）"
+                    log(f"{name:<20} {n:>9}  min {r['min']:.4f}s  median {r['median']:.4f}s  {r['items_per_sec']:,.0f}/s{memory}")
+                results.append(r)
+    return results
+
+
+def git_meta():
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=repo_root, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def compare(base_path, new_path, threshold=1.10):
+    """比較兩次結果的 min 秒數，回傳退化超過 threshold 倍的項目。"""
+    with open(base_path, encoding="utf-8") as fh:
+        base = json.load(fh)
+    with open(new_path, encoding="utf-8") as fh:
+        new = json.load(fh)
+    base_times = {(r["name"], r["size"]): r["min"] for r in base["results"] if "min" in r}
+    regressions = []
+    print(f"{'benchmark':<20} {'size':>9} {'base':>10} {'new':>10} {'ratio':>7}")
+    for r in new["results"]:
+        key = (r["name"], r["size"])
+        if "min" not in r or key not in base_times:
+            continue
+        ratio = r["min"] / base_times[key] if base_times[key] > 0 else float("inf")
+        flag = "  <-- 退化" if ratio > threshold else ""
+        print(f"{r['name']:<20} {r['size']:>9} {base_times[key]:>10.4f} {r['min']:>10.4f} {ratio:>7.2f}{flag}")
+        if ratio > threshold:
+            regressions.append((key, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="gsc_keyword_report 熱點路徑 benchmark")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="關鍵字數，逗號分隔 (預設 1000,10000,100000,1000000)")
+    parser.add_argument("--only", default=None, help=f"只執行指定項目，逗號分隔：{', '.join(BENCHMARKS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="每個項目重複次數，取最小值比較 (預設 3)")
+    parser.add_argument("--no-cap", action="store_true", help="不套用各項目的規模上限（例如精確查詢、XLSX、GUI 在 1M 時很慢）")
+    parser.add_argument("--output", default=None, help="結果 JSON 路徑 (預設 benchmark-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="比較兩個結果 JSON，不執行 benchmark")
+    parser.add_argument("--threshold", type=float, default=1.10, help="--compare 時視為退化的倍數 (預設 1.10)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        regressions = compare(args.compare[0], args.compare[1], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} 個項目退化超過 {args.threshold:.2f} 倍")
+            return 1
+        return 0
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知的 benchmark：{', '.join(unknown)}")
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    size_cap = {name: None for name in names} if args.no_cap else None
+
+    meta = git_meta()
+    meta.update({
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "sizes": sizes,
+        "repeat": args.repeat,
+    })
+    results = run_suite(names, sizes, args.repeat, size_cap)
+    output = args.output or f"benchmark-{(meta['commit'] or 'unknown')[:7]}.json"
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump({"meta": meta, "results": results}, fh, ensure_ascii=False, indent=2)
+    print(f"結果已寫入 {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import benchmark
+
+
+class BenchmarkTests(unittest.TestCase):
+    def test_suite_writes_json_and_compare_flags_regressions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "base.json")
+            with redirect_stdout(io.StringIO()):
+                code = benchmark.main(["--sizes", "200", "--repeat", "1", "--output", out,
+                                       "--only", "load_keywords,match_bulk_rows,bulk_index,exact_batch,write_output_csv,normalize_keywords"])
+            self.assertEqual(code, 0)
+            with open(out, encoding="utf-8") as fh:
+                data = json.load(fh)
+            self.assertEqual({r["name"] for r in data["results"]},
+                             {"load_keywords", "match_bulk_rows", "bulk_index", "exact_batch", "write_output_csv", "normalize_keywords"})
+            self.assertTrue(all(r["min"] > 0 for r in data["results"]))
+            batch = next(r for r in data["results"] if r["name"] == "exact_batch")
+            self.assertEqual(batch["extra"]["requests"], 2)
+            index = next(r for r in data["results"] if r["name"] == "bulk_index")
+            self.assertLess(index["extra"]["bytes"], index["extra"]["dict_bytes"])
+
+            slower = json.loads(json.dumps(data))
+            for r in slower["results"]:
+                if r["name"] == "load_keywords":
+                    r["min"] *= 3
+            new = os.path.join(tmp, "new.json")
+            with open(new, "w", encoding="utf-8") as fh:
+                json.dump(slower, fh)
+            with redirect_stdout(io.StringIO()):
+                regressions = benchmark.compare(out, new, threshold=1.5)
+                self.assertEqual(benchmark.main(["--compare", out, new, "--threshold", "1.5"]), 1)
+            self.assertEqual([key for key, _ in regressions], [("load_keywords", 200)])
+
+    def test_size_cap_skips_large_runs(self):
+        results = benchmark.run_suite(["exact_single"], [20000], repeat=1, log=lambda *a: None)
+        self.assertIn("skipped", results[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+import gsc_async
+
+QUERIES = [f"kw{i}" for i in range(120)]
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    paths = []
+    bodies = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StandInHandler.paths.append(self.path)
+        StandInHandler.bodies.append(body)
+        rows = [{"keys": [q], "clicks": i, "impressions": i * 10, "position": 2.0} for i, q in enumerate(QUERIES)]
+        for group in body.get("dimensionFilterGroups", []):
+            for f in group["filters"]:
+                if f["operator"] == "equals":
+                    rows = [r for r in rows if r["keys"][0] == f["expression"]]
+                else:
+                    rows = [r for r in rows if re.search(f["expression"], r["keys"][0])]
+        start = body.get("startRow", 0)
+        payload = json.dumps({"rows": rows[start:start + body["rowLimit"]]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAsyncClient(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.endpoint = f"http://127.0.0.1:{cls.server.server_address[1]}/"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def run_client(self, coro_fn, max_connections=4):
+        async def main():
+            async with gsc_async.AsyncSearchConsoleClient(api_endpoint=self.endpoint, max_connections=max_connections) as client:
+                return await coro_fn(client), client
+        return asyncio.run(main())
+
+    def test_paginated_bulk_fetch(self):
+        bulk, client = self.run_client(lambda c: c.fetch_bulk_queries("https://example.com/", "2025-01-01", "2025-01-31", row_limit=50, paginate=True))
+        self.assertEqual(len(bulk), 120)
+        self.assertEqual(client.requests_made, 3)
+        self.assertIn("/webmasters/v3/sites/https%3A%2F%2Fexample.com%2F/searchAnalytics/query", StandInHandler.paths[-1])
+
+    def test_exact_queries_share_pooled_connections(self):
+        keywords = [f"kw{i}" for i in range(119, -1, -1)] + ["missing"]
+        results, client = self.run_client(lambda c: c.fetch_exact_queries("https://example.com/", "2025-01-01", "2025-01-31", keywords, max_in_flight=50))
+        self.assertEqual([r["query"] for r in results], keywords)
+        self.assertEqual(results[-1]["clicks"], 0)
+        self.assertEqual(client.requests_made, len(keywords))
+        self.assertLessEqual(client._pool.opened, 4)
+        # on_result 依 keywords 順序呼叫，不保留結果
+        seen = []
+        returned, _ = self.run_client(lambda c: c.fetch_exact_queries("https://example.com/", "2025-01-01", "2025-01-31", keywords,
+                                                                      max_in_flight=8, on_result=lambda kw, r: seen.append(kw)))
+        self.assertIsNone(returned)
+        self.assertEqual(seen, keywords)
+
+    def test_collect_report_rows(self):
+        keywords = ["kw3", "absent", "kw7"]
+        out_rows, client = self.run_client(lambda c: gsc_async.collect_report_rows(
+            c, "https://example.com/", "2025-01-01", "2025-01-31", keywords, row_limit=5, max_rows=5, exact_mode="batch"))
+        self.assertEqual([(r["keyword"], r["found_by"]) for r in out_rows], [("kw3", "bulk"), ("absent", "batch"), ("kw7", "batch")])
+
+    def test_exact_lookups_send_the_stored_spelling(self):
+        # 替身 server 與 API 相同：equals 與 regex 都區分大小寫；batch 的 regex 帶 (?i)，equals 逐字比對
+        async def lookups(c):
+            batch = await c.fetch_exact_batch("https://example.com/", "2025-01-01", "2025-01-31", ["KW5", "kw6 ", "kw7"])
+            single = await c.fetch_exact_query("https://example.com/", "2025-01-01", "2025-01-31", " kw9 ")
+            upper = await c.fetch_exact_query("https://example.com/", "2025-01-01", "2025-01-31", "KW9")
+            return batch, single, upper
+
+        (batch, single, upper), _ = self.run_client(lookups)
+        self.assertEqual([r["clicks"] for r in batch], [5, 6, 7])
+        self.assertEqual(single["clicks"], 9)
+        # 與儲存寫法不同的 equals 查詢回傳 0（取捨見 exact_query_body）
+        self.assertEqual(upper["clicks"], 0)
+
+    def test_exact_batch_falls_back_to_equals_like_the_sync_client(self):
+        def operators(batch):
+            async def lookups(c):
+                del StandInHandler.bodies[:]
+                results = await c.fetch_exact_batch("https://example.com/", "2025-01-01", "2025-01-31", batch)
+                return results, [b["dimensionFilterGroups"][0]["filters"][0]["operator"] for b in StandInHandler.bodies]
+            return self.run_client(lookups)[0]
+
+        results, ops = operators(["kw3"])
+        self.assertEqual((results[0]["clicks"], ops), (3, ["equals"]))
+        # regex 超過 4096 字元時逐一查詢
+        long_batch = ["kw1" + "x" * 2100, "kw2" + "x" * 2100]
+        results, ops = operators(long_batch)
+        self.assertEqual(ops, ["equals", "equals"])
+        self.assertEqual([r["query"] for r in results], long_batch)
+        _, ops = operators(["kw1", "kw2"])
+        self.assertEqual(ops, ["includingRegex"])
+
+
+class TestRunInOrder(unittest.TestCase):
+
+    def test_delivers_in_order_with_a_bounded_window(self):
+        created = []
+        delivered = []
+        running = [0, 0]
+
+        async def fetch(i):
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+            await asyncio.sleep((i * 7 % 5) / 1000)
+            running[0] -= 1
+            return i * 2
+
+        def items():
+            for i in range(500):
+                # 尚未輸出的項目不超過 max_in_flight * 4 個
+                self.assertLessEqual(len(created) - len(delivered), 4 * 5)
+                created.append(i)
+                yield i
+
+        asyncio.run(gsc_async._run_in_order(items(), fetch, lambda i, r: delivered.append((i, r)), 5))
+        self.assertEqual(delivered, [(i, i * 2) for i in range(500)])
+        self.assertLessEqual(running[1], 5)
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def test_fresh_connection_is_closed_when_the_retry_fails(self):
+        closed = []
+
+        class Writer:
+            def __init__(self, name):
+                self.name = name
+
+            def close(self):
+                closed.append(self.name)
+
+        async def run():
+            pool = gsc_async._ConnectionPool("127.0.0.1", 1, False, 2)
+            pool._idle.append((None, Writer("stale")))
+
+            async def open_fresh():
+                return None, Writer("fresh")
+
+            pool._open = open_fresh
+            with mock.patch.object(gsc_async, "_roundtrip", side_effect=ConnectionError("reset")):
+                with self.assertRaises(ConnectionError):
+                    await pool.request("POST", "/", {}, b"")
+
+        asyncio.run(run())
+        self.assertEqual(closed, ["stale", "fresh"])
+
+
+if __name__ == '__main__':
+    unittest.main()
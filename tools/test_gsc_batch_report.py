@@ -0,0 +1,109 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+import gsc_batch_report
+
+
+class MultiSiteService:
+    """Thread-safe stand-in shared by every property: rows are keyed by siteUrl."""
+
+    def __init__(self, sites):
+        self.sites = sites
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def searchanalytics(self):
+        return self
+
+    def query(self, siteUrl, body):
+        service = self
+
+        class Request:
+            def execute(self):
+                with service._lock:
+                    service.calls.append(siteUrl)
+                if siteUrl not in service.sites:
+                    raise RuntimeError("no access to " + siteUrl)
+                rows = [{"keys": [q], "clicks": c, "impressions": i, "position": p}
+                        for q, c, i, p in service.sites[siteUrl]]
+                for group in body.get("dimensionFilterGroups", []):
+                    for f in group["filters"]:
+                        rows = [r for r in rows if r["keys"][0].lower() == f["expression"].lower()]
+                start = body.get("startRow", 0)
+                return {"rows": rows[start:start + body["rowLimit"]]}
+
+        return Request()
+
+
+class BatchReportTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def write_keywords(self, name, keywords):
+        with open(self.path(name), "w", encoding="utf-8") as fh:
+            fh.write("\n".join(keywords) + "\n")
+        return self.path(name)
+
+    def test_load_manifest_fills_defaults(self):
+        manifest = self.path("m.csv")
+        with open(manifest, "w", encoding="utf-8") as fh:
+            fh.write("property,keywords,start_date,end_date,output\n")
+            fh.write("https://a.example/,a.csv,,,\n")
+            fh.write("sc-domain:b.example,b.csv,2024-02-01,2024-02-29,b_out.xlsx\n")
+        entries = gsc_batch_report.load_manifest(manifest, "2024-01-01", "2024-01-31")
+        self.assertEqual(entries[0]["start_date"], "2024-01-01")
+        self.assertEqual(entries[0]["output"], "a.example.csv")
+        self.assertEqual(entries[1]["end_date"], "2024-02-29")
+        self.assertEqual(entries[1]["output"], "b_out.xlsx")
+
+    def test_load_manifest_rejects_missing_fields_and_shared_outputs(self):
+        manifest = self.path("m.json")
+        with open(manifest, "w", encoding="utf-8") as fh:
+            json.dump([{"property": "https://a.example/", "keywords": "a.csv"}], fh)
+        with self.assertRaises(ValueError):
+            gsc_batch_report.load_manifest(manifest)
+        with open(manifest, "w", encoding="utf-8") as fh:
+            json.dump([{"property": "https://a.example/", "keywords": "a.csv", "output": "x.csv"},
+                       {"property": "https://b.example/", "keywords": "b.csv", "output": "x.csv"}], fh)
+        with self.assertRaises(ValueError):
+            gsc_batch_report.load_manifest(manifest, "2024-01-01", "2024-01-31")
+
+    def test_run_batch_shares_service_and_isolates_failures(self):
+        service = MultiSiteService({
+            "https://a.example/": [("alpha", 5, 50, 2.0)],
+            "https://b.example/": [("beta", 1, 10, 8.0), ("gamma", 0, 3, 20.0)],
+        })
+        entries = []
+        for site, kws in (("https://a.example/", ["alpha", "missing"]),
+                          ("https://b.example/", ["gamma", "beta"]),
+                          ("https://denied.example/", ["x"])):
+            name = gsc_batch_report.default_output(site)
+            entries.append({"property": site, "keywords": self.write_keywords(name + ".kw", kws),
+                            "start_date": "2024-01-01", "end_date": "2024-01-31", "output": self.path(name)})
+        summaries = gsc_batch_report.run_batch(service, entries, parallel=3, workers=2)
+
+        self.assertEqual([s["property"] for s in summaries], [e["property"] for e in entries])
+        self.assertEqual([s["rows"] for s in summaries], [2, 2, 0])
+        self.assertIsNone(summaries[0]["error"])
+        self.assertIn("no access", summaries[2]["error"])
+        self.assertTrue(all(s["seconds"] >= 0 for s in summaries))
+        with open(entries[1]["output"], encoding="utf-8-sig") as fh:
+            lines = fh.read().splitlines()
+        self.assertEqual(lines[1].split(",")[:3], ["gamma", "0", "3"])
+        self.assertFalse(os.path.exists(entries[2]["output"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
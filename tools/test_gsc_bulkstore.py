@@ -0,0 +1,43 @@
+import os
+import sys
+import unittest
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+import gsc_keyword_report
+from gsc_bulkstore import BulkStore
+
+
+class BulkStoreTests(unittest.TestCase):
+    def test_lookup_returns_same_records_as_dict(self):
+        rows = [
+            {"keys": ["iphone 15"], "clicks": 5, "impressions": 50, "position": 3.25},
+            {"keys": ["ＩＰＨＯＮＥ　１５"], "clicks": 1, "impressions": 2, "position": 9.0},
+            {"keys": ["台北 美食"], "clicks": 0, "impressions": 7, "position": 12.5},
+            {"keys": ["Straße"], "clicks": 2, "impressions": 20, "position": 1.0},
+        ]
+        store = gsc_keyword_report.build_bulk_index(rows)
+        self.assertIsInstance(store, BulkStore)
+        self.assertEqual(len(store), 3)
+        # 正規化後相同的 query 保留先出現的一筆
+        self.assertEqual(store["iphone 15"], {"query": "iphone 15", "clicks": 5, "impressions": 50, "position": 3.25})
+        # 與 key 不同的原始 query 仍保留原本寫法
+        self.assertEqual(store.get("strasse")["query"], "Straße")
+        self.assertIn("台北 美食", store)
+        self.assertIsNone(store.get("absent"))
+        self.assertEqual(list(store), ["iphone 15", "台北 美食", "strasse"])
+        self.assertEqual(store, {k: store[k] for k in store})
+
+    def test_add_keeps_first_record(self):
+        store = BulkStore()
+        self.assertTrue(store.add("a", {"query": "a", "clicks": 1, "impressions": 1, "position": 1.0}))
+        self.assertFalse(store.add("a", {"query": "A", "clicks": 9, "impressions": 9, "position": 9.0}))
+        self.assertEqual(store["a"]["clicks"], 1)
+        with self.assertRaises(KeyError):
+            store["b"]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+import gsc_keyword_report
+from gsc_cache import CachedService, ResponseCache, is_closed_range
+from test_gsc_keyword_report import FakeService, make_queries
+
+
+def body(start="2024-01-01", end="2024-01-31", start_row=0):
+    return gsc_keyword_report.bulk_query_body(start, end, 10, start_row)
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cache.sqlite')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_covers_site_and_body(self):
+        cache = ResponseCache(self.path)
+        cache.put("https://a.com/", body(), {"rows": [1]})
+        self.assertEqual(cache.get("https://a.com/", body()), {"rows": [1]})
+        self.assertIsNone(cache.get("https://b.com/", body()))
+        self.assertIsNone(cache.get("https://a.com/", body(start_row=10)))
+        self.assertIsNone(cache.get("https://a.com/", body(end="2024-01-30")))
+        cache.close()
+
+    def test_open_ranges_expire_closed_ranges_do_not(self):
+        cache = ResponseCache(self.path, open_ttl=0.05)
+        today = time.strftime("%Y-%m-%d")
+        cache.put("s", body(end=today), {"rows": []})
+        cache.put("s", body(), {"rows": []})
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("s", body(end=today)))
+        self.assertIsNotNone(cache.get("s", body()))
+        self.assertTrue(is_closed_range("2024-01-31"))
+        self.assertFalse(is_closed_range(today))
+        cache.close()
+
+    def test_lru_eviction_by_size(self):
+        payload = {"rows": [{"keys": [os.urandom(8).hex()]} for _ in range(50)]}
+        probe = ResponseCache(self.path)
+        probe.put("s", body(start_row=999), payload)
+        entry = probe.stats()["bytes"]
+        probe.clear()
+        probe.close()
+
+        cache = ResponseCache(self.path, max_bytes=int(entry * 2.5))
+        cache.put("s", body(start_row=0), payload)
+        cache.put("s", body(start_row=10), payload)
+        time.sleep(0.01)
+        cache.get("s", body(start_row=0))  # touch -> most recently used
+        cache.put("s", body(start_row=20), payload)
+        self.assertIsNotNone(cache.get("s", body(start_row=0)))
+        self.assertIsNone(cache.get("s", body(start_row=10)))
+        self.assertEqual(cache.stats()["entries"], 2)
+        cache.close()
+
+    def test_hits_do_not_write_and_total_is_tracked(self):
+        cache = ResponseCache(self.path, max_bytes=10 ** 9)
+        cache.put("s", body(), {"rows": [1]})
+        cache.put("s", body(), {"rows": [1, 2, 3]})  # 覆寫時扣掉舊的大小
+        self.assertEqual(cache._total, cache.stats()["bytes"])
+        changes = cache._conn.total_changes
+        for _ in range(10):
+            self.assertIsNotNone(cache.get("s", body()))
+        self.assertEqual(cache._conn.total_changes, changes)
+        touched = cache._accessed[cache.make_key("s", body())]
+        cache.close()
+        reopened = ResponseCache(self.path)
+        self.assertEqual(reopened._conn.execute("SELECT accessed FROM responses").fetchone()[0], touched)
+        self.assertEqual(reopened._total, reopened.stats()["bytes"])
+        reopened.close()
+
+    def test_cached_service_serves_repeat_runs_locally(self):
+        cache = ResponseCache(self.path)
+        inner = FakeService(make_queries(25))
+        svc = CachedService(inner, cache)
+        first = gsc_keyword_report.fetch_bulk_queries(svc, "s", "2024-01-01", "2024-01-31", row_limit=10, paginate=True)
+        second = gsc_keyword_report.fetch_bulk_queries(svc, "s", "2024-01-01", "2024-01-31", row_limit=10, paginate=True)
+        self.assertEqual(first, second)
+        self.assertEqual(len(inner.bodies), 3)
+        refreshed = CachedService(inner, cache, refresh=True)
+        gsc_keyword_report.fetch_bulk_queries(refreshed, "s", "2024-01-01", "2024-01-31", row_limit=10, paginate=True)
+        self.assertEqual(len(inner.bodies), 6)
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
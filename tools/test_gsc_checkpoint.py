@@ -0,0 +1,68 @@
+import csv
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+import gsc_keyword_report
+from gsc_checkpoint import Checkpoint
+from test_gsc_keyword_report import FakeService, make_queries
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal = os.path.join(self.tmp.name, 'run.checkpoint.jsonl')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_resume_skips_truncated_tail_and_other_ranges(self):
+        cp = Checkpoint(self.journal, "s", "2025-01-01", "2025-01-31").open()
+        cp.record({"keyword": "a", "clicks": 1})
+        cp.close()
+        with open(self.journal, "a", encoding="utf-8") as fh:
+            fh.write('{"keyword": "b", "cli')  # crash mid-write
+        cp = Checkpoint(self.journal, "s", "2025-01-01", "2025-01-31")
+        self.assertEqual(list(cp.load()), ["a"])
+        cp.open(resume=True)
+        cp.record({"keyword": "c", "clicks": 3})
+        cp.close()
+        self.assertEqual(sorted(cp.load()), ["a", "c"])
+        self.assertEqual(Checkpoint(self.journal, "s", "2025-02-01", "2025-02-28").load(), {})
+
+    def test_main_resume_only_queries_remaining_keywords(self):
+        kws_path = os.path.join(self.tmp.name, 'kws.csv')
+        out_path = os.path.join(self.tmp.name, 'out.csv')
+        with open(kws_path, 'w', encoding='utf-8') as fh:
+            fh.write('kw1\nkw2\nnope\nkw3\n')
+        cp = Checkpoint(out_path + '.checkpoint.jsonl', 'https://example.com', '2025-01-01', '2025-01-31').open()
+        cp.record({"keyword": "kw2", "clicks": 999, "impressions": 1, "position": 1.0, "found_by": "exact"})
+        cp.close()
+
+        svc = FakeService(make_queries(2))
+        argv = ['gsc_keyword_report.py', '--property', 'https://example.com', '--keywords', kws_path,
+                '--start-date', '2025-01-01', '--end-date', '2025-01-31', '--output', out_path,
+                '--no-cache', '--workers', '1', '--resume']
+        with mock.patch.object(sys, 'argv', argv), \
+                mock.patch('gsc_keyword_report.authenticate', return_value=None), \
+                mock.patch('gsc_keyword_report.build', return_value=svc):
+            gsc_keyword_report.main()
+
+        with open(out_path, encoding='utf-8-sig') as fh:
+            rows = list(csv.DictReader(fh))
+        self.assertEqual([r['keyword'] for r in rows], ['kw1', 'kw2', 'nope', 'kw3'])
+        self.assertEqual(rows[1]['clicks'], '999')
+        exact = [b['dimensionFilterGroups'][0]['filters'][0]['expression'] for b in svc.bodies if 'dimensionFilterGroups' in b]
+        self.assertEqual(exact, ['nope', 'kw3'])
+        self.assertFalse(os.path.exists(out_path + '.checkpoint.jsonl'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+from gsc_daystore import DayStore
+
+
+class DailyFakeService:
+    """Returns one row per (day, query) for date+query requests; day N has impressions N+1."""
+
+    def __init__(self, queries):
+        self.queries = queries
+        self.bodies = []
+
+    def searchanalytics(self):
+        return self
+
+    def query(self, siteUrl, body):
+        self.bodies.append(body)
+        self._body = body
+        return self
+
+    def execute(self):
+        body = self._body
+        assert body["dimensions"] == ["date", "query"]
+        d = date.fromisoformat(body["startDate"])
+        rows = []
+        while d <= date.fromisoformat(body["endDate"]):
+            for i, q in enumerate(self.queries):
+                rows.append({"keys": [d.isoformat(), q], "clicks": 1, "impressions": d.day, "position": float(i + d.day)})
+            d += timedelta(days=1)
+        start = body.get("startRow", 0)
+        return {"rows": rows[start:start + body["rowLimit"]]}
+
+    def days_requested(self):
+        days = set()
+        for b in self.bodies:
+            d = date.fromisoformat(b["startDate"])
+            while d <= date.fromisoformat(b["endDate"]):
+                days.add(d)
+                d += timedelta(days=1)
+        return len(days)
+
+
+class TestDayStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = DayStore(os.path.join(self.tmp.name, 'days.sqlite'))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_longer_range_only_downloads_the_delta(self):
+        svc = DailyFakeService(["a", "b"])
+        self.assertEqual(self.store.sync(svc, "s", "2024-03-02", "2024-03-31"), 30)
+        svc.bodies.clear()
+        self.assertEqual(self.store.sync(svc, "s", "2024-01-01", "2024-03-31"), 61)
+        self.assertEqual(svc.days_requested(), 61)
+        svc.bodies.clear()
+        self.assertEqual(self.store.sync(svc, "s", "2024-02-01", "2024-02-29"), 0)
+        self.assertEqual(svc.bodies, [])
+
+    def test_range_aggregation_weights_position_by_impressions(self):
+        svc = DailyFakeService(["a", "b"])
+        self.store.sync(svc, "s", "2024-01-01", "2024-01-03")
+        rows = {r["keys"][0]: r for r in self.store.iter_range_rows("s", "2024-01-02", "2024-01-03")}
+        self.assertEqual(rows["a"]["clicks"], 2)
+        self.assertEqual(rows["a"]["impressions"], 5)
+        # (2*2 + 3*3) / 5
+        self.assertAlmostEqual(rows["a"]["position"], 13 / 5)
+
+    def test_recent_days_are_refetched(self):
+        svc = DailyFakeService(["a"])
+        today = date.today()
+        start = (today - timedelta(days=1)).isoformat()
+        self.store.sync(svc, "s", start, today.isoformat())
+        self.assertEqual(len(self.store.missing_days("s", start, today.isoformat())), 2)
+        self.store.sync(svc, "s", start, today.isoformat())
+        rows = list(self.store.iter_range_rows("s", start, today.isoformat()))
+        self.assertEqual(rows[0]["clicks"], 2)
+
+    def test_sync_respects_row_caps_and_refetches_truncated_days(self):
+        svc = DailyFakeService(["a", "b", "c"])
+        # 10 天 x 3 個 query = 30 筆；每頁 4 筆、合計最多 10 筆
+        self.assertEqual(self.store.sync(svc, "s", "2024-01-01", "2024-01-10", row_limit=4, max_rows=10), 10)
+        self.assertEqual([b["rowLimit"] for b in svc.bodies], [4, 4, 3])
+        stored = self.store._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+        self.assertEqual(stored, 10)
+        # 被截斷的區間不算完整
+        self.assertEqual(len(self.store.missing_days("s", "2024-01-01", "2024-01-10")), 10)
+        svc.bodies.clear()
+        self.store.sync(svc, "s", "2024-01-01", "2024-01-10", row_limit=25000)
+        self.assertEqual(self.store._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0], 30)
+        self.assertEqual(self.store.missing_days("s", "2024-01-01", "2024-01-10"), [])
+
+    def test_sync_writes_each_page_as_it_arrives(self):
+        store = self.store
+        seen = []
+
+        class CountingService(DailyFakeService):
+            def execute(self):
+                seen.append(store._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0])
+                return super().execute()
+
+        store.sync(CountingService(["a", "b"]), "s", "2024-01-01", "2024-01-05", row_limit=3)
+        self.assertEqual(seen, [0, 3, 6, 9])
+
+    def test_cap_exhausted_before_later_ranges(self):
+        svc = DailyFakeService(["a"])
+        self.store.sync(svc, "s", "2024-01-03", "2024-01-03")
+        svc.bodies.clear()
+        # 缺少 01-01..01-02 與 01-04..01-05 兩個區間，額度在第一個區間用完
+        self.assertEqual(self.store.sync(svc, "s", "2024-01-01", "2024-01-05", max_rows=2), 2)
+        self.assertEqual(len(svc.bodies), 1)
+        # 剛好填滿上限的區間是完整的
+        self.assertEqual(self.store.missing_days("s", "2024-01-01", "2024-01-05"), ["2024-01-04", "2024-01-05"])
+
+    def test_main_syncs_whole_days_without_paginate(self):
+        from unittest import mock
+
+        import gsc_keyword_report
+        from test_gsc_keyword_report import FakeService
+
+        kws_path = os.path.join(self.tmp.name, 'kws.csv')
+        with open(kws_path, 'w', encoding='utf-8') as fh:
+            fh.write('kw1\n')
+        argv = ['gsc_keyword_report.py', '--property', 'https://example.com', '--keywords', kws_path,
+                '--start-date', '2024-01-01', '--end-date', '2024-01-31', '--output', os.path.join(self.tmp.name, 'out.csv'),
+                '--no-cache', '--day-store', os.path.join(self.tmp.name, 'cli.sqlite')]
+        with mock.patch.object(sys, 'argv', argv), \
+                mock.patch('gsc_keyword_report.authenticate', return_value=None), \
+                mock.patch('gsc_keyword_report.build', return_value=FakeService([])), \
+                mock.patch.object(DayStore, 'sync', return_value=0) as sync, \
+                mock.patch('sys.stdout'):
+            gsc_keyword_report.main()
+        # 未加 --paginate 時也不以 --row-limit 截斷每日資料
+        self.assertIsNone(sync.call_args.args[5])
+
+
+if __name__ == '__main__':
+    unittest.main()
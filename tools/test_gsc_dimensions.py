@@ -0,0 +1,92 @@
+import csv
+import io
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+import gsc_keyword_report
+from gsc_dimensions import DimensionStore, breakdown_output_path, parse_dimensions
+from gsc_fake_server import FakeSearchConsoleServer, SyntheticDataset
+
+ROWS = [
+    {"keys": ["shoes", "https://a/1", "MOBILE"], "clicks": 3, "impressions": 30, "position": 2.0},
+    {"keys": ["shoes", "https://a/1", "DESKTOP"], "clicks": 1, "impressions": 10, "position": 6.0},
+    {"keys": ["Shoes", "https://a/2", "MOBILE"], "clicks": 2, "impressions": 0, "position": 9.0},
+    {"keys": ["boots", "https://a/2", "MOBILE"], "clicks": 5, "impressions": 50, "position": 1.0},
+]
+
+
+class DimensionStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.store = DimensionStore(["query", "page", "device"]).add_rows(ROWS)
+
+    def test_rollups_sum_metrics_and_weight_positions_by_impressions(self):
+        self.assertEqual(len(self.store), 4)
+        by_query = self.store.rollup(("query",))
+        self.assertEqual(list(by_query), [("shoes",), ("boots",)])
+        self.assertEqual(by_query[("shoes",)], {"clicks": 6, "impressions": 40, "position": 3.0})
+        by_device = self.store.rollup(("query", "device"))
+        self.assertEqual(by_device[("shoes", "DESKTOP")], {"clicks": 1, "impressions": 10, "position": 6.0})
+        # impressions 皆為 0 時取平均
+        self.assertEqual(self.store.rollup(("query", "page"))[("shoes", "https://a/2")]["position"], 9.0)
+
+    def test_query_index_and_breakdown_rows(self):
+        index = self.store.query_index()
+        self.assertEqual(index["boots"]["clicks"], 5)
+        rows = list(self.store.breakdown_rows(["SHOES", "missing", "boots"], "page"))
+        self.assertEqual([(r["keyword"], r["page"], r["clicks"]) for r in rows],
+                         [("SHOES", "https://a/1", 4), ("SHOES", "https://a/2", 2), ("boots", "https://a/2", 5)])
+
+    def test_parse_dimensions(self):
+        self.assertEqual(parse_dimensions("Page, device,page"), ["page", "device"])
+        with self.assertRaises(ValueError):
+            parse_dimensions("query")
+        self.assertEqual(breakdown_output_path("out/r.csv", "device"), "out/r.by-device.csv")
+
+
+class MultiDimensionReportTests(unittest.TestCase):
+    def test_one_download_feeds_report_and_breakdowns(self):
+        data = SyntheticDataset.generate(40)
+        keywords = [f"synthetic keyword {i}" for i in range(0, 40, 4)] + ["not in dataset"]
+        with tempfile.TemporaryDirectory() as tmp, FakeSearchConsoleServer(data) as server:
+            kw_path = os.path.join(tmp, "kws.csv")
+            with open(kw_path, "w", encoding="utf-8") as fh:
+                fh.write("\n".join(keywords) + "\n")
+            out = os.path.join(tmp, "out.csv")
+            argv = ["gsc_keyword_report.py", "--property", "https://example.com/", "--keywords", kw_path,
+                    "--start-date", "2025-01-01", "--end-date", "2025-01-03", "--api-endpoint", server.endpoint,
+                    "--dimensions", "page,device,country", "--paginate", "--row-limit", "200", "--no-cache",
+                    "--qps", "1000", "--qpm", "100000", "--output", out]
+            with mock.patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()):
+                gsc_keyword_report.main()
+            stats = server.stats()
+            reports = {}
+            for name in ("out.csv", "out.by-page.csv", "out.by-device.csv", "out.by-country.csv"):
+                with open(os.path.join(tmp, name), newline="", encoding="utf-8-sig") as fh:
+                    reports[name] = list(csv.DictReader(fh))
+
+        # 40 個 query × 2 page × 3 device × 3 country = 720 列，分 4 頁下載；另有 1 個精確查詢
+        self.assertEqual(stats["requests"], 5)
+        main = {r["keyword"]: r for r in reports["out.csv"]}
+        self.assertEqual(main["not in dataset"]["found_by"], "exact")
+        expected = {q: (c * 3, i * 3) for q, c, i, _ in data.rows}
+        for name in ("out.by-page.csv", "out.by-device.csv", "out.by-country.csv"):
+            totals = {}
+            for r in reports[name]:
+                c, i = totals.get(r["keyword"], (0, 0))
+                totals[r["keyword"]] = (c + int(r["clicks"]), i + int(r["impressions"]))
+            self.assertEqual(set(totals), set(keywords[:-1]))
+            for kw, total in totals.items():
+                self.assertEqual(total, expected[kw])
+                self.assertEqual(total, (int(main[kw]["clicks"]), int(main[kw]["impressions"])))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import asyncio
+import csv
+import io
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+import gsc_async
+import gsc_keyword_report
+from gsc_fake_server import FakeSearchConsoleServer, RequestError, SyntheticDataset
+
+BODY = {"startDate": "2025-01-01", "endDate": "2025-01-10", "dimensions": ["query"], "rowLimit": 25000}
+
+
+class DatasetTests(unittest.TestCase):
+    def setUp(self):
+        self.data = SyntheticDataset.generate(1000)
+
+    def test_pagination_covers_dataset_once(self):
+        seen = []
+        start = 0
+        while True:
+            rows = self.data.query(dict(BODY, rowLimit=300, startRow=start)).get("rows", [])
+            if not rows:
+                break
+            seen.extend(r["keys"][0] for r in rows)
+            start += len(rows)
+        self.assertEqual(len(seen), 1000)
+        self.assertEqual(len(set(seen)), 1000)
+
+    def test_filters_and_date_totals(self):
+        eq = {"filters": [{"dimension": "query", "operator": "equals", "expression": "synthetic keyword 7"}]}
+        rows = self.data.query(dict(BODY, dimensionFilterGroups=[eq]))["rows"]
+        self.assertEqual([r["keys"][0] for r in rows], ["synthetic keyword 7"])
+        regex = {"filters": [{"dimension": "query", "operator": "includingRegex", "expression": "^synthetic keyword (1|22)$"}]}
+        self.assertEqual(len(self.data.query(dict(BODY, dimensionFilterGroups=[regex]))["rows"]), 2)
+        # 與 API 相同：equals 與 regex 區分大小寫（regex 可用 (?i)），contains 不分大小寫
+        cases = {("equals", "SYNTHETIC KEYWORD 7"): 0, ("includingRegex", "^SYNTHETIC KEYWORD 7$"): 0,
+                 ("includingRegex", "(?i)^SYNTHETIC KEYWORD 7$"): 1, ("contains", "KEYWORD 999"): 1}
+        for (op, expr), expected in cases.items():
+            with self.subTest(op=op, expr=expr):
+                group = {"filters": [{"dimension": "query", "operator": op, "expression": expr}]}
+                self.assertEqual(len(self.data.query(dict(BODY, dimensionFilterGroups=[group])).get("rows", [])), expected)
+        # date 維度逐日加總後等於整個區間的 query 彙總
+        daily = self.data.query(dict(BODY, dimensions=["date", "query"], dimensionFilterGroups=[eq]))["rows"]
+        self.assertEqual(len(daily), 10)
+        self.assertEqual(sum(r["clicks"] for r in daily), rows[0]["clicks"])
+
+    def test_rejects_invalid_requests(self):
+        with self.assertRaises(RequestError):
+            self.data.query(dict(BODY, rowLimit=25001))
+        with self.assertRaises(RequestError):
+            self.data.query(dict(BODY, dimensions=["searchAppearance"]))
+
+
+class EndToEndTests(unittest.TestCase):
+    def test_report_against_fake_server_retries_injected_429s(self):
+        data = SyntheticDataset.generate(3000)
+        keywords = [f"synthetic keyword {i}" for i in range(0, 3000, 50)] + ["not in dataset"]
+        with tempfile.TemporaryDirectory() as tmp, \
+                FakeSearchConsoleServer(data, error_rate=0.2, retry_after=0, seed=1) as server:
+            kw_path = os.path.join(tmp, "kws.csv")
+            with open(kw_path, "w", encoding="utf-8") as fh:
+                fh.write("\n".join(keywords) + "\n")
+            out = os.path.join(tmp, "out.csv")
+            argv = ["gsc_keyword_report.py", "--property", "https://example.com/", "--keywords", kw_path,
+                    "--start-date", "2025-01-01", "--end-date", "2025-01-10", "--api-endpoint", server.endpoint,
+                    "--row-limit", "1000", "--exact-mode", "batch", "--batch-size", "20", "--no-cache",
+                    "--qps", "1000", "--qpm", "100000", "--max-retries", "10", "--output", out]
+            with mock.patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()):
+                gsc_keyword_report.main()
+            with open(out, newline="", encoding="utf-8-sig") as fh:
+                rows = {r["keyword"]: r for r in csv.DictReader(fh)}
+            stats = server.stats()
+
+        self.assertEqual(set(rows), set(keywords))
+        self.assertGreater(stats["throttled"], 0)
+        expected = {q: c * 10 for q, c, _, _ in data.rows}
+        for kw in keywords[:-1]:
+            self.assertEqual(int(rows[kw]["clicks"]), expected[kw])
+        self.assertEqual(rows["not in dataset"]["impressions"], "0")
+
+    def test_async_client_against_fake_server(self):
+        data = SyntheticDataset.generate(500)
+
+        async def run(endpoint):
+            async with gsc_async.AsyncSearchConsoleClient(api_endpoint=endpoint, max_connections=4) as client:
+                return await client.fetch_bulk_queries("https://example.com/", "2025-01-01", "2025-01-01",
+                                                       row_limit=200, paginate=True)
+
+        with FakeSearchConsoleServer(data, latency=0.001, keep_bodies=2) as server:
+            bulk = asyncio.run(run(server.endpoint))
+            self.assertEqual(server.stats()["requests"], 3)
+            # 只保留最近的請求 body
+            self.assertEqual([b["startRow"] for b in server.bodies], [200, 400])
+        self.assertEqual(len(bulk), 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
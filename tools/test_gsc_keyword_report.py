@@ -0,0 +1,247 @@
+import io
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+import gsc_keyword_report
+
+
+class FakeService:
+    """Minimal stand-in for service.searchanalytics().query(...).execute()."""
+
+    def __init__(self, queries):
+        # queries: list of (query, clicks, impressions, position)
+        self.rows = [
+            {"keys": [q], "clicks": c, "impressions": i, "position": p}
+            for q, c, i, p in queries
+        ]
+        self.bodies = []
+
+    def searchanalytics(self):
+        return self
+
+    def query(self, siteUrl, body):
+        self.bodies.append(body)
+        self._body = body
+        return self
+
+    def execute(self):
+        rows = self.rows
+        for group in self._body.get("dimensionFilterGroups", []):
+            for f in group["filters"]:
+                if f["operator"] == "equals":
+                    rows = [r for r in rows if r["keys"][0].lower() == f["expression"].lower()]
+                elif f["operator"] == "includingRegex":
+                    pattern = re.compile(f["expression"], re.IGNORECASE)
+                    rows = [r for r in rows if pattern.search(r["keys"][0])]
+        start = self._body.get("startRow", 0)
+        limit = self._body.get("rowLimit", 1000)
+        return {"rows": rows[start:start + limit]}
+
+
+def make_queries(n):
+    return [(f"kw{i}", i, i * 10, 1.5) for i in range(n)]
+
+
+class TestBulkPagination(unittest.TestCase):
+
+    def test_iter_bulk_rows_pages_until_exhausted(self):
+        svc = FakeService(make_queries(25))
+        rows = list(gsc_keyword_report.iter_bulk_rows(svc, "https://example.com", "2025-01-01", "2025-01-31", row_limit=10))
+        self.assertEqual(len(rows), 25)
+        self.assertEqual([b["startRow"] for b in svc.bodies], [0, 10, 20])
+
+    def test_iter_bulk_rows_respects_max_rows(self):
+        svc = FakeService(make_queries(25))
+        rows = list(gsc_keyword_report.iter_bulk_rows(svc, "https://example.com", "2025-01-01", "2025-01-31", row_limit=10, max_rows=15))
+        self.assertEqual(len(rows), 15)
+        self.assertEqual([b["rowLimit"] for b in svc.bodies], [10, 5])
+
+    def test_fetch_bulk_queries_single_page_by_default(self):
+        svc = FakeService(make_queries(25))
+        result = gsc_keyword_report.fetch_bulk_queries(svc, "https://example.com", "2025-01-01", "2025-01-31", row_limit=10)
+        self.assertEqual(len(result), 10)
+        self.assertEqual(len(svc.bodies), 1)
+        result = gsc_keyword_report.fetch_bulk_queries(svc, "https://example.com", "2025-01-01", "2025-01-31", row_limit=10, paginate=True)
+        self.assertEqual(len(result), 25)
+
+    def test_match_bulk_rows_stops_once_all_keywords_found(self):
+        svc = FakeService(make_queries(100))
+        rows = gsc_keyword_report.iter_bulk_rows(svc, "https://example.com", "2025-01-01", "2025-01-31", row_limit=10)
+        matched, scanned = gsc_keyword_report.match_bulk_rows(rows, ["KW3", "kw12"])
+        self.assertEqual(set(matched), {"kw3", "kw12"})
+        self.assertEqual(scanned, 13)
+        # only the first two pages were requested
+        self.assertEqual(len(svc.bodies), 2)
+
+
+class TestKeywordNormalization(unittest.TestCase):
+
+    def test_normalize_keyword_folds_width_case_and_spaces(self):
+        n = gsc_keyword_report.normalize_keyword
+        self.assertEqual(n("ＩＰｈｏｎｅ　１５"), "iphone 15")
+        self.assertEqual(n("  台北   美食 "), "台北 美食")
+        self.assertEqual(n("Straße"), n("STRASSE"))
+
+    def test_bulk_matching_rescues_unicode_variants(self):
+        svc = FakeService([("iphone 15", 5, 50, 3.0), ("台北 美食", 2, 20, 4.0), ("other", 1, 1, 1.0)])
+        keywords = ["ＩＰＨＯＮＥ　１５", "台北  美食", "Other", "absent"]
+        out = []
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            gsc_keyword_report.collect_report_rows(svc, "https://example.com", "2025-01-01", "2025-01-31", keywords,
+                                                   row_limit=10, on_row=out.append)
+        self.assertEqual([(r["keyword"], r["found_by"]) for r in out],
+                         [("ＩＰＨＯＮＥ　１５", "bulk"), ("台北  美食", "bulk"), ("Other", "bulk"), ("absent", "exact")])
+        self.assertEqual(out[0]["clicks"], 5)
+        # 只有靠正規化才命中的 2 個關鍵字計入，大小寫差異原本就能比對
+        self.assertIn("多命中 2 個關鍵字", stdout.getvalue())
+        self.assertEqual(len(svc.bodies), 2)
+
+
+class TestKeywordDedup(unittest.TestCase):
+
+    def test_dedupe_keeps_first_spelling_and_order(self):
+        self.assertEqual(gsc_keyword_report.dedupe_keywords(["b", "A", "ｂ", "a ", "c", "B"]), ["b", "A", "c"])
+
+    def test_duplicates_are_queried_once_and_fanned_out(self):
+        svc = FakeService([("hit", 1, 10, 1.0), ("x", 4, 40, 2.0), ("y", 5, 50, 3.0)])
+        keywords = ["x", "hit", "X ", "y", "x", "Hit", "zzz", "ｘ"]
+        for mode in ("single", "batch"):
+            svc.bodies = []
+            with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+                out = gsc_keyword_report.collect_report_rows(svc, "https://example.com", "2025-01-01", "2025-01-31",
+                                                             keywords, row_limit=1, max_rows=1, exact_mode=mode)
+            self.assertEqual([r["keyword"] for r in out], ["hit", "Hit", "x", "X ", "y", "x", "zzz", "ｘ"])
+            self.assertEqual([r["clicks"] for r in out], [1, 1, 4, 4, 5, 4, 0, 4])
+            self.assertIn("省下 3 次重複查詢", stdout.getvalue())
+            # 1 個 bulk 請求 + x / y / zzz 各查詢一次（batch 模式合成一個請求）
+            self.assertEqual(len(svc.bodies), 4 if mode == "single" else 2)
+
+
+class TestStreamingKeywords(unittest.TestCase):
+
+    def test_iter_keywords_streams_and_splits_cells(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "kw.csv")
+            with open(path, "w", encoding="utf-8-sig", newline="") as fh:
+                fh.write('a\n"b, c ,,d"\n\n e \n')
+            keywords = gsc_keyword_report.iter_keywords(path)
+            self.assertIsInstance(keywords, types.GeneratorType)
+            self.assertEqual(list(keywords), ["a", "b", "c", "d", "e"])
+            self.assertEqual(gsc_keyword_report.load_keywords(path), ["a", "b", "c", "d", "e"])
+
+    def test_iter_unique_keywords_is_lazy(self):
+        def source():
+            yield from ["b", "A", "ｂ", "a "]
+            raise AssertionError("read past the requested keywords")
+
+        unique = gsc_keyword_report.iter_unique_keywords(source())
+        self.assertEqual([next(unique), next(unique)], ["b", "A"])
+
+    def test_chunked_collect_matches_each_chunk_against_one_bulk_download(self):
+        svc = FakeService([("hit", 1, 10, 1.0), ("x", 4, 40, 2.0), ("y", 5, 50, 3.0)])
+        keywords = iter(["x", "hit", "X ", "y", "zzz", "Hit"])
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            out = gsc_keyword_report.collect_report_rows_chunked(svc, "https://example.com", "2025-01-01", "2025-01-31",
+                                                                 keywords, chunk_size=2, row_limit=1, max_rows=1)
+        # 每段內 bulk 命中在前；重複的 "X " / "Hit" 與非分段模式相同各輸出一列
+        self.assertEqual([(r["keyword"], r["found_by"]) for r in out],
+                         [("hit", "bulk"), ("x", "exact"), ("X ", "exact"), ("y", "exact"), ("Hit", "bulk"), ("zzz", "exact")])
+        self.assertEqual([r["clicks"] for r in out], [1, 4, 4, 5, 1, 0])
+        self.assertIn("去除重複後 4 個", stdout.getvalue())
+        # bulk 只下載一次，其餘為 x / y / zzz 的精確查詢；"X " 沿用前一段的結果
+        self.assertEqual(len(svc.bodies), 4)
+
+    def test_chunked_collect_emits_the_same_rows_as_one_pass(self):
+        data = [("hit", 1, 10, 1.0), ("x", 4, 40, 2.0), ("y", 5, 50, 3.0)]
+        keywords = ["x", "hit", "nope", "X ", "y", "nope", "Hit", "ｙ", "x"]
+        with mock.patch("sys.stdout", new_callable=io.StringIO):
+            whole = gsc_keyword_report.collect_report_rows(FakeService(data), "https://example.com", "2025-01-01", "2025-01-31",
+                                                           keywords, row_limit=1, max_rows=1, exact_mode="batch")
+            svc = FakeService(data)
+            chunked = gsc_keyword_report.collect_report_rows_chunked(svc, "https://example.com", "2025-01-01", "2025-01-31",
+                                                                     iter(keywords), chunk_size=3, row_limit=1, max_rows=1,
+                                                                     exact_mode="batch")
+        self.assertEqual(len(chunked), len(keywords))
+        key = lambda r: (r["keyword"], r["clicks"], r["found_by"])
+        self.assertEqual(sorted(map(key, chunked)), sorted(map(key, whole)))
+        # bulk 下載 1 次；第一段批次查詢 x / nope，第二段只查 y，第三段全部沿用
+        self.assertEqual(len(svc.bodies), 3)
+
+
+class TestBatchedExactLookups(unittest.TestCase):
+
+    def test_build_keyword_batches_respects_size_and_expression_length(self):
+        kws = [f"keyword {i}" for i in range(250)]
+        batches = list(gsc_keyword_report.build_keyword_batches(kws, batch_size=100))
+        self.assertEqual([len(b) for b in batches], [100, 100, 50])
+        batches = list(gsc_keyword_report.build_keyword_batches(kws, batch_size=100, max_expression=200))
+        self.assertEqual(sum(batches, []), kws)
+        for b in batches:
+            self.assertLessEqual(len(gsc_keyword_report._keywords_regex(b)), 200)
+
+    def test_fetch_exact_batch_splits_rows_and_zero_fills(self):
+        svc = FakeService([("a+b", 3, 30, 2.0), ("c.d", 1, 5, 7.5), ("cxd", 9, 9, 9.0)])
+        results = gsc_keyword_report.fetch_exact_batch(svc, "https://example.com", "2025-01-01", "2025-01-31", ["C.D", "missing", "a+b"])
+        self.assertEqual(len(svc.bodies), 1)
+        self.assertEqual([r["clicks"] for r in results], [1, 0, 3])
+        self.assertEqual(results[1]["query"], "missing")
+        self.assertEqual(results[1]["position"], 0.0)
+
+    def test_exact_lookups_send_the_stored_spelling(self):
+        # equals 逐字比對儲存的 query，只去除頭尾空白；正規化不套用在送出的運算式上
+        body = gsc_keyword_report.exact_query_body("2025-01-01", "2025-01-31", " iPhone 15 ")
+        self.assertEqual(body["dimensionFilterGroups"][0]["filters"][0]["expression"], "iPhone 15")
+        self.assertEqual(gsc_keyword_report._keywords_regex([" iPhone 15", "A+B"]), "(?i)^(iPhone 15|A\\+B)$")
+        batches = list(gsc_keyword_report.build_keyword_batches(["  " + "a" * 20] * 3, max_expression=len("(?i)^()$") + 42))
+        self.assertEqual([len(b) for b in batches], [2, 1])
+
+
+class TestConcurrentExactQueries(unittest.TestCase):
+
+    def test_results_follow_keyword_order_with_per_thread_services(self):
+        services = []
+
+        def factory():
+            svc = FakeService(make_queries(200))
+            services.append(svc)
+            return svc
+
+        keywords = [f"kw{i}" for i in range(150, -1, -3)] + ["nope"]
+        results = gsc_keyword_report.run_exact_queries(factory, "https://example.com", "2025-01-01", "2025-01-31", keywords, workers=4)
+        self.assertEqual([r["query"] for r in results], keywords)
+        self.assertLessEqual(len(services), 4)
+        self.assertEqual(sum(len(s.bodies) for s in services), len(keywords))
+
+
+class TestColdStart(unittest.TestCase):
+    def test_import_does_not_load_heavy_dependencies(self):
+        code = ("import sys, gsc_keyword_report; "
+                "print(' '.join(m for m in ('googleapiclient.discovery', 'google.oauth2', 'asyncio') if m in sys.modules))")
+        out = subprocess.run([sys.executable, "-c", code], cwd=repo_root, capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "")
+
+    def test_parse_importtime(self):
+        lines = [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |   _io",
+            "import time:        80 |        200 | encodings.utf_8",
+            "import time:      1500 |       1700 | gsc_retry",
+            "unrelated stderr line",
+        ]
+        self.assertEqual(gsc_keyword_report.parse_importtime(lines), [
+            ("_io", 120, 120, 1), ("encodings.utf_8", 80, 200, 0), ("gsc_retry", 1500, 1700, 0),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
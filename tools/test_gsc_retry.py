@@ -0,0 +1,122 @@
+import asyncio
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+import gsc_keyword_report
+from gsc_async import HttpError
+from gsc_retry import AdaptiveConcurrency, RetryPolicy, is_throttle
+from test_gsc_keyword_report import FakeService, make_queries
+
+
+class FlakyService(FakeService):
+    """Fails the first `failures` executions with the given error."""
+
+    def __init__(self, queries, failures, error):
+        super().__init__(queries)
+        self.failures = failures
+        self.error = error
+
+    def execute(self):
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        return super().execute()
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.sleeps = []
+        self.policy = RetryPolicy(max_retries=3, base_delay=1.0, sleep=self.sleeps.append, rand=lambda: 0.5)
+
+    def test_backoff_is_exponential_with_jitter(self):
+        svc = FlakyService(make_queries(3), 3, HttpError(503, {}, b"unavailable"))
+        wrapped = gsc_keyword_report.RetryingService(svc, self.policy)
+        result = gsc_keyword_report.fetch_exact_query(wrapped, "s", "2025-01-01", "2025-01-31", "kw1")
+        self.assertEqual(result["clicks"], 1)
+        self.assertEqual(self.sleeps, [0.5, 1.0, 2.0])
+        self.assertEqual(self.policy.retries[503], 3)
+
+    def test_retry_after_header_wins(self):
+        svc = FlakyService(make_queries(3), 1, HttpError(429, {"retry-after": "7"}, b""))
+        gsc_keyword_report.fetch_exact_query(gsc_keyword_report.RetryingService(svc, self.policy), "s", "a", "b", "kw1")
+        self.assertEqual(self.sleeps, [7.0])
+
+    def test_gives_up_after_max_retries_and_skips_client_errors(self):
+        svc = FlakyService(make_queries(3), 10, HttpError(500, {}, b""))
+        with self.assertRaises(HttpError):
+            gsc_keyword_report.fetch_exact_query(gsc_keyword_report.RetryingService(svc, self.policy), "s", "a", "b", "kw1")
+        self.assertEqual(self.policy.gave_up, 1)
+        self.sleeps.clear()
+        svc = FlakyService(make_queries(3), 1, HttpError(400, {}, b"bad request"))
+        with self.assertRaises(HttpError):
+            gsc_keyword_report.fetch_exact_query(gsc_keyword_report.RetryingService(svc, self.policy), "s", "a", "b", "kw1")
+        self.assertEqual(self.sleeps, [])
+
+    def test_quota_403_counts_as_throttling(self):
+        self.assertTrue(is_throttle(HttpError(403, {}, b'{"reason": "rateLimitExceeded"}')))
+        self.assertFalse(is_throttle(HttpError(403, {}, b'{"reason": "forbidden"}')))
+
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+
+    def test_aimd(self):
+        now = [0.0]
+        gate = AdaptiveConcurrency(8, clock=lambda: now[0])
+        gate.on_throttle()
+        gate.on_throttle()  # same burst, ignored during cooldown
+        self.assertEqual(gate.limit, 4)
+        now[0] = 5.0
+        gate.on_throttle()
+        self.assertEqual(gate.limit, 2)
+        for _ in range(2 + 3):
+            gate.on_success()
+        self.assertEqual(gate.limit, 4)
+        self.assertEqual(gate.lowest, 2)
+
+    def test_guarded_shrinks_on_429(self):
+        gate = AdaptiveConcurrency(4)
+
+        def throttled():
+            raise HttpError(429, {}, b"")
+
+        with self.assertRaises(HttpError):
+            gate.guarded(throttled)
+        self.assertEqual(gate.limit, 2)
+        self.assertEqual(gate.in_flight, 0)
+
+    def test_async_waiters_are_woken_by_release(self):
+        gate = AdaptiveConcurrency(2)
+        running = [0, 0]
+
+        async def call():
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+            await asyncio.sleep(0.001)
+            running[0] -= 1
+            return 1
+
+        async def main():
+            results = await asyncio.gather(*(gate.guarded_async(call) for _ in range(20)))
+            # 名額由另一個 thread 釋出時也會喚醒等待中的 coroutine（不輪詢）
+            gate.acquire()
+            gate.acquire()
+            threading.Timer(0.05, gate.release).start()
+            with mock.patch('asyncio.sleep', side_effect=AssertionError('polling')):
+                await asyncio.wait_for(gate.acquire_async(), 5)
+            return results
+
+        self.assertEqual(sum(asyncio.run(main())), 20)
+        self.assertLessEqual(running[1], 2)
+        self.assertEqual(gate.in_flight, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import csv
+import io
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+import gsc_keyword_report
+import gsc_shard
+from gsc_writer import open_writer
+
+
+def row(keyword, found_by, clicks=1):
+    return {"keyword": keyword, "clicks": clicks, "impressions": 10, "position": 2.0, "found_by": found_by}
+
+
+class ShardingTests(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(gsc_shard.parse_shard("2/4"), (2, 4))
+        for bad in ("0/4", "5/4", "4", "a/b", "1/0"):
+            with self.assertRaises(ValueError):
+                gsc_shard.parse_shard(bad)
+
+    def test_partition_is_stable_and_keeps_duplicates_together(self):
+        keywords = [f"keyword {i}" for i in range(400)]
+        shards = [list(gsc_shard.in_shard(keywords, i, 4)) for i in range(1, 5)]
+        self.assertEqual(sorted(kw for s in shards for kw in s), sorted(keywords))
+        self.assertTrue(all(60 < len(s) < 140 for s in shards))
+        self.assertEqual(gsc_shard.shard_of("ＫＥＹＷＯＲＤ　7", 4), gsc_shard.shard_of("keyword 7", 4))
+        self.assertEqual(gsc_shard.shard_output_path("out/report.csv", 2, 4), "out/report.shard2-of-4.csv")
+
+
+class MergeTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write_shards(self, keywords, count, rows_for):
+        paths = []
+        for i in range(1, count + 1):
+            path = os.path.join(self.tmp.name, f"shard{i}.jsonl")
+            with open_writer(path) as writer:
+                for r in rows_for(list(gsc_shard.in_shard(keywords, i, count))):
+                    writer.write(r)
+            paths.append(path)
+        return paths
+
+    def test_merge_restores_keyword_order_from_bulk_first_shards(self):
+        keywords = [f"kw{i}" for i in range(30)] + ["kw4"]
+        bulk = {f"kw{i}" for i in range(0, 30, 3)}
+
+        def bulk_first(shard_keywords):
+            return ([row(kw, "bulk") for kw in shard_keywords if kw in bulk] +
+                    [row(kw, "exact") for kw in shard_keywords if kw not in bulk])
+
+        paths = self.write_shards(keywords, 3, bulk_first)
+        out = os.path.join(self.tmp.name, "merged.csv")
+        self.assertEqual(gsc_shard.merge_shards(iter(keywords), paths, out), 31)
+        with open(out, newline="", encoding="utf-8-sig") as fh:
+            merged = list(csv.DictReader(fh))
+        self.assertEqual([r["keyword"] for r in merged], keywords)
+        self.assertEqual(merged[3]["found_by"], "bulk")
+
+    def test_merge_rejects_shards_from_other_keyword_lists(self):
+        paths = self.write_shards(["a", "b", "c"], 2, lambda kws: [row(kw, "exact") for kw in kws])
+        out = os.path.join(self.tmp.name, "merged.csv")
+        with self.assertRaises(ValueError):
+            gsc_shard.merge_shards(iter(["a", "b"]), paths, out)
+        self.assertFalse(os.path.exists(out))
+
+    def test_shard_runs_merge_into_single_report(self):
+        keywords = [f"keyword {i}" for i in range(50)]
+        kw_path = os.path.join(self.tmp.name, "kws.csv")
+        with open(kw_path, "w", encoding="utf-8") as fh:
+            fh.write("\n".join(keywords) + "\n")
+        out = os.path.join(self.tmp.name, "report.csv")
+        for i in range(1, 4):
+            argv = ["gsc_keyword_report.py", "--property", "https://example.com/", "--keywords", kw_path,
+                    "--start-date", "2025-01-01", "--end-date", "2025-01-31", "--mock", "--shard", f"{i}/3",
+                    "--output", out]
+            with mock.patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()):
+                gsc_keyword_report.main()
+        argv = ["gsc_shard.py", "merge", "--shards", "3", "--keywords", kw_path, "--output", out]
+        with mock.patch.object(sys, "argv", argv), redirect_stdout(io.StringIO()):
+            gsc_shard.main()
+        with open(out, newline="", encoding="utf-8-sig") as fh:
+            self.assertEqual([r["keyword"] for r in csv.DictReader(fh)], keywords)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["kws.csv", "report.csv"])
+
+
+if __name__ == "__main__":
+    unittest.main()
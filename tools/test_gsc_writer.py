@@ -0,0 +1,115 @@
+import csv
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+import gsc_keyword_report
+import gsc_writer
+
+ROWS = [
+    {"keyword": "台北 美食", "clicks": 3, "impressions": 40, "position": 4.5, "found_by": "bulk"},
+    {"keyword": "absent", "clicks": 0, "impressions": 0, "position": "", "found_by": "none"},
+]
+
+
+class WriterTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name):
+        path = os.path.join(self.tmp.name, name)
+        with gsc_writer.open_writer(path) as writer:
+            for row in ROWS:
+                writer.write(row)
+            # 寫入期間正式檔名尚不存在，只有 .part 暫存檔
+            self.assertFalse(os.path.exists(path))
+        self.assertEqual(writer.rows, len(ROWS))
+        self.assertFalse(os.path.exists(path + ".part"))
+        return path
+
+    def test_csv(self):
+        path = self.write("out.csv")
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            rows = list(csv.DictReader(fh))
+        self.assertEqual([r["keyword"] for r in rows], ["台北 美食", "absent"])
+        self.assertEqual(rows[0]["position"], "4.5")
+
+    def test_jsonl(self):
+        path = self.write("out.jsonl")
+        with open(path, encoding="utf-8") as fh:
+            rows = [json.loads(line) for line in fh]
+        self.assertEqual(rows, ROWS)
+
+    def test_xlsx_write_only(self):
+        from openpyxl import load_workbook
+
+        path = self.write("out.xlsx")
+        ws = load_workbook(path, read_only=True).active
+        values = list(ws.iter_rows(values_only=True))
+        self.assertEqual(values[0], tuple(gsc_writer.FIELDNAMES))
+        self.assertEqual(values[1], ("台北 美食", 3, 40, 4.5, "bulk"))
+
+    def test_exception_discards_partial_output(self):
+        path = os.path.join(self.tmp.name, "out.csv")
+        with self.assertRaises(RuntimeError):
+            with gsc_writer.open_writer(path) as writer:
+                writer.write(ROWS[0])
+                raise RuntimeError("interrupted")
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    @unittest.skipUnless(gsc_writer.pyarrow_available(), "pyarrow not installed")
+    def test_columnar_formats_keep_numeric_types(self):
+        import pyarrow as pa
+
+        for name in ("out.parquet", "out.arrow"):
+            path = self.write(name)
+            names, total, batches = gsc_writer.open_columnar_batches(path)
+            table = pa.Table.from_batches(list(batches))
+            self.assertEqual((names, total), (gsc_writer.FIELDNAMES, 2))
+            self.assertEqual(table.schema.field("clicks").type, pa.int64())
+            self.assertEqual(table.schema.field("position").type, pa.float64())
+            self.assertEqual(table.column("position").to_pylist(), [4.5, None])
+            self.assertEqual(list(gsc_writer.iter_report_rows(path))[1],
+                             {"keyword": "absent", "clicks": 0, "impressions": 0, "position": "", "found_by": "none"})
+            # 先前的報表可直接當作關鍵字清單
+            self.assertEqual(gsc_keyword_report.load_keywords(path), ["台北 美食", "absent"])
+
+    @unittest.skipUnless(gsc_writer.pyarrow_available(), "pyarrow not installed")
+    def test_columnar_writer_flushes_in_batches(self):
+        path = os.path.join(self.tmp.name, "out.parquet")
+        with gsc_writer.ParquetReportWriter(path, batch_size=3) as writer:
+            for i in range(10):
+                writer.write({"keyword": f"kw{i}", "clicks": i, "impressions": i, "position": "", "found_by": "bulk"})
+                self.assertLess(writer._buffered, 3)
+        _, total, batches = gsc_writer.open_columnar_batches(path)
+        self.assertEqual((total, sum(b.num_rows for b in batches)), (10, 10))
+
+    def test_writer_hooks_are_abstract(self):
+        class Incomplete(gsc_writer.ReportWriter):
+            def _write(self, row):
+                pass
+
+        with self.assertRaises(TypeError):
+            Incomplete(os.path.join(self.tmp.name, "out.txt"))
+
+    @unittest.skipUnless(gsc_writer.pyarrow_available(), "pyarrow not installed")
+    def test_iter_columnar_values_streams_every_batch(self):
+        for name in ("out.parquet", "out.arrow"):
+            path = os.path.join(self.tmp.name, name)
+            with gsc_writer.open_writer(path) as writer:
+                writer.batch_size = 4
+                for i in range(10):
+                    writer.write({"keyword": f"kw{i}", "clicks": i, "impressions": i, "position": "", "found_by": "bulk"})
+            self.assertEqual(list(gsc_writer.iter_columnar_values(path, ("query", "keyword"))), [f"kw{i}" for i in range(10)])
+            self.assertEqual(list(gsc_writer.iter_columnar_values(path, ("clicks",)))[-1], 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
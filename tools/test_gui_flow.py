@@ -36,6 +36,7 @@ app.format_var.set('CSV')
 # load csv into table
 print('Loading CSV into table...')
 app.load_csv_into_table(sample_csv)
+app.wait_table_loaded()
 print('Loaded rows:', len(app.current_rows), 'columns:', app.current_columns)
 
 # patch filedialog for save path for CSV
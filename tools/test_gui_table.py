@@ -0,0 +1,253 @@
+import csv
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+import gsc_writer
+import gui_table
+from gui_table import (NAN, TableLoader, TableModel, clamp_top, iter_report_chunks, report_encoding,
+                       report_row_parser, scroll_fractions, sniff_encoding)
+
+
+def write_report(path, n, encoding='utf-8'):
+    with open(path, 'w', newline='', encoding=encoding) as fh:
+        writer = csv.writer(fh)
+        writer.writerow(['keyword', 'clicks', 'impressions', 'position', 'found_by'])
+        for i in range(n):
+            writer.writerow([f'關鍵字{i}', i, i * 10, 3.14159, 'bulk'])
+
+
+def make_model(n):
+    model = TableModel()
+    model.extend(([f'kw{i}' for i in range(n)], [float(i % 10 + 1) for i in range(n)], [float(i) for i in range(n)],
+                  [float(i * 10) for i in range(n)], [10.0 if i else NAN for i in range(n)]))
+    return model
+
+
+class TestTableModel(unittest.TestCase):
+    def setUp(self):
+        self.model = make_model(100000)
+
+    def test_window_formats_only_requested_rows(self):
+        self.assertEqual(len(self.model), 100000)
+        self.assertEqual(self.model.window(99998, 40), [
+            ['kw99998', '9.0', '99998', '999980', '10.0%'], ['kw99999', '10.0', '99999', '999990', '10.0%'],
+        ])
+        self.assertEqual(self.model.row(0), ['kw0', '1.0', '0', '0', ''])
+        self.assertEqual(self.model.rows[1], ['kw1', '2.0', '1', '10', '10.0%'])
+        self.assertEqual(len(self.model.rows[:1000]), 1000)
+
+    def test_filter_limits_view_without_copying_rows(self):
+        self.model.set_filter([3, 7])
+        self.assertEqual(len(self.model), 2)
+        self.assertEqual([r[0] for r in self.model.window(0, 40)], ['kw3', 'kw7'])
+        self.model.set_filter(None)
+        self.assertEqual(len(self.model), 100000)
+
+    def test_extend_shows_new_rows_only_in_default_view(self):
+        model = make_model(2)
+        model.extend((['c'], [1.0], [1.0], [1.0], [100.0]))
+        self.assertEqual([r[0] for r in model.window(0, 10)], ['kw0', 'kw1', 'c'])
+        model.set_filter([1])
+        model.extend((['d'], [1.0], [1.0], [1.0], [100.0]))
+        self.assertEqual([r[0] for r in model.window(0, 10)], ['kw1'])
+        self.assertEqual(len(model.rows), 4)
+
+    def test_filter_and_stats_use_typed_columns(self):
+        model = make_model(20)
+        self.assertEqual(model.filter_indices('點擊', '>', '17'), [18, 19])
+        self.assertEqual(model.filter_indices('排名', '=', '3'), [2, 12])
+        self.assertEqual(model.filter_indices('點擊率', '<', '50'), list(range(1, 20)))
+        self.assertEqual(model.filter_indices('關鍵字', '>', 'KW1'), [1] + list(range(10, 20)))
+        with self.assertRaises(ValueError):
+            model.filter_indices('點擊', '>', 'abc')
+        self.assertEqual(model.stats(), (20, 190.0, 1900.0, 5.5))
+        self.assertEqual(model.sort_keys('點擊率')[:2], [0.0, 10.0])
+        self.assertEqual(TableModel().stats(), (0, 0, 0, None))
+
+
+class TestModelSorting(unittest.TestCase):
+    def test_sort_flips_cached_permutation(self):
+        model = make_model(100000)
+        model.sort('排名', descending=True)
+        self.assertEqual([r[1] for r in model.window(0, 2)], ['10.0', '10.0'])
+        perm = model.permutation('排名')
+        model.sort('排名')
+        self.assertIs(model.permutation('排名'), perm)
+        # 升冪：相同值維持原始順序
+        self.assertEqual([r[0] for r in model.window(0, 3)], ['kw0', 'kw10', 'kw20'])
+        self.assertEqual(list(model.view[:3]), [0, 10, 20])
+        model.sort(None)
+        self.assertEqual(model.view, range(100000))
+
+    def test_sort_and_filter_compose(self):
+        model = make_model(30)
+        model.set_filter(model.filter_indices('點擊', '<', '5'))
+        model.sort('點擊', descending=True)
+        self.assertEqual([r[0] for r in model.window(0, 10)], ['kw4', 'kw3', 'kw2', 'kw1', 'kw0'])
+        model.set_filter(model.filter_indices('關鍵字', '>', 'kw2'))
+        self.assertEqual([r[0] for r in model.window(0, 3)], ['kw29', 'kw28', 'kw27'])
+        self.assertEqual(len(model), 11)
+        model.set_filter(None)
+        self.assertEqual(model.row(0)[0], 'kw29')
+        # 缺值視為 0，點擊率缺值的 kw0 排在最前
+        model.sort('點擊率')
+        self.assertEqual(model.row(0)[0], 'kw0')
+
+    def test_extend_invalidates_permutations(self):
+        model = make_model(3)
+        model.sort('點擊', descending=True)
+        self.assertEqual(model.row(0)[0], 'kw2')
+        model.extend((['new'], [1.0], [99.0], [100.0], [99.0]))
+        self.assertEqual(model.row(0)[0], 'new')
+        # 只計算實際排序過的欄位
+        self.assertEqual(set(model._permutations), {'點擊'})
+
+
+class TestReportLoading(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_row_parser(self):
+        parse = report_row_parser(['Query', 'Impressions', 'Clicks', 'Position'])
+        self.assertEqual(parse(['kw', '1,000', '25', '2.345']), ('kw', 2.3, 25.0, 1000.0, 2.5))
+        kw, position, clicks, impressions, ctr = parse(['kw', '0', '', 'n/a'])
+        self.assertTrue(position != position and clicks != clicks and ctr != ctr)
+        self.assertEqual(impressions, 0.0)
+        self.assertEqual(len(report_row_parser(['keyword'])(['kw'])), 5)
+
+    def test_chunks_report_progress(self):
+        path = os.path.join(self.tmp.name, 'report.csv')
+        write_report(path, 2500)
+        chunks = list(iter_report_chunks(path, report_encoding(path), chunk_size=1000))
+        self.assertEqual([len(columns[0]) for columns, _ in chunks], [1000, 1000, 500])
+        fractions = [f for _, f in chunks]
+        self.assertEqual(fractions, sorted(fractions))
+        self.assertEqual(fractions[-1], 1.0)
+        model = TableModel()
+        model.extend(chunks[0][0])
+        self.assertEqual(model.row(1), ['關鍵字1', '3.1', '1', '10', '10.0%'])
+        self.assertEqual(sum(len(c[0]) for c, _ in iter_report_chunks(path, 'utf-8', max_rows=1200, chunk_size=1000)), 1200)
+
+    @unittest.skipUnless(gsc_writer.pyarrow_available(), 'pyarrow not installed')
+    def test_columnar_chunks_follow_record_batches(self):
+        rows = [{'keyword': f'kw{i}', 'clicks': i, 'impressions': i * 10 if i % 7 else 0,
+                 'position': 2.345 if i % 5 else '', 'found_by': 'bulk'} for i in range(2500)]
+        csv_path = os.path.join(self.tmp.name, 'report.csv')
+        with gsc_writer.open_writer(csv_path) as writer:
+            for r in rows:
+                writer.write(r)
+        expected = TableModel()
+        for columns, _ in iter_report_chunks(csv_path, report_encoding(csv_path)):
+            expected.extend(columns)
+        for name, encoding in (('report.parquet', 'parquet'), ('report.arrow', 'arrow')):
+            with self.subTest(encoding):
+                path = os.path.join(self.tmp.name, name)
+                with gsc_writer.open_writer(path) as writer:
+                    for r in rows:
+                        writer.write(r)
+                self.assertEqual(report_encoding(path), encoding)
+                with mock.patch.object(gui_table, 'report_row_parser', side_effect=AssertionError('re-parsed as text')):
+                    chunks = list(iter_report_chunks(path, encoding, chunk_size=1000))
+                self.assertTrue(all(len(c[0]) <= 1000 for c, _ in chunks))
+                self.assertEqual(chunks[-1][1], 1.0)
+                model = TableModel()
+                for columns, _ in chunks:
+                    model.extend(columns)
+                self.assertEqual(model.window(0, 2500), expected.window(0, 2500))
+                self.assertEqual(sum(len(c[0]) for c, _ in iter_report_chunks(path, encoding, max_rows=1200, chunk_size=1000)), 1200)
+
+    def test_loader_runs_in_background_and_finishes(self):
+        path = os.path.join(self.tmp.name, 'report.csv')
+        write_report(path, 5000, encoding='utf-16')
+        loader = TableLoader(path, chunk_size=1000).start()
+        messages = []
+        deadline = time.time() + 10
+        while not messages or messages[-1][0] not in ('done', 'error'):
+            self.assertLess(time.time(), deadline)
+            messages.extend(loader.poll())
+            time.sleep(0.01)
+        self.assertEqual(messages[0], ('encoding', 'utf-16'))
+        self.assertEqual(messages[-1], ('done',))
+        self.assertEqual(sum(len(m[1][0]) for m in messages if m[0] == 'rows'), 5000)
+
+    def test_loader_reports_errors(self):
+        loader = TableLoader(os.path.join(self.tmp.name, 'missing.csv')).start()
+        loader._thread.join(5)
+        messages = loader.poll()
+        self.assertEqual(messages[-1][0], 'error')
+
+
+class TestEncodingSniffing(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'wb') as fh:
+            fh.write(data)
+        return path
+
+    def test_bom_and_sample(self):
+        text = 'keyword,clicks\n手機殼,3\n'
+        cases = {
+            'utf-8-sig': text.encode('utf-8-sig'),
+            'utf-16': text.encode('utf-16'),
+            'utf-16-le': text.encode('utf-16-le'),
+            'utf-16-be': text.encode('utf-16-be'),
+            'utf-8': text.encode('utf-8'),
+            'cp950': text.encode('cp950'),
+            'latin1': 'keyword,clicks\ncafé\xff,3\n'.encode('latin1'),
+        }
+        for expected, data in cases.items():
+            with self.subTest(expected):
+                self.assertEqual(sniff_encoding(self.write(f'{expected}.csv', data)), expected)
+
+    def test_samples_beyond_the_head(self):
+        # 開頭 64 KB 都是 ASCII，之後才出現 cp950 中文
+        data = ('keyword,clicks\n' + 'ascii,1\n' * 20000 + '手機殼,3\n' * 20000).encode('cp950')
+        self.assertGreater(len(data), 2 * gui_table.SNIFF_BYTES)
+        self.assertEqual(sniff_encoding(self.write('late.csv', data)), 'cp950')
+
+    def test_verdict_is_cached_per_path_and_mtime(self):
+        path = self.write('cached.csv', '手機殼\n'.encode('cp950'))
+        self.assertEqual(sniff_encoding(path), 'cp950')
+        st = os.stat(path)
+        with open(path, 'wb') as fh:
+            fh.write('手機殼\n'.encode('utf-8'))
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(sniff_encoding(path), 'cp950')
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        self.assertEqual(sniff_encoding(path), 'utf-8')
+
+    def test_undecodable_bytes_outside_the_sample_do_not_abort_loading(self):
+        data = ('keyword,clicks\n' + 'kw,1\n' * 30000).encode('utf-8')
+        path = self.write('mixed.csv', data[:100000] + b'\xff\xfe,1\n' + data[100000:])
+        encoding = sniff_encoding(path)
+        self.assertEqual(encoding, 'utf-8')
+        self.assertEqual(sum(len(c[0]) for c, _ in iter_report_chunks(path, encoding)), 30001)
+
+
+class TestScrolling(unittest.TestCase):
+    def test_clamp_top(self):
+        self.assertEqual(clamp_top(-5, 1000, 40), 0)
+        self.assertEqual(clamp_top(990, 1000, 40), 960)
+        self.assertEqual(clamp_top(10, 20, 40), 0)
+
+    def test_scroll_fractions(self):
+        self.assertEqual(scroll_fractions(0, 0, 0), (0.0, 1.0))
+        self.assertEqual(scroll_fractions(500000, 1000000, 40), (0.5, 0.50004))
+        self.assertEqual(scroll_fractions(0, 10, 10), (0.0, 1.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
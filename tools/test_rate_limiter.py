@@ -0,0 +1,50 @@
+import os
+import sys
+import unittest
+
+# Ensure project path is set correctly
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, repo_root)
+
+from rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_per_second_limit(self):
+        clock = FakeClock()
+        limiter = RateLimiter(per_second=5, clock=clock, sleep=clock.sleep)
+        for _ in range(25):
+            limiter.acquire()
+        # 5-token burst, then 20 more at 5/s
+        self.assertAlmostEqual(clock.now, 4.0, places=6)
+        self.assertEqual(limiter.acquired, 25)
+
+    def test_per_minute_limit_is_the_tighter_bound(self):
+        clock = FakeClock()
+        limiter = RateLimiter(per_second=10, per_minute=60, clock=clock, sleep=clock.sleep)
+        for _ in range(11):
+            limiter.acquire()
+        self.assertAlmostEqual(clock.now, 10.0, places=6)
+
+    def test_unlimited_never_sleeps(self):
+        clock = FakeClock()
+        limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+        for _ in range(100):
+            limiter.acquire()
+        self.assertEqual(clock.now, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()